@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк разбора protocol-статистики (parse_protocol_statistics)
+
+Сравнивает однопроходный сканер scan_protocol_statistics с прежним способом
+(отдельный re.findall по всему тексту на каждый показатель каждого игрока)
+и проверяет, что оба дают одинаковые значения.
+
+Страницы берутся из файлов (сохранённые страницы протоколов, .html или .txt);
+без аргументов используется синтетическая страница на --players игроков.
+
+Запуск: python benchmark_protocol_parser.py [--runs 20] [--players 24] [--json] [страница ...]
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from typing import Callable, Dict, List
+
+import html_extract
+from player_stats import PROTOCOL_FIELDS, scan_protocol_statistics
+
+# Прежний способ: шаблон на каждый показатель, поиск отдельно для каждого игрока
+_LEGACY_NAME_PATTERN = r'protocol\.(?:team\d+\.)?player(\d+)\.Name[:\s]*([^\n\r]+)'
+_LEGACY_STAT_PATTERN = r'protocol\.(?:team\d+\.)?player{num}\.{stat}[:\s]*(\d+(?:\.\d+)?)'
+
+
+def legacy_scan(page_text: str) -> List[Dict[str, object]]:
+    players = []
+    for player_num, player_name in re.findall(_LEGACY_NAME_PATTERN, page_text):
+        stats: Dict[str, object] = {'name': player_name.strip()}
+        for stat, field in PROTOCOL_FIELDS.items():
+            if field == 'plus_minus':
+                continue
+            matches = re.findall(_LEGACY_STAT_PATTERN.format(num=player_num, stat=stat), page_text)
+            if matches:
+                value = matches[0]
+                stats[field] = float(value) if field == 'minutes' and '.' in value else int(value.split('.')[0])
+        players.append(stats)
+    return players
+
+
+def synthetic_page(players: int) -> str:
+    """Страница с protocol-переменными, похожая на страницу протокола игры"""
+    lines = ["<html><body><h1>Протокол игры</h1>"]
+    for index in range(1, players + 1):
+        team = 1 + index % 2
+        prefix = f"protocol.team{team}.player{index}"
+        lines.append(f"{prefix}.Name: Игрок {index}")
+        for offset, stat in enumerate(PROTOCOL_FIELDS):
+            if stat == 'PlusMinus':
+                lines.append(f"{prefix}.{stat}: {(index * 7) % 21 - 10}")
+            elif stat == 'Minutes':
+                lines.append(f"{prefix}.{stat}: {10 + index % 25}.{index % 6}")
+            else:
+                lines.append(f"{prefix}.{stat}: {(index * 3 + offset) % 17}")
+        lines.append("<p>" + "Текст страницы без статистики. " * 20 + "</p>")
+    lines.append("</body></html>")
+    return "\n".join(lines)
+
+
+def load_page(path: str) -> str:
+    with open(path, "r", encoding="utf-8", errors="replace") as page_file:
+        content = page_file.read()
+    return html_extract.page_text(content) if path.endswith((".html", ".htm")) else content
+
+
+def best_time(func: Callable[[str], object], page_text: str, runs: int) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        started = time.perf_counter()
+        func(page_text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def results_match(page_text: str) -> bool:
+    """Сканер и прежний способ дают одинаковые имена и показатели"""
+    scanned = scan_protocol_statistics(page_text)
+    legacy = legacy_scan(page_text)
+    if len(scanned) != len([stats for stats in legacy if stats['name']]):
+        return False
+    for line, stats in zip(scanned, (stats for stats in legacy if stats['name'])):
+        for field, value in stats.items():
+            if line.get(field) != value:
+                return False
+    return True
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк разбора protocol-статистики")
+    parser.add_argument("pages", nargs="*", help="сохранённые страницы протоколов")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--players", type=int, default=24)
+    parser.add_argument("--json", action="store_true", help="вывести результаты в JSON")
+    args = parser.parse_args()
+
+    pages = {path: load_page(path) for path in args.pages} or {
+        f"synthetic-{args.players}": synthetic_page(args.players)
+    }
+
+    results = []
+    failed = False
+    for label, page_text in pages.items():
+        scanner = best_time(scan_protocol_statistics, page_text, args.runs)
+        legacy = best_time(legacy_scan, page_text, args.runs)
+        same = results_match(page_text)
+        failed = failed or not same
+        results.append({
+            "page": label,
+            "bytes": len(page_text.encode("utf-8")),
+            "players": len(scan_protocol_statistics(page_text)),
+            "scanner_ms": round(scanner * 1000, 3),
+            "legacy_ms": round(legacy * 1000, 3),
+            "speedup": round(legacy / scanner, 1) if scanner else None,
+            "results_match": same,
+        })
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print(f"⏱️ Разбор protocol-статистики (лучшее из {args.runs})")
+        for result in results:
+            status = "✅" if result["results_match"] else "❌ результаты различаются"
+            print(
+                f"   {status} {result['page']}: {result['players']} игроков, "
+                f"сканер {result['scanner_ms']} мс, прежний способ {result['legacy_ms']} мс "
+                f"(x{result['speedup']})"
+            )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,702 @@
+#!/usr/bin/env python3
+"""
+Бенчмарки горячих путей бота на записанных данных (benchmark_fixtures/)
+
+Замеряются функции, через которые проходит каждый запуск:
+- InfobasketSmartParser.filter_games_by_teams / categorize_games — календари GetCalendar;
+- EnhancedGameParser.parse_game_info / extract_player_statistics /
+  _compute_quarter_scores — ответ Widget/GetOnline с OnlinePlays и Protocol;
+- EnhancedGameParser.parse_protocol_statistics — страница протокола игры;
+- GameSystemManager._search_fallback_source — страница letobasket.ru;
+- EnhancedDuplicateProtection.check_duplicate — дамп сервисного листа (5000 строк);
+- EnhancedDuplicateProtection._read_config_from_config_sheet — лист "Конфиг".
+
+Сеть и Google Sheets не используются: сервисный лист загружается в локальное
+хранилище SQLite (SERVICE_STORAGE=sqlite во временном каталоге), лист "Конфиг"
+и HTTP-ответы отдаются из файлов фикстур.
+
+Каждый запуск дописывает строку JSON в историю (--history, по умолчанию
+.cache/benchmark_history.jsonl) с коммитом и временем каждого замера и
+сравнивает результат с последним запуском на другом коммите: замедление
+больше --threshold отмечается как регрессия.
+
+Запуск:
+    python benchmark_suite.py [--runs 15] [--only ИМЯ ...] [--json] [--fail-on-regression]
+    python benchmark_suite.py --generate-fixtures          # пересоздать синтетические фикстуры
+    python benchmark_suite.py --record --comps 107896 109465 --game 912345 \\
+        --protocol-url "https://www.fbp.ru/game.html?gameId=912345&apiUrl=https://reg.infobasket.su&lang=ru"
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gzip
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, NamedTuple, Optional, cast
+
+if TYPE_CHECKING:
+    import aiohttp
+    from gspread import Worksheet
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_fixtures")
+DEFAULT_HISTORY_PATH = os.path.join(".cache", "benchmark_history.jsonl")
+MANIFEST_FILE = "manifest.json"
+# Разница меньше этого порога считается шумом, даже если превышает --threshold
+NOISE_FLOOR_MS = 0.05
+
+
+class BenchmarkCase(NamedTuple):
+    """Замер: функция без аргументов и подготовка перед каждым прогоном (не входит во время)"""
+
+    name: str
+    func: Callable[[], Any]
+    setup: Optional[Callable[[], Any]] = None
+
+
+# --- Фикстуры -------------------------------------------------------------
+
+
+def _fixture_path(name: str) -> str:
+    return os.path.join(FIXTURES_DIR, name)
+
+
+def _read_text(name: str) -> str:
+    with open(_fixture_path(name), "r", encoding="utf-8") as fixture_file:
+        return fixture_file.read()
+
+
+def _read_json(name: str) -> Any:
+    opener = gzip.open if name.endswith(".gz") else open
+    with opener(_fixture_path(name), "rt", encoding="utf-8") as fixture_file:
+        return json.load(fixture_file)
+
+
+def _write_json(name: str, data: Any, compact: bool = True) -> None:
+    """Ответы API и дампы листов — компактно (как приходят по сети), служебные файлы — с отступами"""
+    opener = gzip.open if name.endswith(".gz") else open
+    with opener(_fixture_path(name), "wt", encoding="utf-8") as fixture_file:
+        if compact:
+            json.dump(data, fixture_file, ensure_ascii=False, separators=(",", ":"))
+        else:
+            json.dump(data, fixture_file, ensure_ascii=False, indent=1)
+
+
+def _write_text(name: str, content: str) -> None:
+    with open(_fixture_path(name), "w", encoding="utf-8") as fixture_file:
+        fixture_file.write(content)
+
+
+def load_manifest() -> Dict[str, Any]:
+    return _read_json(MANIFEST_FILE)
+
+
+# Синтетические фикстуры повторяют форму ответов Infobasket и листов таблицы;
+# --record заменяет их живыми ответами.
+_OUR_TEAMS = {1001: ("Pull Up", ["PullUP", "Пул Ап"]), 1002: ("Pull Up-Фарм", ["PullUP Farm"])}
+_OPPONENTS = [
+    "Атлант", "Кириши", "Тосно", "Вали", "Гатчина", "Луга", "Кронштадт", "Пушкин",
+    "Сестрорецк", "Выборг", "Колпино", "Петергоф", "Всеволожск", "Тихвин",
+]
+_COMPETITIONS = {
+    107896: "Лига Развития — Группа A",
+    109465: "Первая Лига — Группа A",
+    110012: "Кубок Санкт-Петербурга",
+}
+_ARENAS = ["СК Юбилейный", "ФОК Приморский", "СШОР Кировского района", "Арена Кудрово"]
+_SERVICE_TYPES = ["ОПРОС_ТРЕНИРОВКА", "ОПРОС_ИГРА", "АНОНС_ИГРА", "РЕЗУЛЬТАТ_ИГРА", "УВЕДОМЛЕНИЕ_ИЗМЕНЕНИЕ"]
+
+
+def _dotnet_date(moment: datetime) -> str:
+    return f"/Date({int(moment.timestamp() * 1000)})/"
+
+
+def _generate_calendar(rng: random.Random, comp_id: int, comp_name: str, first_game_id: int) -> List[Dict[str, Any]]:
+    teams = [(team_id, name) for team_id, (name, _) in _OUR_TEAMS.items()]
+    teams += [(2000 + index, name) for index, name in enumerate(_OPPONENTS)]
+    season_start = datetime(2026, 9, 5)
+    games = []
+    game_id = first_game_id
+    for home_id, home in teams:
+        for away_id, away in teams:
+            if home_id == away_id:
+                continue
+            day = season_start + timedelta(days=rng.randint(0, 220))
+            game_id += 1
+            finished = day < datetime(2026, 10, 17)
+            games.append({
+                "GameID": game_id,
+                "CompID": comp_id,
+                "CompNameRu": comp_name,
+                "GameDate": day.strftime("%d.%m.%Y"),
+                "GameTimeMsk": f"{rng.choice([11, 13, 15, 17, 19])}:{rng.choice(['00', '30'])}",
+                "DisplayDateTimeMsk": day.strftime("%d.%m.%Y"),
+                "TeamAid": home_id,
+                "TeamBid": away_id,
+                "ShortTeamNameAru": home,
+                "ShortTeamNameBru": away,
+                "TeamNameAru": f"БК {home}",
+                "TeamNameBru": f"БК {away}",
+                "ArenaRu": rng.choice(_ARENAS),
+                "ScoreA": rng.randint(45, 95) if finished else None,
+                "ScoreB": rng.randint(45, 95) if finished else None,
+                "GameStatus": 1 if finished else 0,
+            })
+    return games
+
+
+def _generate_online(rng: random.Random, game_id: int) -> Dict[str, Any]:
+    """GetOnline завершённой игры: составы, хронология (~900 эпизодов) и Protocol"""
+    moment = datetime(2026, 10, 11, 15, 0, tzinfo=timezone.utc)
+    our_name = _OUR_TEAMS[1001][0]
+    opponent = _OPPONENTS[0]
+    starts = []
+    players = []
+    for team_number, team_id in ((1, 1001), (2, 2000)):
+        for index in range(12):
+            start_id = team_number * 100 + index
+            person_id = team_id * 100 + index
+            starts.append({"StartID": start_id, "TeamNumber": team_number, "PersonID": person_id})
+            shots2, shots3, shots1 = rng.randint(0, 14), rng.randint(0, 8), rng.randint(0, 6)
+            goals2, goals3, goals1 = rng.randint(0, shots2), rng.randint(0, shots3), rng.randint(0, shots1)
+            players.append({
+                "TeamNumber": team_number,
+                "PersonID": person_id,
+                "PlayerNumber": index + 1,
+                "DisplayNumber": str(rng.randint(0, 99)),
+                "FirstNameRu": f"Игрок{index + 1}",
+                "LastNameRu": f"Команды{team_number}",
+                "Points": goals2 * 2 + goals3 * 3 + goals1,
+                "Rebound": rng.randint(0, 12), "DefRebound": rng.randint(0, 8), "OffRebound": rng.randint(0, 4),
+                "Assist": rng.randint(0, 9), "Steal": rng.randint(0, 5), "Blocks": rng.randint(0, 3),
+                "Turnover": rng.randint(0, 6), "Foul": rng.randint(0, 5), "OpponentFoul": rng.randint(0, 5),
+                "Goal2": goals2, "Shot2": shots2, "Goal3": goals3, "Shot3": shots3, "Goal1": goals1, "Shot1": shots1,
+                "PlayedTime": f"{rng.randint(3, 36)}:{rng.randint(0, 59):02d}",
+                "PlusMinus": rng.randint(-20, 20),
+                "Height": rng.randint(175, 210), "Weight": rng.randint(70, 110), "PosID": rng.randint(1, 5),
+                "Capitan": 1 if index == 0 else 0,
+            })
+    plays = []
+    scores = {1: 0, 2: 0}
+    scoring_values = {1: 1, 2: 2, 3: 3}
+    for play_id in range(1, 901):
+        period = min(4, (play_id - 1) // 225 + 1)
+        start = rng.choice(starts)
+        play_type = rng.choice([1, 2, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 20, 21, 40])
+        status = 0 if rng.random() < 0.02 else 1
+        if status == 1 and play_type in scoring_values:
+            scores[start["TeamNumber"]] += scoring_values[play_type]
+        plays.append({
+            "PlayID": play_id,
+            "PlayPeriod": period,
+            "PlaySecond": (play_id - 1) % 225 * 2 + period * 600,
+            "PlaySortOrder": play_id,
+            "StartID": start["StartID"],
+            "PlayTypeID": play_type,
+            "SysStatus": status,
+        })
+    team_entries = [
+        {"TeamNumber": 1, "TeamID": 1001, "TeamName1": f"БК {our_name}", "TeamName2": our_name, "Score": scores[1]},
+        {"TeamNumber": 2, "TeamID": 2000, "TeamName1": f"БК {opponent}", "TeamName2": opponent, "Score": scores[2]},
+    ]
+    return {
+        "GameID": game_id,
+        "CompID": 107896,
+        "CompNameRu": _COMPETITIONS[107896],
+        "LeagueNameRu": "Любительская лига",
+        "GameDate": _dotnet_date(moment),
+        "GameTime": _dotnet_date(moment),
+        "GameStatus": 1,
+        "IsOnline": False,
+        "Arena": {"ArenaNameRu": _ARENAS[0]},
+        "Region": {"RegionNameRu": "Санкт-Петербург"},
+        "Online": {"FreeThrowValue": 1, "FieldGoalValue": 2, "LongShotValue": 3},
+        "OnlineTeams": team_entries,
+        "GameTeams": [
+            {
+                "TeamNumber": entry["TeamNumber"],
+                "TeamID": entry["TeamID"],
+                "Score": entry["Score"],
+                "TeamName": {"CompTeamNameRu": entry["TeamName2"], "CompTeamShortNameRu": entry["TeamName2"][:6]},
+            }
+            for entry in team_entries
+        ],
+        "OnlinePeriods": [],
+        "OnlineStarts": starts,
+        "OnlinePlays": plays,
+        "Protocol": [{"Players": players}],
+    }
+
+
+def _generate_letobasket_page(rng: random.Random, target_game_id: int) -> str:
+    parts = [
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Лето Баскет</title>",
+        "<script>var counters = {views: 1};</script><style>.menu {color: #333}</style></head><body>",
+        "<div class='menu'>" + "".join(f"<a href='/page{index}.html'>Раздел {index}</a>" for index in range(40)) + "</div>",
+    ]
+    names = [name for name, _ in _OUR_TEAMS.values()] + _OPPONENTS
+    for index in range(400):
+        home, away = rng.sample(_OPPONENTS, 2)
+        day = datetime(2026, 6, 1) + timedelta(days=index % 120)
+        parts.append(
+            f"<div class='game'>{day.strftime('%d.%m.%Y')}- {home} - {away} "
+            f"{rng.randint(40, 90)}:{rng.randint(40, 90)} (10:12 15:14 11:18 20:9) "
+            f"<a href='game.html?gameId={900000 + index}&apiUrl=https://reg.infobasket.su&lang=ru'>{home} - {away}</a></div>"
+        )
+    # Искомая игра — в конце страницы, чтобы поиск проходил по всем ссылкам
+    parts.append(
+        f"<div class='game'><a href='game.html?gameId={target_game_id}&apiUrl=https://reg.infobasket.su&lang=ru'>"
+        f"{names[0]} - {_OPPONENTS[0]}</a></div>"
+    )
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def _generate_protocol_page(rng: random.Random) -> str:
+    from benchmark_protocol_parser import synthetic_page
+    rows = "".join(
+        f"<tr><td>Игрок {index}</td><td>{rng.randint(0, 30)}</td><td>{rng.randint(0, 12)}</td>"
+        f"<td>{rng.randint(0, 9)}</td><td>{rng.randint(0, 5)}</td></tr>"
+        for index in range(1, 25)
+    )
+    table = (
+        "<table class='statistics__table'><thead><tr><th>Игрок</th><th>Очки</th><th>Подборы</th>"
+        f"<th>Передачи</th><th>Перехваты</th></tr></thead><tbody>{rows}</tbody></table>"
+    )
+    page = synthetic_page(24)
+    return page.replace("<body>", "<body><script>window.protocol = {};</script>" + table, 1)
+
+
+def _generate_service_rows(rng: random.Random, count: int) -> List[List[str]]:
+    rows = []
+    start = datetime(2025, 10, 1, 9, 0)
+    for index in range(count):
+        data_type = rng.choice(_SERVICE_TYPES)
+        moment = start + timedelta(minutes=index * 97)
+        game_id = str(800000 + index)
+        if data_type == "ОПРОС_ТРЕНИРОВКА":
+            identifier = str(5312150808802889330 + index)
+        else:
+            identifier = f"{game_id}_{rng.choice(_OPPONENTS)}"
+        rows.append([
+            data_type,
+            moment.strftime("%d.%m.%Y %H:%M"),
+            f"{data_type}_{identifier}",
+            rng.choice(["АКТИВЕН", "ЗАВЕРШЕН", "ОТПРАВЛЕН"]),
+            f"Pull Up vs {rng.choice(_OPPONENTS)}",
+            f"https://www.fbp.ru/game.html?gameId={game_id}&apiUrl=https://reg.infobasket.su&lang=ru",
+            str(rng.choice(list(_COMPETITIONS))),
+            str(rng.choice(list(_OUR_TEAMS))),
+            "",
+            "",
+            game_id if data_type != "ОПРОС_ТРЕНИРОВКА" else "",
+            moment.strftime("%d.%m.%Y"),
+            moment.strftime("%H:%M"),
+            rng.choice(_ARENAS),
+            "1001",
+            str(2000 + index % len(_OPPONENTS)),
+        ])
+    return rows
+
+
+def _generate_config_rows() -> List[List[str]]:
+    from enhanced_duplicate_protection import (
+        AUTOMATION_DEFAULT_ROWS,
+        AUTOMATION_SECTION_END_MARKER,
+        AUTOMATION_SECTION_HEADER,
+        CONFIG_HEADER,
+        DEFAULT_END_MARKER,
+        VOTING_SECTION_END_MARKER,
+        VOTING_SECTION_HEADER,
+    )
+    rows = [list(CONFIG_HEADER)]
+    rows.append(["CONFIG_COMP", ", ".join(str(comp_id) for comp_id in _COMPETITIONS), "", "", "", "", "", ""])
+    for team_id, (name, aliases) in _OUR_TEAMS.items():
+        settings = json.dumps({"aliases": aliases, "display_name": name}, ensure_ascii=False)
+        rows.append(["CONFIG_TEAM", "107896, 109465", str(team_id), name, settings, "", "", ""])
+    rows.append(["TRAINING_POLL", "", "", "Тренировка", json.dumps({"weekday": 2, "time": "20:30", "location": "СК Юбилейный"}, ensure_ascii=False), "вт", "", ""])
+    rows.append(["FALLBACK", "", "", "", "", "", "http://letobasket.ru/", "Лето Баскет"])
+    rows.append([DEFAULT_END_MARKER, "", "", "", "", "", "", ""])
+    rows.append(list(VOTING_SECTION_HEADER))
+    for poll in range(3):
+        for option in range(4):
+            rows.append([f"poll_{poll}", f"Тренировка {poll}", f"Вариант {option}", "пн, ср", "Нет", "Да", "120", "", "", ""])
+    rows.append([VOTING_SECTION_END_MARKER] + [""] * (len(VOTING_SECTION_HEADER) - 1))
+    rows.append(list(AUTOMATION_SECTION_HEADER))
+    for entry in AUTOMATION_DEFAULT_ROWS:
+        rows.append([entry["name"], "", "Нет", "Нет", entry["comment"]])
+    rows.append([AUTOMATION_SECTION_END_MARKER, "", "", "", ""])
+    return rows
+
+
+def generate_fixtures(seed: int = 2026) -> None:
+    """Пересоздаёт синтетические фикстуры (детерминированно по seed)"""
+    rng = random.Random(seed)
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    calendar_files = []
+    for offset, (comp_id, comp_name) in enumerate(_COMPETITIONS.items()):
+        name = f"calendar_{comp_id}.json"
+        _write_json(name, _generate_calendar(rng, comp_id, comp_name, 700000 + offset * 10000))
+        calendar_files.append(name)
+    game_id = 912345
+    _write_json("online_game.json", _generate_online(rng, game_id))
+    _write_text("letobasket.html", _generate_letobasket_page(rng, game_id))
+    _write_text("protocol.html", _generate_protocol_page(rng))
+    _write_json("service_sheet.json.gz", {"rows": _generate_service_rows(rng, 5000)})
+    _write_json("config_sheet.json", {"rows": _generate_config_rows()}, compact=False)
+    _write_json(MANIFEST_FILE, {
+        "source": "synthetic",
+        "seed": seed,
+        "calendars": calendar_files,
+        "online": "online_game.json",
+        "letobasket": "letobasket.html",
+        "letobasket_url": "http://letobasket.ru/",
+        "fallback_query": {"team1": _OUR_TEAMS[1001][0], "team2": _OPPONENTS[0]},
+        "protocol": "protocol.html",
+        "service_sheet": "service_sheet.json.gz",
+        "config_sheet": "config_sheet.json",
+    }, compact=False)
+    print(f"✅ Фикстуры созданы в {FIXTURES_DIR}")
+
+
+async def record_fixtures(args: argparse.Namespace) -> None:
+    """Записывает живые ответы Infobasket/letobasket (и листы таблицы с --record-sheets)"""
+    import aiohttp
+
+    manifest = load_manifest() if os.path.exists(_fixture_path(MANIFEST_FILE)) else {}
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
+        async def fetch(url: str) -> str:
+            async with session.get(url) as response:
+                response.raise_for_status()
+                return await response.text()
+
+        if args.comps:
+            calendar_files = []
+            for comp_id in args.comps:
+                name = f"calendar_{comp_id}.json"
+                body = await fetch(f"https://reg.infobasket.su/Comp/GetCalendar/?comps={comp_id}&format=json")
+                _write_json(name, json.loads(body))
+                calendar_files.append(name)
+            manifest["calendars"] = calendar_files
+        if args.game:
+            body = await fetch(f"https://reg.infobasket.su/Widget/GetOnline/{args.game}?format=json&lang=ru")
+            _write_json("online_game.json", json.loads(body))
+            manifest["online"] = "online_game.json"
+        if args.protocol_url:
+            _write_text("protocol.html", await fetch(args.protocol_url))
+            manifest["protocol"] = "protocol.html"
+        letobasket_url = manifest.get("letobasket_url", "http://letobasket.ru/")
+        _write_text("letobasket.html", await fetch(letobasket_url))
+        manifest["letobasket"] = "letobasket.html"
+
+    if args.record_sheets:
+        from enhanced_duplicate_protection import duplicate_protection
+        _write_json("service_sheet.json.gz", {"rows": duplicate_protection.storage.read_all()[1:]})
+        if duplicate_protection.config_worksheet:
+            _write_json("config_sheet.json", {"rows": duplicate_protection.config_worksheet.get_all_values()})
+
+    manifest["source"] = "recorded"
+    manifest["recorded_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    _write_json(MANIFEST_FILE, manifest, compact=False)
+    print(f"✅ Фикстуры записаны в {FIXTURES_DIR}")
+
+
+# --- Окружение и воспроизведение ответов ---------------------------------
+
+
+def configure_environment(work_dir: str) -> None:
+    """Локальные хранилища во временном каталоге; ограничитель квоты Sheets не мешает замерам"""
+    os.environ["SERVICE_STORAGE"] = "sqlite"
+    os.environ["SERVICE_SQLITE_PATH"] = os.path.join(work_dir, "service_sheet.sqlite3")
+    os.environ["SERVICE_SQLITE_MIRROR"] = "false"
+    os.environ["COMP_NAMES_PATH"] = os.path.join(work_dir, "comp_names.json")
+    os.environ["SHEETS_READ_QUOTA_PER_MINUTE"] = "1000000"
+    os.environ["SHEETS_WRITE_QUOTA_PER_MINUTE"] = "1000000"
+    os.environ.pop("GOOGLE_SHEETS_CREDENTIALS", None)
+
+
+class RecordedWorksheet:
+    """Лист таблицы из фикстуры (только чтение)"""
+
+    def __init__(self, title: str, rows: List[List[str]]) -> None:
+        self.title = title
+        self._rows = rows
+
+    def get_all_values(self) -> List[List[str]]:
+        return [list(row) for row in self._rows]
+
+
+class _RecordedResponse:
+    def __init__(self, status: int, body: str) -> None:
+        self.status = status
+        self._body = body
+
+    async def text(self) -> str:
+        return self._body
+
+    async def json(self, **_: Any) -> Any:
+        return json.loads(self._body)
+
+    async def __aenter__(self) -> "_RecordedResponse":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> bool:
+        return False
+
+
+class RecordedSession:
+    """HTTP-сессия, отдающая записанные страницы по URL (остальные — 404)"""
+
+    closed = False
+
+    def __init__(self, pages: Dict[str, str]) -> None:
+        self.pages = pages
+
+    def get(self, url: str, **_: Any) -> _RecordedResponse:
+        body = self.pages.get(url)
+        return _RecordedResponse(200 if body is not None else 404, body or "")
+
+
+# --- Замеры ---------------------------------------------------------------
+
+
+def build_cases(manifest: Dict[str, Any], loop: asyncio.AbstractEventLoop) -> List[BenchmarkCase]:
+    from enhanced_duplicate_protection import duplicate_protection
+    from enhanced_game_parser import EnhancedGameParser
+    from game_system_manager import GameSystemManager
+    from html_extract import page_text
+    from infobasket_smart_parser import InfobasketSmartParser
+    from play_by_play import forget_game
+
+    # Сервисный лист — в локальном SQLite, лист "Конфиг" — из фикстуры
+    service_rows = _read_json(manifest["service_sheet"])["rows"]
+    duplicate_protection.storage.insert_rows(service_rows)
+    config_rows = _read_json(manifest["config_sheet"])["rows"]
+    duplicate_protection.config_worksheet = cast("Worksheet", RecordedWorksheet("Конфиг", config_rows))
+
+    manager = GameSystemManager()
+    team_directory = manager.team_directory
+
+    games: List[Dict[str, Any]] = []
+    for name in manifest["calendars"]:
+        games.extend(_read_json(name))
+    by_ids = InfobasketSmartParser(manager.config_comp_ids, manager.config_team_ids, manager.team_name_keywords)
+    by_names = InfobasketSmartParser(manager.config_comp_ids, [], manager.team_name_keywords)
+
+    online = _read_json(manifest["online"])
+    api_data = {"game": online, "online": online}
+    game_id = online.get("GameID")
+    parser = EnhancedGameParser(team_directory=team_directory)
+
+    protocol_text = page_text(_read_text(manifest["protocol"]))
+
+    letobasket_url = manifest["letobasket_url"]
+    # Записанная страница вместо сети: для _search_fallback_source достаточно get()
+    session = cast("aiohttp.ClientSession", RecordedSession({letobasket_url: _read_text(manifest["letobasket"])}))
+    query = manifest["fallback_query"]
+    own_matcher = manager._build_variant_matcher(query["team1"], *manager.team_name_keywords)
+    opponent_matcher = manager._build_variant_matcher(query["team2"])
+
+    # Проверки дубликатов: половина существующих ключей, половина отсутствующих
+    probes = []
+    rng = random.Random(7)
+    for row in rng.sample(service_rows, 100):
+        probes.append((row[0], row[2][len(row[0]) + 1:]))
+    probes.extend((rng.choice(_SERVICE_TYPES), f"missing_{index}") for index in range(100))
+
+    def check_probes() -> int:
+        return sum(1 for data_type, identifier in probes if duplicate_protection.check_duplicate(data_type, identifier).get("exists"))
+
+    def forget_processor() -> None:
+        forget_game(game_id)
+
+    return [
+        BenchmarkCase(f"filter_games_by_teams[ids,{len(games)}]", lambda: by_ids.filter_games_by_teams(games)),
+        BenchmarkCase(f"filter_games_by_teams[names,{len(games)}]", lambda: by_names.filter_games_by_teams(games)),
+        BenchmarkCase(f"categorize_games[{len(games)}]", lambda: by_ids.categorize_games(games)),
+        BenchmarkCase(
+            "parse_game_info",
+            lambda: loop.run_until_complete(parser.parse_game_info(api_data, "")),
+            setup=forget_processor,
+        ),
+        BenchmarkCase("extract_player_statistics", lambda: parser.extract_player_statistics(api_data)),
+        BenchmarkCase("_compute_quarter_scores[cold]", lambda: parser._compute_quarter_scores(online)),
+        BenchmarkCase("_compute_quarter_scores[repoll]", lambda: parser._compute_quarter_scores(online, game_id)),
+        BenchmarkCase("parse_protocol_statistics", lambda: parser.parse_protocol_statistics(protocol_text)),
+        BenchmarkCase(
+            "_search_fallback_source",
+            lambda: loop.run_until_complete(
+                manager._search_fallback_source(session, letobasket_url, own_matcher, opponent_matcher)
+            ),
+        ),
+        BenchmarkCase(
+            f"check_duplicate[cold,{len(service_rows)} rows]",
+            check_probes,
+            setup=duplicate_protection.invalidate_service_snapshot,
+        ),
+        BenchmarkCase(f"check_duplicate[snapshot,{len(probes)} probes]", check_probes),
+        BenchmarkCase("_read_config_from_config_sheet", duplicate_protection._read_config_from_config_sheet),
+    ]
+
+
+def measure(case: BenchmarkCase, runs: int) -> Dict[str, Any]:
+    timings = []
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(runs):
+            if case.setup is not None:
+                case.setup()
+            started = time.perf_counter()
+            case.func()
+            timings.append(time.perf_counter() - started)
+    return {
+        "best_ms": round(min(timings) * 1000, 4),
+        "median_ms": round(statistics.median(timings) * 1000, 4),
+        "runs": runs,
+    }
+
+
+# --- История и сравнение ---------------------------------------------------
+
+
+def current_commit() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip()
+        return f"{commit}-dirty" if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def load_history(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, "r", encoding="utf-8") as history_file:
+        for line in history_file:
+            line = line.strip()
+            if line:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    return records
+
+
+def append_history(path: str, record: Dict[str, Any]) -> None:
+    history_dir = os.path.dirname(path)
+    if history_dir:
+        os.makedirs(history_dir, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as history_file:
+        history_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def find_baseline(history: List[Dict[str, Any]], commit: str, baseline: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Последний запуск на указанном коммите или, по умолчанию, на любом другом коммите"""
+    for record in reversed(history):
+        if baseline is not None:
+            if record.get("commit", "").startswith(baseline):
+                return record
+        elif record.get("commit") != commit:
+            return record
+    return None
+
+
+def compare(record: Dict[str, Any], baseline: Optional[Dict[str, Any]], threshold: float) -> List[str]:
+    """Отмечает изменения относительно базового запуска, возвращает имена регрессий"""
+    regressions = []
+    previous = (baseline or {}).get("results", {})
+    for name, result in record["results"].items():
+        before = previous.get(name)
+        if not before or not before.get("best_ms"):
+            result["change"] = None
+            continue
+        change = result["best_ms"] / before["best_ms"] - 1
+        result["change"] = round(change, 3)
+        if change > threshold and result["best_ms"] - before["best_ms"] > NOISE_FLOOR_MS:
+            result["regression"] = True
+            regressions.append(name)
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарки горячих путей на записанных фикстурах")
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--only", nargs="*", default=None, help="подстроки имён замеров")
+    parser.add_argument("--json", action="store_true", help="вывести результаты в JSON")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_PATH, help="файл истории (JSON Lines)")
+    parser.add_argument("--no-history", action="store_true", help="не записывать запуск в историю")
+    parser.add_argument("--baseline", default=None, help="коммит для сравнения (по умолчанию — предыдущий в истории)")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимое замедление (0.2 = 20%%)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="код выхода 1 при регрессии")
+    parser.add_argument("--generate-fixtures", action="store_true", help="пересоздать синтетические фикстуры")
+    parser.add_argument("--record", action="store_true", help="записать живые ответы вместо синтетических")
+    parser.add_argument("--comps", nargs="*", type=int, default=[], help="CompID для записи календарей")
+    parser.add_argument("--game", type=int, default=None, help="GameID для записи GetOnline")
+    parser.add_argument("--protocol-url", default=None, help="страница игры с protocol-статистикой")
+    parser.add_argument("--record-sheets", action="store_true", help="записать сервисный лист и лист 'Конфиг'")
+    args = parser.parse_args()
+
+    if args.generate_fixtures:
+        generate_fixtures()
+        return 0
+    if args.record:
+        asyncio.run(record_fixtures(args))
+        return 0
+
+    manifest = load_manifest()
+    with tempfile.TemporaryDirectory(prefix="pullup-bench-") as work_dir:
+        configure_environment(work_dir)
+        loop = asyncio.new_event_loop()
+        try:
+            with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+                cases = build_cases(manifest, loop)
+            if args.only:
+                cases = [case for case in cases if any(part in case.name for part in args.only)]
+            results = {case.name: measure(case, args.runs) for case in cases}
+        finally:
+            loop.close()
+
+    commit = current_commit()
+    record = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "fixtures": manifest.get("source", "unknown"),
+        "results": results,
+    }
+    history = load_history(args.history)
+    baseline = find_baseline(history, commit, args.baseline)
+    regressions = compare(record, baseline, args.threshold)
+    record["baseline"] = baseline.get("commit") if baseline else None
+    if not args.no_history:
+        append_history(args.history, record)
+
+    if args.json:
+        print(json.dumps(record, ensure_ascii=False, indent=2))
+    else:
+        print(f"⏱️ Бенчмарки (лучшее из {args.runs}), коммит {commit}, фикстуры: {record['fixtures']}")
+        if baseline:
+            print(f"   Сравнение с {baseline.get('commit')} ({baseline.get('timestamp')})")
+        for name, result in results.items():
+            change = result.get("change")
+            change_text = f" ({change:+.0%})" if change is not None else ""
+            status = "❌" if result.get("regression") else "✅"
+            print(f"   {status} {name}: {result['best_ms']} мс, медиана {result['median_ms']} мс{change_text}")
+        if regressions:
+            print(f"⚠️ Регрессии больше {args.threshold:.0%}: {', '.join(regressions)}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
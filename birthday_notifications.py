@@ -11,7 +11,7 @@ from dotenv import load_dotenv
 from datetime_utils import get_moscow_time
 from enhanced_duplicate_protection import duplicate_protection
 from datetime_utils import log_current_time
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 # Загружаем переменные окружения
 load_dotenv()
@@ -31,8 +31,11 @@ def should_check_birthdays() -> bool:
     now = get_moscow_time()
     return now.hour == 9  # Проверяем весь час с 09:00 до 09:59 по Москве
 
-async def check_birthdays():
-    """Проверяет дни рождения и отправляет уведомления"""
+async def check_birthdays(bot: Optional[Any] = None):
+    """Проверяет дни рождения и отправляет уведомления
+
+    bot — общий экземпляр telegram.Bot (ежедневный оркестратор), иначе создаётся свой.
+    """
     try:
         # Используем централизованное логирование времени
         time_info = log_current_time()
@@ -46,11 +49,12 @@ async def check_birthdays():
         # Импортируем менеджер игроков
         from players_manager import PlayersManager
         
-        # Создаем менеджер
-        manager = PlayersManager()
+        # Создаем менеджер (через уже открытую таблицу защиты от дублирования);
+        # запросы к листу "Игроки" и паузы квоты выполняются вне event loop
+        manager = await asyncio.to_thread(PlayersManager, spreadsheet=duplicate_protection.spreadsheet)
         
         # Получаем игроков с днями рождения сегодня
-        birthday_players = manager.get_players_with_birthdays_today()
+        birthday_players = await asyncio.to_thread(manager.get_players_with_birthdays_today)
         
         if not birthday_players:
             print("📅 Сегодня нет дней рождения.")
@@ -88,21 +92,23 @@ async def check_birthdays():
         
         # Отправляем уведомления
         if birthday_messages:
-            # Инициализируем бота напрямую
-            bot_token = os.getenv("BOT_TOKEN")
-            if not bot_token:
-                print("❌ BOT_TOKEN не настроен")
-                return
-            
-            from telegram import Bot
-            current_bot = Bot(token=bot_token)
+            current_bot = bot
+            if current_bot is None:
+                # Инициализируем бота напрямую
+                bot_token = os.getenv("BOT_TOKEN")
+                if not bot_token:
+                    print("❌ BOT_TOKEN не настроен")
+                    return
+                
+                from telegram import Bot
+                current_bot = Bot(token=bot_token)
             
             chat_id = os.getenv("CHAT_ID")
             if not chat_id:
                 print("❌ CHAT_ID не настроен")
                 return
 
-            automation_topics = duplicate_protection.get_config_ids().get("automation_topics") or {}
+            automation_topics = (await duplicate_protection.aget_config_ids()).get("automation_topics") or {}
             birthday_settings = automation_topics.get("BIRTHDAY_NOTIFICATIONS", {})
             birthday_topic_id = None
             if isinstance(birthday_settings, dict):
@@ -135,7 +141,7 @@ async def check_birthdays():
                     today = get_moscow_time().strftime('%d.%m.%Y')
                     
                     additional_info = f"{surname} {first_name} ({age} {get_years_word(age)})"
-                    duplicate_protection.add_record(
+                    await duplicate_protection.aadd_record(
                         "ДЕНЬ_РОЖДЕНИЯ",
                         f"birthday_{today}_{surname}_{first_name}",
                         "ОТПРАВЛЕНО",
@@ -144,6 +150,8 @@ async def check_birthdays():
                     
                 except Exception as e:
                     print(f"❌ Ошибка отправки уведомления {i}: {e}")
+            
+            await duplicate_protection.aflush_pending_writes()
         
     except Exception as e:
         print(f"❌ Ошибка проверки дней рождения: {e}")
@@ -157,15 +165,15 @@ async def test_birthday_notifications():
         from players_manager import PlayersManager
         
         # Создаем менеджер
-        manager = PlayersManager()
+        manager = await asyncio.to_thread(PlayersManager)
         print("✅ PlayersManager инициализирован")
         
         # Получаем всех игроков
-        all_players = manager.get_all_players()
+        all_players = await asyncio.to_thread(manager.get_all_players)
         print(f"📊 Всего игроков: {len(all_players)}")
         
         # Получаем игроков с днями рождения сегодня
-        birthday_players = manager.get_players_with_birthdays_today()
+        birthday_players = await asyncio.to_thread(manager.get_players_with_birthdays_today)
         print(f"🎂 Дней рождения сегодня: {len(birthday_players)}")
         
         if birthday_players:
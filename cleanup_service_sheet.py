@@ -12,69 +12,47 @@ async def cleanup_service_sheet():
     print("=" * 60)
     
     try:
-        if not duplicate_protection.gc:
-            print("❌ Google Sheets не подключен")
-            return False
-        
-        if not duplicate_protection.service_worksheet:
-            print("❌ Лист 'Сервисный' не найден")
+        if not await duplicate_protection.aservice_storage_ready():
+            print("❌ Сервисное хранилище недоступно (Google Sheets не подключен или лист 'Сервисный' не найден)")
             return False
         
         print("✅ Система готова к очистке")
         
         # Получаем статистику до очистки
         print(f"\n📊 СТАТИСТИКА ДО ОЧИСТКИ:")
-        stats_before = duplicate_protection.get_statistics()
+        stats_before = await duplicate_protection.aget_statistics()
         if 'error' not in stats_before:
             for data_type, data in stats_before.items():
                 print(f"   📊 {data_type}: {data['total']} записей")
         
         cleanup_results = []
         
-        # Универсальная очистка записей старше 30 дней
-        global_cleanup = duplicate_protection.cleanup_expired_records(30)
-        if global_cleanup.get('success'):
-            cleaned_count = global_cleanup.get('cleaned_count', 0)
-            print(f"\n🧽 Общая очистка: удалено {cleaned_count} записей старше 30 дней")
-            if cleaned_count > 0:
-                cleanup_results.append(f"ВСЕ ТИПЫ: {cleaned_count} записей")
+        # Универсальная очистка записей старше 30 дней и очистка по типам
+        # выполняются за один проход по снимку листа и одним batchUpdate
+        per_type_days = {
+            "ОПРОС_ТРЕНИРОВКА": 30,  # Старые опросы тренировок
+            "ОПРОС_ИГРА": 30,  # Старые опросы игр
+            "АНОНС_ИГРА": 30,  # Старые анонсы игр
+            "УВЕДОМЛЕНИЕ": 30,  # Старые уведомления
+            "РЕЗУЛЬТАТ_ИГРА": 30,  # Старые результаты игр
+            "ДЕНЬ_РОЖДЕНИЯ": 30,  # Старые дни рождения
+        }
+        cleanup = await duplicate_protection.acleanup_records(max_age_days=30, per_type_days=per_type_days)
+        if cleanup.get('success'):
+            # Общий срок и сроки по типам считаются раздельно: каждая строка учтена один раз
+            expired_count = cleanup.get('expired_count', 0)
+            print(f"\n🧽 Общая очистка: удалено {expired_count} записей старше 30 дней")
+            if expired_count > 0:
+                cleanup_results.append(f"ВСЕ ТИПЫ: {expired_count} записей")
+            by_type = cleanup.get('by_type', {})
+            for data_type in per_type_days:
+                cleanup_results.append(f"{data_type}: {by_type.get(data_type, 0)} записей")
         else:
-            print(f"\n⚠️ Общая очистка не выполнена: {global_cleanup.get('error')}")
-        
-        # Очищаем старые записи по типам
-        # Очищаем старые опросы тренировок (старше 30 дней)
-        result = duplicate_protection.cleanup_old_records("ОПРОС_ТРЕНИРОВКА", 30)
-        if result['success']:
-            cleanup_results.append(f"ОПРОС_ТРЕНИРОВКА: {result['cleaned_count']} записей")
-        
-        # Очищаем старые опросы игр (старше 30 дней)
-        result = duplicate_protection.cleanup_old_records("ОПРОС_ИГРА", 30)
-        if result['success']:
-            cleanup_results.append(f"ОПРОС_ИГРА: {result['cleaned_count']} записей")
-        
-        # Очищаем старые анонсы игр (старше 30 дней)
-        result = duplicate_protection.cleanup_old_records("АНОНС_ИГРА", 30)
-        if result['success']:
-            cleanup_results.append(f"АНОНС_ИГРА: {result['cleaned_count']} записей")
-        
-        # Очищаем старые уведомления (старше 30 дней)
-        result = duplicate_protection.cleanup_old_records("УВЕДОМЛЕНИЕ", 30)
-        if result['success']:
-            cleanup_results.append(f"УВЕДОМЛЕНИЕ: {result['cleaned_count']} записей")
-        
-        # Очищаем старые результаты игр (старше 30 дней)
-        result = duplicate_protection.cleanup_old_records("РЕЗУЛЬТАТ_ИГРА", 30)
-        if result['success']:
-            cleanup_results.append(f"РЕЗУЛЬТАТ_ИГРА: {result['cleaned_count']} записей")
-        
-        # Очищаем старые дни рождения (старше 30 дней)
-        result = duplicate_protection.cleanup_old_records("ДЕНЬ_РОЖДЕНИЯ", 30)
-        if result['success']:
-            cleanup_results.append(f"ДЕНЬ_РОЖДЕНИЯ: {result['cleaned_count']} записей")
+            print(f"\n⚠️ Очистка не выполнена: {cleanup.get('error')}")
         
         # Получаем статистику после очистки
         print(f"\n📊 СТАТИСТИКА ПОСЛЕ ОЧИСТКИ:")
-        stats_after = duplicate_protection.get_statistics()
+        stats_after = await duplicate_protection.aget_statistics()
         if 'error' not in stats_after:
             for data_type, data in stats_after.items():
                 print(f"   📊 {data_type}: {data['total']} записей")
@@ -6,11 +6,21 @@
     from comp_names import get_comp_name, register_comp_name
     name = get_comp_name(107896)  # вернет сохранённое имя или пустую строку
 
-Вы можете расширять словарь вручную ниже, либо вызывать register_comp_name
-во время рантайма после получения данных Widget/CompIssue/{CompID}.
+Справочник пополняется сам: парсеры передают сюда ответы GetCalendar и
+Widget/GetOnline (register_from_payload), названия из CompNameRu
+сохраняются в файл COMP_NAMES_PATH и доступны в следующих запусках без
+обращения к сети. warm_up_comp_names заранее заполняет справочник для
+всех настроенных comp_ids. Словарь ниже можно по-прежнему дополнять вручную —
+ручные названия имеют приоритет над найденными автоматически.
 """
 
-from typing import Dict, Optional
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+COMP_NAMES_PATH = os.getenv("COMP_NAMES_PATH", os.path.join(".cache", "comp_names.json"))
+COMP_CALENDAR_URL = "{base_url}/Comp/GetCalendar/?comps={comp_id}&format=json"
 
 _COMP_NAMES: Dict[int, str] = {
     # Примеры: заполните по мере необходимости
@@ -18,12 +28,129 @@ _COMP_NAMES: Dict[int, str] = {
     # 109465: "Первая Лига — Группа A",
 }
 
+# Названия, найденные в ответах API (загружаются из файла при первом обращении)
+_LEARNED_NAMES: Dict[int, str] = {}
+_loaded = False
+_lock = threading.Lock()
+
+
+def _to_comp_id(value: Any) -> Optional[int]:
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _ensure_loaded() -> None:
+    global _loaded
+    if _loaded:
+        return
+    with _lock:
+        if _loaded:
+            return
+        try:
+            with open(COMP_NAMES_PATH, "r", encoding="utf-8") as names_file:
+                stored = json.load(names_file)
+            for key, name in (stored or {}).items():
+                comp_id = _to_comp_id(key)
+                if comp_id is not None and isinstance(name, str) and name.strip():
+                    _LEARNED_NAMES[comp_id] = name.strip()
+        except (OSError, ValueError):
+            pass
+        _loaded = True
+
+
+def _save() -> None:
+    try:
+        names_dir = os.path.dirname(COMP_NAMES_PATH)
+        if names_dir:
+            os.makedirs(names_dir, exist_ok=True)
+        tmp_path = f"{COMP_NAMES_PATH}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as names_file:
+            json.dump({str(key): value for key, value in sorted(_LEARNED_NAMES.items())}, names_file, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, COMP_NAMES_PATH)
+    except OSError as e:
+        print(f"⚠️ Не удалось сохранить справочник соревнований: {e}")
+
+
 def get_comp_name(comp_id: Optional[int]) -> str:
-    if not isinstance(comp_id, int):
+    comp_id = _to_comp_id(comp_id)
+    if comp_id is None:
         return ""
-    return _COMP_NAMES.get(comp_id, "")
+    if comp_id in _COMP_NAMES:
+        return _COMP_NAMES[comp_id]
+    _ensure_loaded()
+    return _LEARNED_NAMES.get(comp_id, "")
+
 
 def register_comp_name(comp_id: int, name: str) -> None:
-    if isinstance(comp_id, int) and name:
-        _COMP_NAMES[comp_id] = name.strip()
+    register_comp_names({comp_id: name})
+
+
+def register_comp_names(names: Dict[Any, Any]) -> int:
+    """Сохраняет несколько названий разом, возвращает количество новых/изменённых"""
+    _ensure_loaded()
+    changed = 0
+    with _lock:
+        for raw_id, raw_name in names.items():
+            comp_id = _to_comp_id(raw_id)
+            name = raw_name.strip() if isinstance(raw_name, str) else ""
+            if comp_id is None or not name or _LEARNED_NAMES.get(comp_id) == name:
+                continue
+            _LEARNED_NAMES[comp_id] = name
+            changed += 1
+        if changed:
+            _save()
+    return changed
+
+
+def register_from_payload(payload: Any, default_comp_id: Optional[int] = None) -> int:
+    """Находит пары CompID/CompNameRu в ответе API (GetCalendar, GetOnline) и сохраняет их"""
+    found: Dict[int, str] = {}
+    items: Iterable[Any] = payload if isinstance(payload, list) else [payload]
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        name = item.get("CompNameRu")
+        comp_id = _to_comp_id(item.get("CompID"))
+        if comp_id is None:
+            comp_id = default_comp_id
+        if comp_id is not None and isinstance(name, str) and name.strip() and comp_id not in found:
+            found[comp_id] = name
+    return register_comp_names(found) if found else 0
+
+
+async def warm_up_comp_names(
+    comp_ids: Iterable[Any],
+    session: Optional[Any] = None,
+    base_url: Optional[str] = None,
+) -> List[int]:
+    """Заполняет справочник для comp_ids без названия; возвращает ID, которые найти не удалось.
+
+    Используется тот же URL календаря, что и в InfobasketSmartParser, поэтому
+    в пределах запуска запрос не повторяется (single-flight и HTTP-кэш).
+    base_url — адрес reg-API (по умолчанию INFOBASKET_BASE_URL или reg.infobasket.su).
+    """
+    import asyncio
+    from http_client import INFOBASKET_BASE_URL, cached_get
+
+    base_url = (base_url or INFOBASKET_BASE_URL or "https://reg.infobasket.su").rstrip("/")
+
+    missing = sorted({comp_id for comp_id in map(_to_comp_id, comp_ids) if comp_id is not None and not get_comp_name(comp_id)})
+    if not missing:
+        return []
+
+    async def fetch(comp_id: int) -> None:
+        try:
+            async with cached_get(COMP_CALENDAR_URL.format(base_url=base_url, comp_id=comp_id), session) as response:
+                if response.status == 200:
+                    register_from_payload(await response.json(), default_comp_id=comp_id)
+        except Exception as e:
+            print(f"⚠️ Не удалось получить название соревнования {comp_id}: {e}")
 
+    await asyncio.gather(*(fetch(comp_id) for comp_id in missing))
+    unresolved = [comp_id for comp_id in missing if not get_comp_name(comp_id)]
+    print(f"📚 Справочник соревнований: найдено {len(missing) - len(unresolved)} из {len(missing)} новых названий")
+    return unresolved
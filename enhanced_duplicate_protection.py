@@ -5,13 +5,28 @@
 """
 
 import os
+import asyncio
+import atexit
+import contextvars
+import copy
+import functools
+import hashlib
 import json
 import re
-from typing import Any, Dict, List, Optional, Set, Tuple
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, TypeVar
 from dotenv import load_dotenv
 import gspread
 from google.oauth2.service_account import Credentials
 from datetime_utils import get_moscow_time
+from lazy_singleton import LazySingleton
+from service_storage import GoogleSheetsServiceStorage, RecordKey, ServiceStorage, create_service_storage, record_key
+from sheets_rate_limiter import sheets_rate_limiter
+from team_matcher import TeamAliasMatcher
+
+T = TypeVar("T")
 
 SERVICE_HEADER = [
     "ТИП ДАННЫХ",
@@ -32,6 +47,26 @@ SERVICE_HEADER = [
     "TEAM B ID",
 ]
 
+# Имена колонок в локальном хранилище (SQLite), в порядке SERVICE_HEADER
+SERVICE_COLUMN_NAMES = [
+    "data_type",
+    "created_at",
+    "unique_key",
+    "status",
+    "additional_data",
+    "link",
+    "comp_id",
+    "team_id",
+    "alt_name",
+    "settings",
+    "game_id",
+    "game_date",
+    "game_time",
+    "arena",
+    "team_a_id",
+    "team_b_id",
+]
+
 # Индексы колонок (0-based)
 TYPE_COL = 0
 DATE_COL = 1
@@ -156,6 +191,10 @@ load_dotenv()
 GOOGLE_SHEETS_CREDENTIALS = os.getenv("GOOGLE_SHEETS_CREDENTIALS")
 SPREADSHEET_ID = os.getenv("SPREADSHEET_ID")
 TEST_MODE = os.getenv("TEST_MODE", "false").lower() == "true"  # Тестовый режим
+# Снимок конфигурации на диске (переиспользуется, пока не изменился лист "Конфиг")
+CONFIG_CACHE_PATH = os.getenv("CONFIG_CACHE_PATH", os.path.join(".cache", "config_snapshot.json"))
+# Как долго (сек) в пределах процесса не перепроверять ревизию листа "Конфиг"
+CONFIG_REVISION_CHECK_INTERVAL = float(os.getenv("CONFIG_REVISION_CHECK_INTERVAL", "60"))
 
 # Настройки Google Sheets
 SCOPES = [
@@ -165,6 +204,296 @@ SCOPES = [
 
 MAX_CONFIG_COLUMNS = max(len(CONFIG_HEADER), len(VOTING_SECTION_HEADER))
 
+# Версия разметки таблицы. Хранится в developer metadata таблицы: если она
+# совпадает, проверки заголовков и разделов листа "Конфиг" пропускаются.
+# Отпечаток считается по описанию разметки, поэтому меняется автоматически
+# при правке заголовков и разделов; SCHEMA_VERSION повышается вручную, если
+# миграции нужно перезапустить без изменения констант.
+SCHEMA_VERSION = 1
+SCHEMA_METADATA_KEY = "pullup_bot_schema_version"
+SCHEMA_FINGERPRINT = "{}:{}".format(
+    SCHEMA_VERSION,
+    hashlib.sha1(
+        json.dumps(
+            [
+                SERVICE_HEADER,
+                CONFIG_HEADER,
+                VOTING_SECTION_HEADER,
+                VOTING_SECTION_END_MARKER,
+                AUTOMATION_SECTION_HEADER,
+                AUTOMATION_SECTION_END_MARKER,
+                AUTOMATION_DEFAULT_ROWS,
+            ],
+            ensure_ascii=False,
+        ).encode("utf-8")
+    ).hexdigest()[:12],
+)
+
+_KEY_NON_WORD = re.compile(r"[\W_]+")
+
+
+def _normalize_key_text(text: str) -> str:
+    """Нормализация ключа записи для поиска команд: только буквы и цифры в нижнем регистре"""
+    return _KEY_NON_WORD.sub("", text.lower())
+
+
+def _key_variant_matcher(team_name: str) -> TeamAliasMatcher:
+    """Матчер вариантов названия команды для поиска в ключах сервисного листа.
+
+    Варианты: название целиком, нормализованное название и слова длиннее двух
+    символов; варианты короче трёх символов не учитываются.
+    """
+    variants: List[str] = []
+    if team_name:
+        lowered = team_name.lower()
+        variants.append(lowered)
+        variants.append(_normalize_key_text(lowered))
+        variants.extend(part for part in lowered.replace('-', ' ').replace('_', ' ').split() if len(part) > 2)
+    return TeamAliasMatcher(variants, normalize=lambda variant: variant, min_length=3)
+
+
+class _SnapshotEntry:
+    """Строка сервисного листа внутри снимка.
+
+    stored_key — ключ записи в том виде, в котором она лежит в хранилище: по нему
+    SQLite находит строку при обновлении и удалении (values меняются раньше записи).
+    """
+
+    __slots__ = ("order", "values", "stored_key")
+
+    def __init__(self, order: int, values: List[str]) -> None:
+        self.order = order
+        self.values = values
+        self.stored_key: RecordKey = record_key(values)
+
+
+class ServiceSheetSnapshot:
+    """Снимок листа 'Сервисный' в памяти с хеш-индексами.
+
+    Лист читается один раз за запуск, дальше все выборки идут по индексам:
+    (тип, уникальный ключ), (тип, GAME ID), (тип, дата), (тип, префикс
+    идентификатора в ключе), уникальный ключ и тип.
+    Собственные записи (добавление строки, обновление статуса и строки)
+    применяются к снимку, поэтому он остаётся согласованным с таблицей.
+
+    Новые записи встают сразу под заголовок (как insert_row(index=2)), поэтому
+    порядок строк хранится в order: чем выше строка, тем меньше order, а номер
+    строки считается от order самой верхней записи.
+    """
+
+    def __init__(self, all_data: List[List[str]]) -> None:
+        self.header: List[str] = list(all_data[0]) if all_data else []
+        self._entries: List[_SnapshotEntry] = []
+        self._by_key: Dict[Tuple[str, str], _SnapshotEntry] = {}
+        self._by_unique_key: Dict[str, _SnapshotEntry] = {}
+        self._by_game: Dict[Tuple[str, str], _SnapshotEntry] = {}
+        self._by_date: Dict[Tuple[str, str], List[_SnapshotEntry]] = {}
+        self._by_type: Dict[str, List[_SnapshotEntry]] = {}
+        self._by_prefix: Dict[Tuple[str, str], _SnapshotEntry] = {}
+
+        for row_number, row in enumerate(all_data[1:], start=2):
+            entry = _SnapshotEntry(row_number, self._pad(row))
+            self._entries.append(entry)
+            self._index(entry)
+        # order самой верхней строки данных (вторая строка листа)
+        self._top_order = 2
+
+    @staticmethod
+    def _pad(row: List[str]) -> List[str]:
+        values = [str(value) for value in row]
+        if len(values) < len(SERVICE_HEADER):
+            values.extend([""] * (len(SERVICE_HEADER) - len(values)))
+        return values
+
+    @staticmethod
+    def _date_key(value: str) -> str:
+        return value[:10]
+
+    @staticmethod
+    def _key_prefixes(data_type: str, unique_key: str) -> List[str]:
+        """Префиксы идентификатора в ключе по границам "_".
+
+        _create_unique_key пишет ключи как [TEST_]ТИП_идентификатор[_параметры],
+        поэтому идентификатор, который ищет find_containing, всегда начинается
+        сразу после типа: индексируются все префиксы этой части ключа.
+        """
+        body = unique_key[len("TEST_"):] if unique_key.startswith("TEST_") else unique_key
+        type_prefix = f"{data_type}_"
+        if body[:len(type_prefix)].upper() == type_prefix:
+            body = body[len(type_prefix):]
+        parts = body.split("_")
+        return ["_".join(parts[:count]) for count in range(1, len(parts) + 1)]
+
+    def _index(self, entry: _SnapshotEntry) -> None:
+        # При линейном просмотре побеждает верхняя строка, поэтому в уникальных
+        # индексах остаётся запись с меньшим номером строки
+        values = entry.values
+        data_type = values[TYPE_COL].upper()
+        self._index_unique(self._by_key, (data_type, values[KEY_COL]), entry)
+        if values[KEY_COL]:
+            self._index_unique(self._by_unique_key, values[KEY_COL], entry)
+        if values[GAME_ID_COL]:
+            self._index_unique(self._by_game, (data_type, values[GAME_ID_COL]), entry)
+        if values[KEY_COL]:
+            for prefix in self._key_prefixes(data_type, values[KEY_COL]):
+                self._index_unique(self._by_prefix, (data_type, prefix), entry)
+        self._index_ordered(self._by_date, (data_type, self._date_key(values[DATE_COL])), entry)
+        self._index_ordered(self._by_type, data_type, entry)
+
+    @staticmethod
+    def _index_unique(index: Dict[Any, _SnapshotEntry], key: Any, entry: _SnapshotEntry) -> None:
+        current = index.get(key)
+        if current is None or current.order > entry.order:
+            index[key] = entry
+
+    @staticmethod
+    def _index_ordered(index: Dict[Any, List[_SnapshotEntry]], key: Any, entry: _SnapshotEntry) -> None:
+        bucket = index.setdefault(key, [])
+        if not bucket or bucket[-1].order < entry.order:
+            bucket.append(entry)
+            return
+        position = 0
+        while position < len(bucket) and bucket[position].order < entry.order:
+            position += 1
+        bucket.insert(position, entry)
+
+    def _unindex(self, entry: _SnapshotEntry) -> None:
+        values = entry.values
+        data_type = values[TYPE_COL].upper()
+        for bucket in (
+            self._by_date.get((data_type, self._date_key(values[DATE_COL]))),
+            self._by_type.get(data_type),
+        ):
+            if bucket and entry in bucket:
+                bucket.remove(entry)
+
+        # Для уникальных индексов восстанавливаем следующую сверху строку с тем же ключом
+        same_type = self._by_type.get(data_type, [])
+        key = (data_type, values[KEY_COL])
+        if self._by_key.get(key) is entry:
+            del self._by_key[key]
+            for candidate in same_type:
+                if candidate.values[KEY_COL] == values[KEY_COL]:
+                    self._by_key[key] = candidate
+                    break
+        game_key = (data_type, values[GAME_ID_COL])
+        if self._by_game.get(game_key) is entry:
+            del self._by_game[game_key]
+            for candidate in same_type:
+                if candidate.values[GAME_ID_COL] == values[GAME_ID_COL]:
+                    self._by_game[game_key] = candidate
+                    break
+        for prefix in self._key_prefixes(data_type, values[KEY_COL]) if values[KEY_COL] else []:
+            prefix_key = (data_type, prefix)
+            if self._by_prefix.get(prefix_key) is entry:
+                del self._by_prefix[prefix_key]
+                for candidate in same_type:
+                    if candidate.values[KEY_COL] and prefix in self._key_prefixes(data_type, candidate.values[KEY_COL]):
+                        self._by_prefix[prefix_key] = candidate
+                        break
+        if self._by_unique_key.get(values[KEY_COL]) is entry:
+            del self._by_unique_key[values[KEY_COL]]
+            for candidate in self._entries:
+                if candidate is not entry and candidate.values[KEY_COL] == values[KEY_COL]:
+                    self._by_unique_key[values[KEY_COL]] = candidate
+                    break
+
+    def row_number(self, entry: _SnapshotEntry) -> int:
+        return entry.order - self._top_order + 2
+
+    def record(self, entry: _SnapshotEntry) -> Dict[str, Any]:
+        """Преобразует строку снимка в словарь записи"""
+        values = entry.values
+        return {
+            'row': self.row_number(entry),
+            'type': values[TYPE_COL],
+            'date': values[DATE_COL],
+            'unique_key': values[KEY_COL],
+            'status': values[STATUS_COL],
+            'additional_data': values[ADDITIONAL_DATA_COL],
+            'link': values[LINK_COL],
+            'comp_id': values[COMP_ID_COL],
+            'team_id': values[TEAM_ID_COL],
+            'alt_name': values[ALT_NAME_COL],
+            'settings': values[CONFIG_COL],
+            'game_id': values[GAME_ID_COL],
+            'game_date': values[GAME_DATE_COL],
+            'game_time': values[GAME_TIME_COL],
+            'arena': values[ARENA_COL],
+            'team_a_id': values[TEAM_A_ID_COL],
+            'team_b_id': values[TEAM_B_ID_COL],
+        }
+
+    # --- Выборки ---
+
+    def find_by_key(self, data_type: str, unique_key: str) -> Optional[_SnapshotEntry]:
+        return self._by_key.get((data_type.upper(), unique_key))
+
+    def find_by_unique_key(self, unique_key: str) -> Optional[_SnapshotEntry]:
+        return self._by_unique_key.get(unique_key)
+
+    def find_by_game_id(self, data_type: str, game_id: str) -> Optional[_SnapshotEntry]:
+        return self._by_game.get((data_type.upper(), game_id))
+
+    def find_containing(self, data_type: str, fragment: str) -> Optional[_SnapshotEntry]:
+        """Первая строка типа, идентификатор в ключе которой начинается с fragment (см. _key_prefixes)"""
+        return self._by_prefix.get((data_type.upper(), fragment))
+
+    def by_type(self, data_type: str) -> List[_SnapshotEntry]:
+        return list(self._by_type.get(data_type.upper(), []))
+
+    def by_date(self, data_type: str, date_str: str) -> List[_SnapshotEntry]:
+        return list(self._by_date.get((data_type.upper(), self._date_key(date_str)), []))
+
+    def rows(self) -> List[List[str]]:
+        """Все строки листа (включая заголовок) в текущем порядке"""
+        return [list(self.header)] + [list(entry.values) for entry in self._entries]
+
+    def type_counts(self) -> Dict[str, Dict[str, int]]:
+        stats: Dict[str, Dict[str, int]] = {}
+        for entry in self._entries:
+            data_type = entry.values[TYPE_COL]
+            if not data_type or data_type.startswith('===') or data_type.startswith('ТИП ДАННЫХ'):
+                continue
+            bucket = stats.setdefault(data_type, {'total': 0, 'active': 0, 'completed': 0})
+            bucket['total'] += 1
+            status = entry.values[STATUS_COL]
+            if status == 'АКТИВЕН':
+                bucket['active'] += 1
+            elif status in ['ЗАВЕРШЕН', 'ОТПРАВЛЕН', 'ОБРАБОТАН', 'ОТПРАВЛЕНО']:
+                bucket['completed'] += 1
+        return stats
+
+    # --- Применение собственных записей ---
+
+    def entries(self) -> List[_SnapshotEntry]:
+        return list(self._entries)
+
+    def without_rows(self, row_numbers: Set[int]) -> "ServiceSheetSnapshot":
+        """Новый снимок после удаления строк: оставшиеся строки сдвигаются вверх"""
+        remaining = [
+            list(entry.values) for entry in self._entries
+            if self.row_number(entry) not in row_numbers
+        ]
+        return ServiceSheetSnapshot([list(self.header)] + remaining)
+
+    def insert_top(self, values: List[str]) -> _SnapshotEntry:
+        """Отражает вставку под заголовок: новая строка становится второй, остальные сдвигаются вниз"""
+        self._top_order -= 1
+        entry = _SnapshotEntry(self._top_order, self._pad(values))
+        self._entries.insert(0, entry)
+        self._index(entry)
+        return entry
+
+    def replace_values(self, entry: _SnapshotEntry, values: List[str]) -> None:
+        self._unindex(entry)
+        entry.values = self._pad(values)
+        self._index(entry)
+
+    def set_status(self, entry: _SnapshotEntry, status: str) -> None:
+        entry.values[STATUS_COL] = status
+
+
 class EnhancedDuplicateProtection:
     """Универсальная система защиты от дублирования"""
     
@@ -173,7 +502,34 @@ class EnhancedDuplicateProtection:
         self.spreadsheet = None
         self.service_worksheet = None
         self.config_worksheet = None
+        # True, когда разметка таблицы проверена (миграцией или по версии)
+        self._schema_checked = False
+        self._service_snapshot: Optional[ServiceSheetSnapshot] = None
+        # Конфигурация в памяти: (хэш листа 'Конфиг', время проверки, конфигурация)
+        self._config_cache: Optional[Tuple[str, float, Dict[str, Any]]] = None
+        # Отложенные записи: новые строки и строки, изменённые на месте
+        self._pending_appends: List[_SnapshotEntry] = []
+        self._pending_updates: Dict[int, Tuple[_SnapshotEntry, bool]] = {}
+        # Сброс очереди может идти из нескольких задач одновременно (ежедневный оркестратор)
+        self._flush_lock = threading.Lock()
+        # Поток для вызовов из асинхронного кода: запросы gspread и паузы квоты
+        # (time.sleep в sheets_rate_limiter) не блокируют event loop, а операции
+        # со снимком по-прежнему выполняются строго по очереди
+        self._sheets_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sheets")
         self._init_google_sheets()
+        self.storage: ServiceStorage = create_service_storage(
+            GoogleSheetsServiceStorage(
+                get_worksheet=lambda: self._get_service_worksheet(raw=True),
+                get_spreadsheet=lambda: self.spreadsheet,
+                retry=self._retry_with_backoff,
+                header=SERVICE_HEADER,
+                status_col=STATUS_COL,
+            ),
+            SERVICE_HEADER,
+            SERVICE_COLUMN_NAMES,
+            STATUS_COL,
+        )
+        atexit.register(self.close)
     
     def _init_google_sheets(self):
         """Инициализация Google Sheets"""
@@ -191,37 +547,117 @@ class EnhancedDuplicateProtection:
                 self.spreadsheet = self.gc.open_by_key(SPREADSHEET_ID)
                 print("✅ Google Sheets подключен успешно")
                 
+                # Все листы получаем одним запросом метаданных
+                spreadsheet = self.spreadsheet
+                worksheets = {
+                    worksheet.title: worksheet
+                    for worksheet in self._retry_with_backoff(spreadsheet.worksheets) or []
+                }
+                
                 # Получаем лист "Сервисный"
-                try:
-                    self.service_worksheet = self.spreadsheet.worksheet("Сервисный")
+                self.service_worksheet = worksheets.get("Сервисный")
+                if self.service_worksheet:
                     print("✅ Лист 'Сервисный' подключен")
-                    self._ensure_service_header(self.service_worksheet)
-                except gspread.WorksheetNotFound:
+                else:
                     print("❌ Лист 'Сервисный' не найден")
                     print("💡 Запустите create_service_sheet.py для создания листа")
 
-                try:
-                    self.config_worksheet = self.spreadsheet.worksheet(CONFIG_WORKSHEET_NAME)
+                self.config_worksheet = worksheets.get(CONFIG_WORKSHEET_NAME)
+                config_created = False
+                if self.config_worksheet:
                     print(f"✅ Лист '{CONFIG_WORKSHEET_NAME}' подключен")
-                    self._ensure_config_header()
-                except gspread.WorksheetNotFound:
+                else:
                     print(f"⚠️ Лист '{CONFIG_WORKSHEET_NAME}' не найден, создаём его")
                     self.config_worksheet = self.spreadsheet.add_worksheet(title=CONFIG_WORKSHEET_NAME, rows=200, cols=len(CONFIG_HEADER))
-                    self._ensure_config_header()
+                    config_created = True
+                
+                self.migrate_schema(force=config_created)
             else:
                 print("❌ SPREADSHEET_ID не настроен")
                 
         except Exception as e:
             print(f"❌ Ошибка инициализации Google Sheets: {e}")
     
-    def _ensure_service_header(self, worksheet) -> None:
-        if not worksheet:
+    def _read_schema_metadata(self) -> Tuple[Optional[str], Optional[int]]:
+        """Возвращает (версия разметки, metadataId) из developer metadata таблицы"""
+        spreadsheet = self.spreadsheet
+        if not spreadsheet:
+            return None, None
+        metadata = self._retry_with_backoff(
+            lambda: spreadsheet.fetch_sheet_metadata({'fields': 'developerMetadata'})
+        ) or {}
+        for item in metadata.get('developerMetadata', []) or []:
+            if item.get('metadataKey') == SCHEMA_METADATA_KEY:
+                return item.get('metadataValue'), item.get('metadataId')
+        return None, None
+
+    def _write_schema_metadata(self, metadata_id: Optional[int]) -> None:
+        """Записывает текущую версию разметки в developer metadata таблицы"""
+        spreadsheet = self.spreadsheet
+        if not spreadsheet:
             return
+        if metadata_id is None:
+            request = {
+                'createDeveloperMetadata': {
+                    'developerMetadata': {
+                        'metadataKey': SCHEMA_METADATA_KEY,
+                        'metadataValue': SCHEMA_FINGERPRINT,
+                        'location': {'spreadsheet': True},
+                        'visibility': 'DOCUMENT',
+                    }
+                }
+            }
+        else:
+            request = {
+                'updateDeveloperMetadata': {
+                    'dataFilters': [{'developerMetadataLookup': {'metadataId': metadata_id}}],
+                    'developerMetadata': {'metadataValue': SCHEMA_FINGERPRINT},
+                    'fields': 'metadataValue',
+                }
+            }
+        self._retry_with_backoff(lambda: spreadsheet.batch_update({'requests': [request]}), kind="write")
+
+    def migrate_schema(self, force: bool = False) -> bool:
+        """Проверяет разметку листов только при смене версии.
+
+        Если версия в таблице совпадает с SCHEMA_FINGERPRINT, заголовки и разделы
+        листа "Конфиг" не перечитываются. Иначе выполняются проверки
+        _ensure_service_header / _ensure_config_header (вместе с разделами
+        голосований и автоматических сообщений) и записывается новая версия.
+        """
+        if not self.spreadsheet:
+            return False
         try:
-            header = worksheet.row_values(1)
+            stored_version, metadata_id = self._read_schema_metadata()
+        except Exception as e:
+            print(f"⚠️ Не удалось прочитать версию разметки таблицы: {e}")
+            stored_version, metadata_id = None, None
+
+        if stored_version == SCHEMA_FINGERPRINT and not force:
+            self._schema_checked = True
+            print(f"✅ Разметка таблицы актуальна (версия {SCHEMA_FINGERPRINT})")
+            return False
+
+        print(f"🔄 Миграция разметки таблицы: {stored_version or 'нет версии'} → {SCHEMA_FINGERPRINT}")
+        service_ok = self._ensure_service_header(self.service_worksheet) if self.service_worksheet else False
+        config_ok = self._ensure_config_header() if self.config_worksheet else False
+        if service_ok and config_ok:
+            try:
+                self._write_schema_metadata(metadata_id)
+                print("✅ Версия разметки таблицы сохранена")
+            except Exception as e:
+                print(f"⚠️ Не удалось сохранить версию разметки таблицы: {e}")
+        self._schema_checked = service_ok
+        return True
+
+    def _ensure_service_header(self, worksheet) -> bool:
+        if not worksheet:
+            return False
+        try:
+            header = self._retry_with_backoff(lambda: worksheet.row_values(1))
             if not header:
                 worksheet.update(f'A1:{END_COLUMN_LETTER}1', [SERVICE_HEADER])
-                return
+                return True
             desired_length = len(SERVICE_HEADER)
             if len(header) < desired_length:
                 header.extend([""] * (desired_length - len(header)))
@@ -232,34 +668,43 @@ class EnhancedDuplicateProtection:
                     updated = True
             if updated:
                 worksheet.update(f'A1:{END_COLUMN_LETTER}1', [header])
+            return True
         except Exception as e:
             print(f"⚠️ Не удалось обновить заголовок сервисного листа: {e}")
+            return False
 
-    def _ensure_config_header(self) -> None:
+    def _ensure_config_header(self) -> bool:
         worksheet = self.config_worksheet
         if not worksheet:
-            return
+            return False
         try:
-            header = worksheet.row_values(1)
+            header = self._retry_with_backoff(lambda: worksheet.row_values(1))
             if not header:
                 worksheet.update(f'A1:{chr(ord("A") + len(CONFIG_HEADER) - 1)}1', [CONFIG_HEADER])
-                return
-            desired_length = len(CONFIG_HEADER)
-            if len(header) < desired_length:
-                header.extend([""] * (desired_length - len(header)))
-            updated = False
-            for index, expected in enumerate(CONFIG_HEADER):
-                if not header[index]:
-                    header[index] = expected
-                    updated = True
-            if updated:
-                worksheet.update(f'A1:{chr(ord("A") + len(CONFIG_HEADER) - 1)}1', [header])
-            self._ensure_voting_section_structure(worksheet)
+            else:
+                desired_length = len(CONFIG_HEADER)
+                if len(header) < desired_length:
+                    header.extend([""] * (desired_length - len(header)))
+                updated = False
+                for index, expected in enumerate(CONFIG_HEADER):
+                    if not header[index]:
+                        header[index] = expected
+                        updated = True
+                if updated:
+                    worksheet.update(f'A1:{chr(ord("A") + len(CONFIG_HEADER) - 1)}1', [header])
+            # Разделы голосований и автоматических сообщений проверяются сразу,
+            # чтобы после записи версии разметки к ним не возвращаться; если раздел
+            # не удалось привести в порядок, версия не записывается
+            return (
+                self._ensure_voting_section_structure(worksheet)
+                and self._ensure_automation_section_structure(worksheet)
+            )
         except Exception as e:
             print(f"⚠️ Не удалось обновить заголовок листа '{CONFIG_WORKSHEET_NAME}': {e}")
+            return False
  
-    def _ensure_voting_section_structure(self, worksheet) -> None:
-        """Гарантирует наличие раздела для конфигурации голосований"""
+    def _ensure_voting_section_structure(self, worksheet) -> bool:
+        """Гарантирует наличие раздела для конфигурации голосований (False — не удалось)"""
         try:
             total_columns = MAX_CONFIG_COLUMNS
             padded_header = VOTING_SECTION_HEADER + [""] * (total_columns - len(VOTING_SECTION_HEADER))
@@ -348,12 +793,13 @@ class EnhancedDuplicateProtection:
                         padded_instruction,
                         value_input_option="USER_ENTERED",
                     )
-            self._ensure_automation_section_structure(worksheet)
+            return True
         except Exception as error:
             print(f"⚠️ Не удалось гарантировать структуру раздела голосований: {error}")
+            return False
 
-    def _ensure_automation_section_structure(self, worksheet) -> None:
-        """Гарантирует наличие раздела настроек автоматических сообщений"""
+    def _ensure_automation_section_structure(self, worksheet) -> bool:
+        """Гарантирует наличие раздела настроек автоматических сообщений (False — не удалось)"""
         try:
             total_columns = MAX_CONFIG_COLUMNS
             padded_header = AUTOMATION_SECTION_HEADER + [""] * (total_columns - len(AUTOMATION_SECTION_HEADER))
@@ -471,8 +917,10 @@ class EnhancedDuplicateProtection:
                 rows_padded,
                 value_input_option="USER_ENTERED",
             )
+            return True
         except Exception as error:
             print(f"⚠️ Не удалось гарантировать структуру раздела автоматических сообщений: {error}")
+            return False
 
     @staticmethod
     def _normalize_cell_text(value: Any) -> str:
@@ -561,10 +1009,168 @@ class EnhancedDuplicateProtection:
                 print("❌ Лист 'Сервисный' не найден")
                 return None
         
-        if not raw:
-            self._ensure_service_header(self.service_worksheet)
+        if not raw and not self._schema_checked:
+            # Заголовок проверяется один раз; дальше полагаемся на версию разметки
+            self._schema_checked = self._ensure_service_header(self.service_worksheet)
         return self.service_worksheet
 
+    def _service_storage_ready(self) -> bool:
+        """Проверяет доступность хранилища сервисного листа"""
+        if isinstance(self.storage, GoogleSheetsServiceStorage):
+            # Для Google таблицы заодно проверяем заголовок листа
+            return self._get_service_worksheet() is not None
+        return self.storage.is_ready()
+
+    def close(self) -> None:
+        """Записывает отложенные изменения и закрывает хранилище"""
+        self._sheets_executor.shutdown(wait=True)
+        self.flush_pending_writes()
+        self.storage.close()
+
+    def _get_service_snapshot(self) -> Optional[ServiceSheetSnapshot]:
+        """Возвращает снимок сервисного листа, загружая его при первом обращении"""
+        if self._service_snapshot is not None:
+            return self._service_snapshot
+        if not self._service_storage_ready():
+            return None
+        all_data = self.storage.read_all()
+        self._service_snapshot = ServiceSheetSnapshot(all_data)
+        print(f"📥 Снимок сервисного листа загружен: {max(len(all_data) - 1, 0)} строк")
+        return self._service_snapshot
+
+    def invalidate_service_snapshot(self) -> None:
+        """Сбрасывает снимок: следующая выборка перечитает лист (начало нового запуска)"""
+        self.flush_pending_writes()
+        self._service_snapshot = None
+
+    def _queue_update(self, entry: _SnapshotEntry, full_row: bool) -> None:
+        """Ставит изменение существующей строки в очередь записи"""
+        if entry in self._pending_appends:
+            # Строка ещё не записана: уйдёт во вставку уже с новыми значениями
+            return
+        queued = self._pending_updates.get(id(entry))
+        full_row = full_row or bool(queued and queued[1])
+        self._pending_updates[id(entry)] = (entry, full_row)
+
+    def has_pending_writes(self) -> bool:
+        return bool(self._pending_appends or self._pending_updates)
+
+    def flush_pending_writes(self) -> Dict[str, Any]:
+        """Отправляет накопленные записи: вставку новых строк под заголовок и один batch_update"""
+        if not self.has_pending_writes():
+            return {'success': True, 'appended': 0, 'updated': 0}
+
+        if not self.storage.is_ready():
+            return {'success': False, 'error': 'Лист не найден'}
+
+        with self._flush_lock:
+            appends = list(self._pending_appends)
+            updates = list(self._pending_updates.values())
+            snapshot = self._service_snapshot
+            if (not appends and not updates) or snapshot is None:
+                # Очередь уже отправила параллельная задача
+                return {'success': True, 'appended': 0, 'updated': 0}
+            try:
+                if appends:
+                    # Новые строки уже стоят в снимке сверху; в таблицу уходят в том же порядке
+                    ordered = sorted(appends, key=lambda entry: entry.order)
+                    rows = [list(entry.values) for entry in ordered]
+                    self.storage.insert_rows(rows)
+                    for entry, values in zip(ordered, rows):
+                        entry.stored_key = record_key(values)
+                    # Удаляем на месте: новые строки могли добавиться во время записи
+                    del self._pending_appends[:len(appends)]
+
+                if updates:
+                    # Номера строк считаются после вставки: лист и снимок уже совпадают
+                    batch = [
+                        (snapshot.row_number(entry), entry.stored_key, list(entry.values), full_row)
+                        for entry, full_row in updates
+                    ]
+                    self.storage.update_rows(batch)
+                    for queued, (_, _, values, full_row) in zip(updates, batch):
+                        if full_row:
+                            queued[0].stored_key = record_key(values)
+                        # Повторно изменённая за время записи строка остаётся в очереди
+                        if self._pending_updates.get(id(queued[0])) is queued:
+                            self._pending_updates.pop(id(queued[0]), None)
+
+                print(f"💾 Сервисный лист: добавлено {len(appends)} строк, обновлено {len(updates)} строк")
+                return {'success': True, 'appended': len(appends), 'updated': len(updates)}
+            except Exception as e:
+                print(f"❌ Ошибка записи отложенных изменений в сервисный лист: {e}")
+                return {'success': False, 'error': str(e)}
+
+    # --- Асинхронные варианты: те же методы в потоке Sheets ---
+
+    async def _run_in_sheets_thread(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Выполняет синхронный метод в потоке Sheets с контекстом текущей задачи
+        (этап в статистике sheets_rate_limiter хранится в contextvar)"""
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, func, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self._sheets_executor, call)
+
+    async def aservice_storage_ready(self) -> bool:
+        return await self._run_in_sheets_thread(self._service_storage_ready)
+
+    async def aget_service_snapshot(self) -> Optional[ServiceSheetSnapshot]:
+        """Загружает снимок в потоке Sheets, не блокируя event loop"""
+        if self._service_snapshot is not None:
+            return self._service_snapshot
+        return await self._run_in_sheets_thread(self._get_service_snapshot)
+
+    async def ainvalidate_service_snapshot(self) -> None:
+        await self._run_in_sheets_thread(self.invalidate_service_snapshot)
+
+    async def areload_service_snapshot(self) -> Optional[ServiceSheetSnapshot]:
+        """Сбрасывает очередь записи и перечитывает лист (начало нового запуска)"""
+        await self.ainvalidate_service_snapshot()
+        return await self.aget_service_snapshot()
+
+    async def aflush_pending_writes(self) -> Dict[str, Any]:
+        """Асинхронный сброс очереди записи"""
+        if not self.has_pending_writes():
+            return {'success': True, 'appended': 0, 'updated': 0}
+        return await self._run_in_sheets_thread(self.flush_pending_writes)
+
+    async def acleanup_expired_records(self, max_age_days: int = 30) -> Dict[str, Any]:
+        return await self._run_in_sheets_thread(self.cleanup_expired_records, max_age_days)
+
+    async def acleanup_records(self, **kwargs: Any) -> Dict[str, Any]:
+        return await self._run_in_sheets_thread(self.cleanup_records, **kwargs)
+
+    async def acheck_duplicate(self, data_type: str, identifier: str, **kwargs: Any) -> Dict[str, Any]:
+        return await self._run_in_sheets_thread(self.check_duplicate, data_type, identifier, **kwargs)
+
+    async def aadd_record(self, data_type: str, identifier: str, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+        return await self._run_in_sheets_thread(self.add_record, data_type, identifier, *args, **kwargs)
+
+    async def aupsert_game_record(self, **kwargs: Any) -> Dict[str, Any]:
+        return await self._run_in_sheets_thread(self.upsert_game_record, **kwargs)
+
+    async def aupdate_record_status(self, unique_key: str, new_status: str) -> Dict[str, Any]:
+        return await self._run_in_sheets_thread(self.update_record_status, unique_key, new_status)
+
+    async def aget_game_record(self, data_type: str, game_id: Any) -> Optional[Dict[str, Any]]:
+        return await self._run_in_sheets_thread(self.get_game_record, data_type, game_id)
+
+    async def aget_records_for_date(self, data_type: str, date_str: str) -> List[Dict[str, Any]]:
+        return await self._run_in_sheets_thread(self.get_records_for_date, data_type, date_str)
+
+    async def afind_game_link_for_today(self, team1: str, team2: str) -> Optional[str]:
+        return await self._run_in_sheets_thread(self.find_game_link_for_today, team1, team2)
+
+    async def aget_statistics(self) -> Dict[str, Any]:
+        return await self._run_in_sheets_thread(self.get_statistics)
+
+    async def aget_config_ids(self) -> Dict[str, Any]:
+        return await self._run_in_sheets_thread(self.get_config_ids)
+
+    def get_service_rows(self) -> List[List[str]]:
+        """Возвращает все строки сервисного листа из снимка (включая заголовок)"""
+        snapshot = self._get_service_snapshot()
+        return snapshot.rows() if snapshot else []
+
     def _create_unique_key(self, data_type: str, identifier: str, **kwargs) -> str:
         """Создает уникальный ключ для записи"""
         # Базовый ключ
@@ -588,46 +1194,39 @@ class EnhancedDuplicateProtection:
     
     def check_duplicate(self, data_type: str, identifier: str, **kwargs) -> Dict[str, Any]:
         """Проверяет существование дубликата с обработкой ошибок 429"""
-        worksheet = self._get_service_worksheet()
-        if not worksheet:
+        if not self._service_storage_ready():
             return {'exists': False, 'error': 'Лист не найден'}
         
-        def _check():
+        try:
             # Создаем уникальный ключ
             unique_key = self._create_unique_key(data_type, identifier, **kwargs)
             
-            # Получаем все данные
-            all_data = worksheet.get_all_values()
+            snapshot = self._get_service_snapshot()
+            if snapshot is None:
+                return {'exists': False, 'error': 'Лист не найден'}
             
             # Ищем дубликат по уникальному ключу (колонка C) И по типу данных (колонка A)
-            for i, row in enumerate(all_data):
-                if (len(row) >= 3 and 
-                    row[0].upper() == data_type.upper() and 
-                    row[2] == unique_key):
-                    return {
-                        'exists': True,
-                        'row': i + 1,
-                        'data': row,
-                        'unique_key': unique_key
-                    }
+            entry = snapshot.find_by_key(data_type, unique_key)
+            if entry is not None:
+                return {
+                    'exists': True,
+                    'row': snapshot.row_number(entry),
+                    'data': list(entry.values),
+                    'unique_key': unique_key
+                }
             
             # Дополнительная проверка: ищем по типу и идентификатору
-            for i, row in enumerate(all_data):
-                if (len(row) >= 3 and 
-                    row[0].upper() == data_type.upper() and 
-                    identifier in row[2]):
-                    return {
-                        'exists': True,
-                        'row': i + 1,
-                        'data': row,
-                        'unique_key': row[2],
-                        'reason': 'Найден по типу и идентификатору'
-                    }
+            entry = snapshot.find_containing(data_type, identifier)
+            if entry is not None:
+                return {
+                    'exists': True,
+                    'row': snapshot.row_number(entry),
+                    'data': list(entry.values),
+                    'unique_key': entry.values[KEY_COL],
+                    'reason': 'Найден по типу и идентификатору'
+                }
             
             return {'exists': False, 'unique_key': unique_key}
-        
-        try:
-            return self._retry_with_backoff(_check)
         except Exception as e:
             print(f"⚠️ Ошибка проверки дубликата: {e}")
             return {'exists': False, 'error': str(e)}
@@ -652,8 +1251,7 @@ class EnhancedDuplicateProtection:
         **kwargs,
     ) -> Dict[str, Any]:
         """Добавляет новую запись в сервисный лист"""
-        worksheet = self._get_service_worksheet()
-        if not worksheet:
+        if not self._service_storage_ready():
             return {'success': False, 'error': 'Лист не найден'}
         
         try:
@@ -696,15 +1294,30 @@ class EnhancedDuplicateProtection:
             if len(new_record) < len(SERVICE_HEADER):
                 new_record.extend([""] * (len(SERVICE_HEADER) - len(new_record)))
             
-            # Добавляем запись в начало (под заголовком)
-            worksheet.insert_row(new_record, index=2)
+            snapshot = self._get_service_snapshot()
+            if snapshot is None:
+                return {'success': False, 'error': 'Лист не найден'}
+            
+            # Запись встаёт под заголовок (как раньше insert_row(index=2)) и сразу
+            # уходит в таблицу: после отправки в Telegram процесс может быть убит
+            # (SIGTERM, timeout-minutes), а atexit в этом случае не выполняется
+            entry = snapshot.insert_top(new_record)
+            self._pending_appends.append(entry)
+            flush_result = self.flush_pending_writes()
+            if not flush_result.get('success'):
+                # Строка остаётся в очереди и уйдёт при следующем сбросе
+                return {
+                    'success': False,
+                    'error': flush_result.get('error', 'Запись не сохранена'),
+                    'unique_key': unique_key,
+                }
             
             print(f"✅ Запись добавлена: {data_type} - {identifier}")
             
             return {
                 'success': True,
                 'unique_key': unique_key,
-                'row': 2
+                'row': snapshot.row_number(entry)
             }
             
         except Exception as e:
@@ -712,8 +1325,7 @@ class EnhancedDuplicateProtection:
     
     def find_game_link_for_today(self, team1: str, team2: str) -> Optional[str]:
         """Ищет ссылку на игру для сегодняшней даты"""
-        worksheet = self._get_service_worksheet()
-        if not worksheet:
+        if not self._service_storage_ready():
             print("❌ Лист 'Сервисный' не найден")
             return None
         
@@ -721,55 +1333,29 @@ class EnhancedDuplicateProtection:
             from datetime_utils import get_moscow_time
             today = get_moscow_time().strftime('%d.%m.%Y')
             
-            # Получаем все данные
-            all_data = worksheet.get_all_values()
+            snapshot = self._get_service_snapshot()
+            if snapshot is None:
+                return None
             
             print(f"🔍 Ищем ссылку на игру для {today}: {team1} vs {team2}")
             
+            # Варианты названий собираются в автоматы один раз на поиск, а не на каждую строку
+            team1_matcher = _key_variant_matcher(team1)
+            team2_matcher = _key_variant_matcher(team2)
+            
             # Ищем записи типа АНОНС_ИГРА за сегодня
-            for row in all_data:
-                if (len(row) > LINK_COL and 
-                    row[TYPE_COL] == "АНОНС_ИГРА" and 
-                    today in row[DATE_COL] and  # Дата в колонке B
+            for entry in snapshot.by_date("АНОНС_ИГРА", today):
+                row = entry.values
+                if (row[TYPE_COL] == "АНОНС_ИГРА" and 
                     row[LINK_COL]):  # Ссылка в колонке F
                     
-                    # Более точный поиск команд
-                    unique_key = row[2].lower()
-                    team1_lower = team1.lower()
-                    team2_lower = team2.lower()
-                    
-                    # Нормализуем названия команд для сравнения
-                    def _normalize_team_name(name: str) -> str:
-                        import re as _re
-                        return _re.sub(r"[\W_]+", "", name.lower())
-
-                    def _build_variants(name: str) -> Set[str]:
-                        variants: Set[str] = set()
-                        if not name:
-                            return variants
-                        lowered = name.lower()
-                        variants.add(lowered)
-                        variants.add(_normalize_team_name(name))
-                        for part in lowered.replace('-', ' ').replace('_', ' ').split():
-                            if len(part) > 2:
-                                variants.add(part)
-                        return {variant for variant in variants if variant}
-
-                    team1_variants = _build_variants(team1)
-                    team2_variants = _build_variants(team2)
-                    unique_key_lower = unique_key.lower()
-                    unique_key_normalized = _normalize_team_name(unique_key)
-
-                    def _contains_variant(variants: Set[str]) -> bool:
-                        for variant in variants:
-                            if len(variant) <= 2:
-                                continue
-                            if variant in unique_key_lower or variant in unique_key_normalized:
-                                return True
-                        return False
-
-                    team1_found = _contains_variant(team1_variants)
-                    team2_found = _contains_variant(team2_variants)
+                    unique_key_lower = row[KEY_COL].lower()
+                    unique_key_normalized = _normalize_key_text(unique_key_lower)
+
+                    team1_found = (team1_matcher.contains_any(unique_key_lower)
+                                   or team1_matcher.contains_any(unique_key_normalized))
+                    team2_found = team1_found and (team2_matcher.contains_any(unique_key_lower)
+                                                   or team2_matcher.contains_any(unique_key_normalized))
 
                     # Если найдены обе команды — возвращаем ссылку
                     if team1_found and team2_found:
@@ -788,65 +1374,48 @@ class EnhancedDuplicateProtection:
     
     def update_record_status(self, unique_key: str, new_status: str) -> Dict[str, Any]:
         """Обновляет статус существующей записи"""
-        worksheet = self._get_service_worksheet()
-        if not worksheet:
+        if not self._service_storage_ready():
             return {'success': False, 'error': 'Лист не найден'}
         
         try:
-            # Получаем все данные
-            all_data = worksheet.get_all_values()
+            snapshot = self._get_service_snapshot()
+            if snapshot is None:
+                return {'success': False, 'error': 'Лист не найден'}
             
             # Ищем запись по уникальному ключу
-            for i, row in enumerate(all_data):
-                if len(row) >= 3 and row[2] == unique_key:
-                    # Обновляем статус (колонка D)
-                    worksheet.update(values=[[new_status]], range_name=f'D{i+1}')
-                    
-                    print(f"✅ Статус обновлен: {unique_key} -> {new_status}")
-                    
-                    return {
-                        'success': True,
-                        'row': i + 1,
-                        'old_status': row[3] if len(row) > 3 else '',
-                        'new_status': new_status
-                    }
+            entry = snapshot.find_by_unique_key(unique_key)
+            if entry is None:
+                return {'success': False, 'error': 'Запись не найдена'}
+            
+            row_number = snapshot.row_number(entry)
+            old_status = entry.values[STATUS_COL]
+            
+            # Обновляем статус (колонка D) — запись уходит в очередь
+            snapshot.set_status(entry, new_status)
+            self._queue_update(entry, full_row=False)
             
-            return {'success': False, 'error': 'Запись не найдена'}
+            print(f"✅ Статус обновлен: {unique_key} -> {new_status}")
+            
+            return {
+                'success': True,
+                'row': row_number,
+                'old_status': old_status,
+                'new_status': new_status
+            }
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
     def get_records_by_type(self, data_type: str) -> List[Dict[str, Any]]:
         """Получает все записи определенного типа"""
-        worksheet = self._get_service_worksheet()
-        if not worksheet:
+        if not self._service_storage_ready():
             return []
         
         try:
-            all_data = worksheet.get_all_values()
-            records = []
-            
-            for i, row in enumerate(all_data):
-                if len(row) >= 1 and row[0].upper() == data_type.upper():
-                    records.append({
-                        'row': i + 1,
-                        'type': row[TYPE_COL] if len(row) > TYPE_COL else '',
-                        'date': row[DATE_COL] if len(row) > DATE_COL else '',
-                        'unique_key': row[KEY_COL] if len(row) > KEY_COL else '',
-                        'status': row[STATUS_COL] if len(row) > STATUS_COL else '',
-                        'additional_data': row[ADDITIONAL_DATA_COL] if len(row) > ADDITIONAL_DATA_COL else '',
-                        'link': row[LINK_COL] if len(row) > LINK_COL else '',
-                        'comp_id': row[COMP_ID_COL] if len(row) > COMP_ID_COL else '',
-                        'team_id': row[TEAM_ID_COL] if len(row) > TEAM_ID_COL else '',
-                        'alt_name': row[ALT_NAME_COL] if len(row) > ALT_NAME_COL else '',
-                        'settings': row[CONFIG_COL] if len(row) > CONFIG_COL else '',
-                        'game_id': row[GAME_ID_COL] if len(row) > GAME_ID_COL else '',
-                        'game_date': row[GAME_DATE_COL] if len(row) > GAME_DATE_COL else '',
-                        'game_time': row[GAME_TIME_COL] if len(row) > GAME_TIME_COL else '',
-                        'arena': row[ARENA_COL] if len(row) > ARENA_COL else '',
-                        'team_a_id': row[TEAM_A_ID_COL] if len(row) > TEAM_A_ID_COL else '',
-                        'team_b_id': row[TEAM_B_ID_COL] if len(row) > TEAM_B_ID_COL else ''
-                    })
+            snapshot = self._get_service_snapshot()
+            if snapshot is None:
+                return []
+            records = [snapshot.record(entry) for entry in snapshot.by_type(data_type)]
             
             return records
             
@@ -854,75 +1423,32 @@ class EnhancedDuplicateProtection:
             print(f"❌ Ошибка получения записей: {e}")
             return []
     
-    def _retry_with_backoff(self, func, max_retries: int = 3, base_delay: float = 2.0):
-        """Повторяет вызов функции с экспоненциальной задержкой при ошибках 429"""
-        import time
-        import gspread.exceptions
-        
-        for attempt in range(max_retries):
-            try:
-                return func()
-            except gspread.exceptions.APIError as e:
-                error_code = e.response.status_code if hasattr(e, 'response') else None
-                error_message = str(e)
-                
-                # Проверяем, является ли это ошибкой 429 (Quota exceeded)
-                if error_code == 429 or '429' in error_message or 'Quota exceeded' in error_message:
-                    if attempt < max_retries - 1:
-                        delay = base_delay * (2 ** attempt)  # Экспоненциальная задержка: 2, 4, 8 секунд
-                        print(f"⚠️ Quota exceeded (429), повтор через {delay:.1f} сек (попытка {attempt + 1}/{max_retries})")
-                        time.sleep(delay)
-                        continue
-                    else:
-                        print(f"❌ Quota exceeded после {max_retries} попыток")
-                        raise
-                else:
-                    # Другие ошибки API не повторяем
-                    raise
-            except Exception as e:
-                # Другие исключения не повторяем
-                raise
-        
-        return None
+    def get_records_for_date(self, data_type: str, date_str: str) -> List[Dict[str, Any]]:
+        """Получает записи типа за указанную дату (ДД.ММ.ГГГГ) по индексу снимка"""
+        try:
+            snapshot = self._get_service_snapshot()
+            if snapshot is None:
+                return []
+            return [snapshot.record(entry) for entry in snapshot.by_date(data_type, date_str)]
+        except Exception as e:
+            print(f"❌ Ошибка получения записей за {date_str}: {e}")
+            return []
+    
+    def _retry_with_backoff(self, func, max_retries: int = 3, base_delay: float = 2.0, kind: str = "read"):
+        """Выполняет вызов Sheets API через общий ограничитель квоты с повторами при ошибках 429"""
+        return sheets_rate_limiter.call(kind, func, max_retries=max_retries, base_delay=base_delay)
     
     def get_game_record(self, data_type: str, game_id: Any) -> Optional[Dict[str, Any]]:
         """Возвращает запись об игре по GameID с обработкой ошибок 429"""
-        worksheet = self._get_service_worksheet()
-        if not worksheet:
-            return None
-        
-        def _fetch_record():
-            game_id_str = str(game_id)
-            all_data = worksheet.get_all_values()
-            for row_index, row in enumerate(all_data[1:], start=2):
-                if len(row) <= max(GAME_ID_COL, TYPE_COL):
-                    continue
-                if row[TYPE_COL].upper() != data_type.upper():
-                    continue
-                if row[GAME_ID_COL] == game_id_str:
-                    return {
-                        'row': row_index,
-                        'type': row[TYPE_COL],
-                        'date': row[DATE_COL],
-                        'unique_key': row[KEY_COL],
-                        'status': row[STATUS_COL],
-                        'additional_data': row[ADDITIONAL_DATA_COL],
-                        'link': row[LINK_COL],
-                        'comp_id': row[COMP_ID_COL],
-                        'team_id': row[TEAM_ID_COL],
-                        'alt_name': row[ALT_NAME_COL],
-                        'settings': row[CONFIG_COL],
-                        'game_id': row[GAME_ID_COL],
-                        'game_date': row[GAME_DATE_COL],
-                        'game_time': row[GAME_TIME_COL],
-                        'arena': row[ARENA_COL],
-                        'team_a_id': row[TEAM_A_ID_COL],
-                        'team_b_id': row[TEAM_B_ID_COL],
-                    }
+        if not self._service_storage_ready():
             return None
         
         try:
-            return self._retry_with_backoff(_fetch_record)
+            snapshot = self._get_service_snapshot()
+            if snapshot is None:
+                return None
+            entry = snapshot.find_by_game_id(data_type, str(game_id))
+            return snapshot.record(entry) if entry is not None else None
         except Exception as e:
             print(f"⚠️ Ошибка поиска записи игры: {e}")
             return None
@@ -947,8 +1473,7 @@ class EnhancedDuplicateProtection:
         **kwargs,
     ) -> Dict[str, Any]:
         """Создает или обновляет запись об игре"""
-        worksheet = self._get_service_worksheet()
-        if not worksheet:
+        if not self._service_storage_ready():
             return {'success': False, 'error': 'Лист не найден'}
         
         try:
@@ -976,9 +1501,16 @@ class EnhancedDuplicateProtection:
                 str(team_b_id) if team_b_id is not None else "",
             ]
             
-            if existing:
-                row_index = existing['row']
-                worksheet.update(f"A{row_index}:{END_COLUMN_LETTER}{row_index}", [row_values])
+            snapshot = self._service_snapshot
+            entry = snapshot.find_by_game_id(data_type, game_id_str) if existing and snapshot else None
+            if entry is not None and snapshot is not None:
+                row_index = snapshot.row_number(entry)
+                # Обновление игры тоже защищает от повторной отправки — пишем сразу
+                snapshot.replace_values(entry, row_values)
+                self._queue_update(entry, full_row=True)
+                flush_result = self.flush_pending_writes()
+                if not flush_result.get('success'):
+                    return {'success': False, 'action': 'error', 'error': flush_result.get('error')}
                 print(f"🔄 Обновлена запись {data_type} для GameID {game_id_str}")
                 return {'success': True, 'action': 'updated', 'row': row_index}
             
@@ -1012,80 +1544,28 @@ class EnhancedDuplicateProtection:
     
     def cleanup_old_records(self, data_type: str, days_old: int = 30) -> Dict[str, Any]:
         """Очищает старые записи определенного типа"""
-        worksheet = self._get_service_worksheet()
-        if not worksheet:
-            return {'success': False, 'error': 'Лист не найден'}
+        result = self.cleanup_records(per_type_days={data_type: days_old})
+        if not result.get('success'):
+            return result
         
-        try:
-            all_data = worksheet.get_all_values()
-            current_datetime = get_moscow_time()
-            rows_to_delete: List[int] = []
-            
-            for row_index, row in enumerate(all_data[1:], start=2):
-                if len(row) <= max(DATE_COL, TYPE_COL):
-                    continue
-                
-                row_type = row[TYPE_COL].upper() if len(row) > TYPE_COL else ''
-                if row_type != data_type.upper():
-                    continue
-                
-                date_value = row[DATE_COL]
-                if not date_value:
-                    continue
-                
-                try:
-                    from datetime import datetime as dt
-                    record_date = dt.strptime(date_value, '%d.%m.%Y %H:%M')
-                except ValueError:
-                    continue
-                
-                record_date = record_date.replace(tzinfo=current_datetime.tzinfo)
-                age_days = (current_datetime - record_date).days
-                
-                if age_days > days_old:
-                    rows_to_delete.append(row_index)
-            
-            for row_index in reversed(rows_to_delete):
-                worksheet.delete_rows(row_index)
-            
-            print(f"✅ Очищено {len(rows_to_delete)} старых записей типа {data_type}")
-            
-            return {
-                'success': True,
-                'cleaned_count': len(rows_to_delete),
-                'data_type': data_type
-            }
-            
-        except Exception as e:
-            return {'success': False, 'error': str(e)}
+        print(f"✅ Очищено {result['cleaned_count']} старых записей типа {data_type}")
+        
+        return {
+            'success': True,
+            'cleaned_count': result['cleaned_count'],
+            'data_type': data_type
+        }
     
     def get_statistics(self) -> Dict[str, Any]:
         """Получает статистику по всем типам записей"""
-        worksheet = self._get_service_worksheet()
-        if not worksheet:
+        if not self._service_storage_ready():
             return {'error': 'Лист не найден'}
         
         try:
-            all_data = worksheet.get_all_values()
-            stats = {}
-            
-            for row in all_data:
-                if len(row) >= 1 and row[0]:
-                    data_type = row[0]
-                    if data_type.startswith('===') or data_type.startswith('ТИП ДАННЫХ'):
-                        continue
-                    
-                    if data_type not in stats:
-                        stats[data_type] = {'total': 0, 'active': 0, 'completed': 0}
-                    
-                    stats[data_type]['total'] += 1
-                    
-                    if len(row) >= 4:
-                        status = row[3]
-                        if status == 'АКТИВЕН':
-                            stats[data_type]['active'] += 1
-                        elif status in ['ЗАВЕРШЕН', 'ОТПРАВЛЕН', 'ОБРАБОТАН', 'ОТПРАВЛЕНО']:
-                            stats[data_type]['completed'] += 1
+            snapshot = self._get_service_snapshot()
+            if snapshot is None:
+                return {'error': 'Лист не найден'}
+            stats = snapshot.type_counts()
             
             return stats
             
@@ -1094,28 +1574,63 @@ class EnhancedDuplicateProtection:
 
     def cleanup_expired_records(self, max_age_days: int = 30) -> Dict[str, Any]:
         """Удаляет все записи старше указанного количества дней"""
-        worksheet = self._get_service_worksheet()
-        if not worksheet:
+        result = self.cleanup_records(max_age_days=max_age_days)
+        if not result.get('success'):
+            return result
+        
+        print(f"✅ Очищено {result['cleaned_count']} записей старше {max_age_days} дней")
+        
+        return {
+            'success': True,
+            'cleaned_count': result['cleaned_count'],
+            'details': result['details']
+        }
+
+    def cleanup_records(
+        self,
+        max_age_days: Optional[int] = None,
+        per_type_days: Optional[Dict[str, int]] = None,
+    ) -> Dict[str, Any]:
+        """Удаляет устаревшие записи за один проход по снимку и один batchUpdate.
+
+        max_age_days — общий срок для всех типов, per_type_days — сроки по типам.
+        Запись удаляется, если она старше любого из применимых сроков. В by_type
+        попадают только записи, удалённые по сроку своего типа, а записи старше
+        общего срока считаются в expired_count (как раньше отдельный общий проход).
+        """
+        if not self._service_storage_ready():
             return {'success': False, 'error': 'Лист не найден'}
         
         try:
-            all_data = worksheet.get_all_values()
-            if not all_data:
-                return {'success': True, 'cleaned_count': 0, 'details': []}
+            # Номера строк сдвинутся после удаления — сначала сбрасываем очередь записи
+            self.flush_pending_writes()
+            snapshot = self._get_service_snapshot()
+            if snapshot is None:
+                return {'success': False, 'error': 'Лист не найден'}
             
+            type_limits = {key.upper(): value for key, value in (per_type_days or {}).items()}
             current_datetime = get_moscow_time()
             rows_to_delete: List[Tuple[int, str]] = []
+            keys_to_delete: List[RecordKey] = []
+            by_type: Dict[str, int] = {}
+            expired_count = 0
             
-            for row_index, row in enumerate(all_data[1:], start=2):
-                if len(row) <= DATE_COL:
+            from datetime import datetime as dt
+            for entry in snapshot.entries():
+                date_value = entry.values[DATE_COL]
+                if not date_value:
                     continue
                 
-                date_value = row[DATE_COL]
-                if not date_value:
+                record_type = entry.values[TYPE_COL]
+                limits = []
+                if max_age_days is not None:
+                    limits.append(max_age_days)
+                if record_type.upper() in type_limits:
+                    limits.append(type_limits[record_type.upper()])
+                if not limits:
                     continue
                 
                 try:
-                    from datetime import datetime as dt
                     record_date = dt.strptime(date_value, '%d.%m.%Y %H:%M')
                 except ValueError:
                     continue
@@ -1123,19 +1638,29 @@ class EnhancedDuplicateProtection:
                 record_date = record_date.replace(tzinfo=current_datetime.tzinfo)
                 age_days = (current_datetime - record_date).days
                 
-                if age_days > max_age_days:
-                    record_type = row[TYPE_COL] if len(row) > TYPE_COL else ''
-                    rows_to_delete.append((row_index, record_type))
-            
-            for row_index, _ in reversed(rows_to_delete):
-                worksheet.delete_rows(row_index)
+                if age_days > min(limits):
+                    rows_to_delete.append((snapshot.row_number(entry), record_type))
+                    keys_to_delete.append(entry.stored_key)
+                    if max_age_days is not None and age_days > max_age_days:
+                        expired_count += 1
+                    else:
+                        by_type[record_type] = by_type.get(record_type, 0) + 1
             
-            print(f"✅ Очищено {len(rows_to_delete)} записей старше {max_age_days} дней")
+            if rows_to_delete:
+                row_numbers = [row_index for row_index, _ in rows_to_delete]
+                ranges = self.storage.delete_rows(list(zip(row_numbers, keys_to_delete)))
+                if not ranges:
+                    # Запрос не отправлен: снимок оставляем как есть, иначе номера строк разойдутся с листом
+                    return {'success': False, 'error': 'Удаление не выполнено: лист недоступен'}
+                print(f"🗑️ Удалено {len(row_numbers)} строк в {ranges} диапазонах одним запросом")
+                self._service_snapshot = snapshot.without_rows({row_index for row_index, _ in rows_to_delete})
             
             return {
                 'success': True,
                 'cleaned_count': len(rows_to_delete),
-                'details': rows_to_delete
+                'details': rows_to_delete,
+                'expired_count': expired_count,
+                'by_type': by_type,
             }
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -1171,15 +1696,16 @@ class EnhancedDuplicateProtection:
             print(f"⚠️ Некорректный JSON в конфигурации сервисного листа: {e}")
             return {}
 
-    def get_full_config(self) -> Dict[str, Any]:
-        config_data = self._read_config_from_config_sheet()
+    def get_full_config(self, config_values: Optional[List[List[str]]] = None) -> Dict[str, Any]:
+        config_data = self._read_config_from_config_sheet(config_values)
         if config_data.get('has_data'):
             return config_data['payload']
 
         print(f"⚠️ Лист '{CONFIG_WORKSHEET_NAME}' пуст — читаем настройки из 'Сервисного' (временный режим)")
         return self._read_config_from_service_sheet()
 
-    def _read_config_from_config_sheet(self) -> Dict[str, Any]:
+    def _read_config_from_config_sheet(self, config_values: Optional[List[List[str]]] = None) -> Dict[str, Any]:
+        """Разбор листа 'Конфиг'; config_values — уже прочитанные значения листа"""
         worksheet = self.config_worksheet
         payload = {
             'comp_ids': set(),
@@ -1190,11 +1716,13 @@ class EnhancedDuplicateProtection:
             'voting_polls': [],
             'automation_topics': {},
         }
-        if not worksheet:
+        if config_values is None and not worksheet:
             return {'has_data': False, 'payload': payload}
 
         try:
-            all_data = worksheet.get_all_values()
+            all_data = config_values
+            if all_data is None and worksheet:
+                all_data = self._retry_with_backoff(worksheet.get_all_values) or []
             if not all_data or len(all_data) <= 1:
                 return {'has_data': False, 'payload': payload}
 
@@ -1587,9 +2115,119 @@ class EnhancedDuplicateProtection:
                 'automation_topics': {}
             }
 
+    def _fetch_config_values(self) -> Optional[List[List[str]]]:
+        """Значения листа 'Конфиг' одним запросом (None — лист недоступен)"""
+        worksheet = self.config_worksheet
+        if not worksheet:
+            return None
+        try:
+            return self._retry_with_backoff(worksheet.get_all_values) or []
+        except Exception as e:
+            print(f"⚠️ Не удалось прочитать лист '{CONFIG_WORKSHEET_NAME}': {e}")
+            return None
+
+    @staticmethod
+    def _config_revision(config_values: List[List[str]]) -> str:
+        """Ревизия конфигурации — хэш значений листа 'Конфиг'.
+
+        Записи бота в 'Сервисный' меняют ревизию всей таблицы в Drive, но не
+        этот хэш, поэтому снимок переживает обычные запуски.
+        """
+        payload = json.dumps(config_values, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _encode_config_value(value: Any) -> Any:
+        """Переводит конфигурацию в JSON: множества и словари с int-ключами помечаются"""
+        if isinstance(value, set):
+            return {'__set__': [EnhancedDuplicateProtection._encode_config_value(item) for item in sorted(value)]}
+        if isinstance(value, dict):
+            encoded = {str(key): EnhancedDuplicateProtection._encode_config_value(item) for key, item in value.items()}
+            if value and all(isinstance(key, int) for key in value):
+                return {'__intkeys__': encoded}
+            return encoded
+        if isinstance(value, (list, tuple)):
+            return [EnhancedDuplicateProtection._encode_config_value(item) for item in value]
+        return value
+
+    @staticmethod
+    def _decode_config_value(value: Any) -> Any:
+        if isinstance(value, dict):
+            if set(value.keys()) == {'__set__'}:
+                return {EnhancedDuplicateProtection._decode_config_value(item) for item in value['__set__']}
+            if set(value.keys()) == {'__intkeys__'}:
+                return {
+                    int(key): EnhancedDuplicateProtection._decode_config_value(item)
+                    for key, item in value['__intkeys__'].items()
+                }
+            return {key: EnhancedDuplicateProtection._decode_config_value(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [EnhancedDuplicateProtection._decode_config_value(item) for item in value]
+        return value
+
+    def _load_config_cache_file(self) -> Optional[Tuple[str, Dict[str, Any]]]:
+        try:
+            with open(CONFIG_CACHE_PATH, 'r', encoding='utf-8') as cache_file:
+                data = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+        if data.get('spreadsheet_id') != SPREADSHEET_ID or data.get('schema') != SCHEMA_FINGERPRINT:
+            return None
+        revision = data.get('revision')
+        if not revision:
+            return None
+        return revision, self._decode_config_value(data.get('config') or {})
+
+    def _save_config_cache_file(self, revision: str, config: Dict[str, Any]) -> None:
+        try:
+            cache_dir = os.path.dirname(CONFIG_CACHE_PATH)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{CONFIG_CACHE_PATH}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as cache_file:
+                json.dump(
+                    {
+                        'spreadsheet_id': SPREADSHEET_ID,
+                        'schema': SCHEMA_FINGERPRINT,
+                        'revision': revision,
+                        'config': self._encode_config_value(config),
+                    },
+                    cache_file,
+                    ensure_ascii=False,
+                )
+            os.replace(tmp_path, CONFIG_CACHE_PATH)
+        except OSError as e:
+            print(f"⚠️ Не удалось сохранить снимок конфигурации: {e}")
+
+    def _get_cached_full_config(self) -> Dict[str, Any]:
+        """Полная конфигурация из снимка; лист 'Конфиг' разбирается заново только при смене его значений"""
+        now = time.monotonic()
+        if self._config_cache and now - self._config_cache[1] < CONFIG_REVISION_CHECK_INTERVAL:
+            return self._config_cache[2]
+
+        config_values = self._fetch_config_values()
+        if not config_values or len(config_values) <= 1:
+            # Лист пуст или недоступен: настройки из 'Сервисного' в снимок не попадают
+            return self.get_full_config(config_values)
+
+        revision = self._config_revision(config_values)
+        if self._config_cache and self._config_cache[0] == revision:
+            self._config_cache = (revision, now, self._config_cache[2])
+            return self._config_cache[2]
+        cached = self._load_config_cache_file()
+        if cached and cached[0] == revision:
+            print("⚡ Конфигурация взята из снимка (лист 'Конфиг' не менялся)")
+            self._config_cache = (revision, now, cached[1])
+            return cached[1]
+
+        full_config = self.get_full_config(config_values)
+        self._config_cache = (revision, now, full_config)
+        self._save_config_cache_file(revision, full_config)
+        return full_config
+
     def get_config_ids(self) -> Dict[str, Any]:
         """Совместимая обёртка вокруг полной конфигурации"""
-        full_config = self.get_full_config()
+        full_config = copy.deepcopy(self._get_cached_full_config())
         return {
             'comp_ids': sorted(full_config.get('comp_ids', set())),
             'team_ids': sorted(full_config.get('team_ids', set())),
@@ -1600,8 +2238,16 @@ class EnhancedDuplicateProtection:
             'automation_topics': full_config.get('automation_topics', {}),
         }
 
-# Глобальный экземпляр для использования в других модулях
-duplicate_protection = EnhancedDuplicateProtection()
+# Глобальный экземпляр для использования в других модулях.
+# Подключение к Google Sheets выполняется при первом обращении, а не при импорте.
+duplicate_protection: EnhancedDuplicateProtection = LazySingleton(  # type: ignore[assignment]
+    EnhancedDuplicateProtection, "duplicate_protection"
+)
+
+
+def get_duplicate_protection() -> EnhancedDuplicateProtection:
+    """Возвращает общий экземпляр, создавая его при первом вызове"""
+    return duplicate_protection._resolve()  # type: ignore[attr-defined]
 
 def test_duplicate_protection():
     """Тестирует систему защиты от дублирования"""
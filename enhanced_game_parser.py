@@ -8,68 +8,49 @@ import asyncio
 import aiohttp
 import json
 import re
-import ssl
-from collections import defaultdict
 from typing import Dict, List, Optional, Any, Set
 from datetime import datetime
+from comp_names import register_from_payload
 from datetime_utils import get_moscow_time
+from html_extract import find_stats_table, page_text
+from http_client import INFOBASKET_BASE_URL, cached_get, shared_http_client
+from play_by_play import processor_for_game
+from player_stats import (
+    BEST_PLAYER_RULES,
+    TEAM_ANTI_LEADER_SLOTS,
+    TEAM_LEADER_RULES,
+    PlayerStatLine,
+    has_valid_name,
+    scan_protocol_statistics,
+    select_leaders,
+    team_players,
+)
+from team_directory import TeamDirectory
 
 class EnhancedGameParser:
     """Улучшенный парсер игр, работающий с API"""
     
-    def __init__(self, team_configs: Optional[Dict[int, Dict[str, Any]]] = None, team_keywords: Optional[List[str]] = None):
-        self.session = None
-        self.team_configs = team_configs or {}
-        self.team_keywords = [name.strip() for name in (team_keywords or []) if isinstance(name, str) and name.strip()]
-    
-    @staticmethod
-    def _normalize_name(name: str) -> str:
-        if not isinstance(name, str):
-            return ""
-        return re.sub(r"[\s\-_/]", "", name.strip().lower())
-    
-    def _match_team_config(self, team_name: str) -> Optional[Dict[str, Any]]:
-        normalized = self._normalize_name(team_name)
-        if not normalized:
-            return None
-        for team_id, data in self.team_configs.items():
-            metadata = data.get('metadata') or {}
-            candidates = set()
-            alt_name = data.get('alt_name')
-            if isinstance(alt_name, str) and alt_name.strip():
-                candidates.add(alt_name.strip())
-            aliases = metadata.get('aliases') if isinstance(metadata, dict) else []
-            if isinstance(aliases, list):
-                for alias in aliases:
-                    if isinstance(alias, str) and alias.strip():
-                        candidates.add(alias.strip())
-            for candidate in candidates:
-                if self._normalize_name(candidate) == normalized:
-                    return {'team_id': team_id, 'alt_name': alt_name, 'metadata': metadata}
-        return None
-    
-    def _contains_keyword(self, team_name: str) -> bool:
-        normalized_team = self._normalize_name(team_name)
-        if not normalized_team:
-            return False
-        for keyword in self.team_keywords:
-            if self._normalize_name(keyword) == normalized_team:
-                return True
-        return False
+    def __init__(
+        self,
+        team_directory: Optional[TeamDirectory] = None,
+        http_session: Optional[aiohttp.ClientSession] = None,
+        base_url: Optional[str] = None,
+    ):
+        # Переданная HTTP-сессия или общая сессия shared_http_client (не закрывается парсером)
+        self.session = http_session
+        # Подмена API (локальная заглушка): используется вместо apiUrl из ссылки на игру
+        self.base_url: Optional[str] = (base_url or INFOBASKET_BASE_URL).rstrip("/") or None
+        # Справочник целевых команд (GameSystemManager.team_directory); без него — пустой
+        self.team_directory = team_directory or TeamDirectory()
     
     async def __aenter__(self):
-        # Создаем SSL context с отключенной проверкой сертификатов
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        
-        connector = aiohttp.TCPConnector(ssl=ssl_context)
-        self.session = aiohttp.ClientSession(connector=connector)
+        if self.session is None or self.session.closed:
+            self.session = await shared_http_client.get_session()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
+        # Сессия общая: соединения остаются в пуле для следующих запросов
+        return None
     
     def extract_game_id_from_url(self, game_url: str) -> Optional[str]:
         """Извлекает gameId из URL игры"""
@@ -91,6 +72,8 @@ class EnhancedGameParser:
     
     def extract_api_url_from_url(self, game_url: str) -> str:
         """Извлекает API URL из URL игры"""
+        if self.base_url:
+            return self.base_url
         try:
             # Ищем apiUrl в URL
             match = re.search(r'apiUrl=([^&]+)', game_url)
@@ -103,11 +86,12 @@ class EnhancedGameParser:
             print(f"❌ Ошибка извлечения API URL: {e}")
             return "https://reg.infobasket.su"
     
-    async def get_game_data_from_api(self, game_id: str, api_url: str = "https://reg.infobasket.su") -> Optional[Dict]:
+    async def get_game_data_from_api(self, game_id: str, api_url: Optional[str] = None) -> Optional[Dict]:
         """Получает данные игры через API"""
         try:
             if not self.session:
                 return None
+            api_url = api_url or self.base_url or "https://reg.infobasket.su"
             
             # URL для получения данных игры (только GetOnline, содержит все данные)
             online_api_url = f"{api_url}/Widget/GetOnline/{game_id}?format=json&lang=ru"
@@ -116,7 +100,7 @@ class EnhancedGameParser:
             print(f"   Online API: {online_api_url}")
             
             # Запрашиваем данные игры
-            async with self.session.get(online_api_url) as online_response:
+            async with cached_get(online_api_url, self.session) as online_response:
                 
                 if online_response.status == 200:
                     online_data = await online_response.json()
@@ -183,6 +167,7 @@ class EnhancedGameParser:
             
             game_data = api_data['game']
             online_data = api_data['online']
+            register_from_payload(game_data)
             
             # Парсим дату и время
             parsed_date = self.parse_dotnet_date(game_data.get('GameDate', ''))
@@ -308,7 +293,7 @@ class EnhancedGameParser:
                         })
             
             if not quarters:
-                computed_quarters = self._compute_quarter_scores(online_data)
+                computed_quarters = self._compute_quarter_scores(online_data, game_info.get('game_id'))
                 if computed_quarters:
                     quarters = computed_quarters
                 else:
@@ -324,10 +309,11 @@ class EnhancedGameParser:
                 
                 print(f"🔍 Анализируем команды: '{team1_name}' vs '{team2_name}'")
                 
-                team1_config = self._match_team_config(team1_name)
-                team2_config = self._match_team_config(team2_name)
-                team1_matches = bool(team1_config) or self._contains_keyword(team1_name)
-                team2_matches = bool(team2_config) or self._contains_keyword(team2_name)
+                team_directory = self.team_directory
+                team1_config = team_directory.resolve(team1_name)
+                team2_config = team_directory.resolve(team2_name)
+                team1_matches = bool(team1_config) or team_directory.is_keyword(team1_name)
+                team2_matches = bool(team2_config) or team_directory.is_keyword(team2_name)
                 
                 our_team_entry = None
                 opponent_entry = None
@@ -354,27 +340,14 @@ class EnhancedGameParser:
                         our_team_entry = game_info['teams'][0]
                         opponent_entry = game_info['teams'][1]
                 
-                configured_team_ids: Set[int] = set()
+                configured_team_ids: Set[int] = set(team_directory.team_ids)
                 def _to_int(value: Any) -> Optional[int]:
                     try:
                         return int(value)
                     except (TypeError, ValueError):
                         return None
 
-                def _get_config_for_team(team_id_value: Optional[int]) -> Optional[Dict[str, Any]]:
-                    if team_id_value is None:
-                        return None
-                    configs = self.team_configs or {}
-                    for key in (team_id_value, str(team_id_value)):
-                        if key in configs:
-                            return configs[key]
-                    return None
-
-                if self.team_configs:
-                    for cfg_key in self.team_configs.keys():
-                        cfg_id = _to_int(cfg_key)
-                        if cfg_id is not None:
-                            configured_team_ids.add(cfg_id)
+                _get_config_for_team = team_directory.config_for
 
                 team1_entry = game_info['teams'][0] if len(game_info['teams']) > 0 else None
                 team2_entry = game_info['teams'][1] if len(game_info['teams']) > 1 else None
@@ -531,7 +504,7 @@ class EnhancedGameParser:
             online_data = api_data.get('online', {})
             
             # Ищем статистику игроков в данных
-            players_stats = []
+            players_stats: List[PlayerStatLine] = []
             
             # Ищем статистику игроков в Protocol (приоритет 1)
             if 'Protocol' in online_data and len(online_data['Protocol']) > 0:
@@ -539,20 +512,17 @@ class EnhancedGameParser:
                 if 'Players' in protocol:
                     players_data = protocol['Players']
                     print(f"🔍 Найдены игроки в Protocol: {len(players_data)} игроков")
+                    # Названия команд по номеру определяем один раз на игру
+                    team_names: Dict[Any, str] = {}
+                    for team in online_data.get('OnlineTeams') or []:
+                        team_number = team.get('TeamNumber')
+                        if team_number and team_number not in team_names:
+                            team_names[team_number] = team.get('TeamName2', team.get('TeamName1', f"Team {team_number}"))
                     for player in players_data:
-                        # Определяем название команды по номеру
                         team_number = player.get('TeamNumber')
-                        team_name = f"Team {team_number}"
-                        if team_number and 'OnlineTeams' in online_data:
-                            for team in online_data['OnlineTeams']:
-                                if team.get('TeamNumber') == team_number:
-                                    team_name = team.get('TeamName2', team.get('TeamName1', team_name))
-                                    break
-                        
+                        team_name = team_names.get(team_number) or f"Team {team_number}"
                         stats = self.parse_player_statistics_from_api(player, team_name)
-                        if (stats and stats.get('name') and 
-                            stats.get('name').strip() != '' and 
-                            'None' not in stats.get('name', '')):
+                        if has_valid_name(stats):
                             players_stats.append(stats)
             
             # Ищем статистику игроков в GameTeams (приоритет 2)
@@ -569,9 +539,7 @@ class EnhancedGameParser:
                                 print(f"🔍 Найдены игроки команды {team_name_ru}: {len(players_data)} игроков")
                                 for player in players_data:
                                     stats = self.parse_player_statistics_from_api(player, team_name_ru)
-                                    if (stats and stats.get('name') and 
-                                        stats.get('name').strip() != '' and 
-                                        'None' not in stats.get('name', '')):
+                                    if has_valid_name(stats):
                                         players_stats.append(stats)
             
             # Проверяем различные возможные места для статистики
@@ -581,9 +549,7 @@ class EnhancedGameParser:
                 
                 for player in players_data:
                     player_stat = self.parse_player_statistics(player)
-                    if (player_stat and player_stat.get('name') and 
-                        player_stat.get('name').strip() != '' and 
-                        'None' not in player_stat.get('name', '')):
+                    if has_valid_name(player_stat):
                         players_stats.append(player_stat)
             
             elif 'TeamPlayers' in game_data:
@@ -595,9 +561,7 @@ class EnhancedGameParser:
                         
                         for player in team_players:
                             player_stat = self.parse_player_statistics(player)
-                            if (player_stat and player_stat.get('name') and 
-                                player_stat.get('name').strip() != '' and 
-                                'None' not in player_stat.get('name', '')):
+                            if has_valid_name(player_stat):
                                 players_stats.append(player_stat)
             
             elif 'Statistics' in online_data:
@@ -611,9 +575,7 @@ class EnhancedGameParser:
                         for item in value:
                             if isinstance(item, dict) and 'PlayerName' in item:
                                 player_stat = self.parse_player_statistics(item)
-                                if (player_stat and player_stat.get('name') and 
-                                    player_stat.get('name').strip() != '' and 
-                                    'None' not in player_stat.get('name', '')):
+                                if has_valid_name(player_stat):
                                     players_stats.append(player_stat)
             
             if players_stats:
@@ -633,97 +595,15 @@ class EnhancedGameParser:
             print(f"❌ Ошибка извлечения статистики игроков: {e}")
             return None
     
-    def parse_player_statistics_from_api(self, player_data: Dict, team_name: str) -> Optional[Dict]:
+    def parse_player_statistics_from_api(self, player_data: Dict, team_name: str) -> Optional[PlayerStatLine]:
         """Парсит статистику игрока из API данных"""
         try:
-            # Извлекаем основные данные игрока
-            first_name = player_data.get('FirstNameRu', '')
-            last_name = player_data.get('LastNameRu', '')
-            player_name = f"{first_name} {last_name}".strip()
-            
-            if not player_name or player_name == ' ':
-                return None
-            
-            # Извлекаем статистику из API (используем правильные названия полей)
-            stats = {
-                'name': player_name,
-                'team': team_name,
-                'jersey_number': player_data.get('DisplayNumber', ''),
-                'person_id': player_data.get('PersonID', 0),
-                'player_number': player_data.get('PlayerNumber', 0),
-                'points': player_data.get('Points', 0) or 0,
-                'rebounds': player_data.get('Rebound', 0) or 0,
-                'assists': player_data.get('Assist', 0) or 0,
-                'steals': player_data.get('Steal', 0) or 0,
-                'blocks': player_data.get('Blocks', 0) or 0,
-                'turnovers': player_data.get('Turnover', 0) or 0,
-                'fouls': player_data.get('Foul', 0) or 0,
-                'field_goals_made': player_data.get('Goal2', 0) or 0,
-                'field_goals_attempted': player_data.get('Shot2', 0) or 0,
-                'three_pointers_made': player_data.get('Goal3', 0) or 0,
-                'three_pointers_attempted': player_data.get('Shot3', 0) or 0,
-                'free_throws_made': player_data.get('Goal1', 0) or 0,
-                'free_throws_attempted': player_data.get('Shot1', 0) or 0,
-                'minutes': player_data.get('PlayedTime', '0:00'),
-                'plus_minus': player_data.get('PlusMinus', 0) or 0,
-                'opponent_fouls': player_data.get('OpponentFoul', 0) or 0,  # Фолы соперника
-                'defensive_rebounds': player_data.get('DefRebound', 0) or 0,
-                'offensive_rebounds': player_data.get('OffRebound', 0) or 0,
-                'height': player_data.get('Height', 0) or 0,
-                'weight': player_data.get('Weight', 0) or 0,
-                'position': player_data.get('PosID', 0) or 0,
-                'is_captain': player_data.get('Capitan', 0) == 1
-            }
-            
-            # Вычисляем проценты попаданий
-            # Общий процент попаданий = (все попадания) / (все попытки) * 100
-            total_made = (stats['free_throws_made'] + stats['field_goals_made'] + stats['three_pointers_made'])
-            total_attempted = (stats['free_throws_attempted'] + stats['field_goals_attempted'] + stats['three_pointers_attempted'])
-            
-            if total_attempted > 0:
-                stats['field_goal_percentage'] = round((total_made / total_attempted) * 100, 1)
-            else:
-                stats['field_goal_percentage'] = 0.0
-            
-            if stats['three_pointers_attempted'] > 0:
-                stats['three_point_percentage'] = round((stats['three_pointers_made'] / stats['three_pointers_attempted']) * 100, 1)
-            else:
-                stats['three_point_percentage'] = 0.0
-            
-            # Двухочковые отдельно
-            if stats['field_goals_attempted'] > 0:
-                stats['two_point_percentage'] = round((stats['field_goals_made'] / stats['field_goals_attempted']) * 100, 1)
-            else:
-                stats['two_point_percentage'] = 0.0
-
-            if stats['free_throws_attempted'] > 0:
-                stats['free_throw_percentage'] = round((stats['free_throws_made'] / stats['free_throws_attempted']) * 100, 1)
-            else:
-                stats['free_throw_percentage'] = 0.0
-            
-            # Вычисляем КПИ по формуле:
-            # КПИ = (Очки + Подборы + Передачи + Перехваты + Блоки + Фолы соперника - Промахи - Потери - Фолы)
-            # Промахи = (попытки бросков - попадания)
-            misses = total_attempted - total_made
-            # Фолы соперника = берем из API, если есть
-            opponent_fouls = player_data.get('OpponentFoul', 0) or 0
-            
-            kpi = (stats['points'] + stats['rebounds'] + stats['assists'] + 
-                   stats['steals'] + stats['blocks'] + opponent_fouls - 
-                   misses - stats['turnovers'] - stats['fouls'])
-            
-            original_plus_minus = player_data.get('PlusMinus', 0) or 0
-            stats['plus_minus'] = original_plus_minus  # Сохраняем оригинальный плюс/минус
-            stats['kpi'] = kpi  # Добавляем отдельное поле КПИ
-            stats['opponent_fouls'] = opponent_fouls  # Сохраняем фолы соперника
-            
-            return stats
-            
+            return PlayerStatLine.from_api(player_data, team_name)
         except Exception as e:
             print(f"❌ Ошибка парсинга статистики игрока из API: {e}")
             return None
     
-    def parse_player_statistics(self, player_data: Dict) -> Optional[Dict]:
+    def parse_player_statistics(self, player_data: Dict) -> Optional[PlayerStatLine]:
         """Парсит статистику отдельного игрока"""
         try:
             # Извлекаем основные данные игрока
@@ -732,61 +612,27 @@ class EnhancedGameParser:
                 return None
             
             # Извлекаем статистику (различные возможные названия полей)
-            stats = {
-                'name': player_name.strip(),
-                'points': self.extract_stat_value(player_data, ['Points', 'PTS', 'points', 'Очки']),
-                'rebounds': self.extract_stat_value(player_data, ['Rebounds', 'REB', 'rebounds', 'Подборы', 'TRB']),
-                'assists': self.extract_stat_value(player_data, ['Assists', 'AST', 'assists', 'Передачи', 'ПАС']),
-                'steals': self.extract_stat_value(player_data, ['Steals', 'STL', 'steals', 'Перехваты', 'ПЕРЕХ']),
-                'blocks': self.extract_stat_value(player_data, ['Blocks', 'BLK', 'blocks', 'Блокшоты', 'БЛОК']),
-                'turnovers': self.extract_stat_value(player_data, ['Turnovers', 'TOV', 'turnovers', 'Потери', 'ПОТ']),
-                'fouls': self.extract_stat_value(player_data, ['Fouls', 'PF', 'fouls', 'Фолы', 'ФОЛ']),
-                'field_goals_made': self.extract_stat_value(player_data, ['FGM', 'field_goals_made', 'Попадания']),
-                'field_goals_attempted': self.extract_stat_value(player_data, ['FGA', 'field_goals_attempted', 'Попытки']),
-                'three_pointers_made': self.extract_stat_value(player_data, ['3PM', 'three_pointers_made', '3-очковые']),
-                'three_pointers_attempted': self.extract_stat_value(player_data, ['3PA', 'three_pointers_attempted', '3-очковые попытки']),
-                'free_throws_made': self.extract_stat_value(player_data, ['FTM', 'free_throws_made', 'Штрафные']),
-                'free_throws_attempted': self.extract_stat_value(player_data, ['FTA', 'free_throws_attempted', 'Штрафные попытки']),
-                'minutes': self.extract_stat_value(player_data, ['Minutes', 'MIN', 'minutes', 'Минуты', 'Время']),
-                'team': player_data.get('TeamName') or player_data.get('team_name', ''),
-                'position': player_data.get('Position') or player_data.get('position', ''),
-                'jersey_number': player_data.get('JerseyNumber') or player_data.get('jersey_number', '')
-            }
-            
-            # Вычисляем проценты попаданий
-            # Общий процент попаданий = (все попадания) / (все попытки) * 100
-            total_made = (stats['free_throws_made'] + stats['field_goals_made'] + stats['three_pointers_made'])
-            total_attempted = (stats['free_throws_attempted'] + stats['field_goals_attempted'] + stats['three_pointers_attempted'])
-            
-            if total_attempted and total_attempted > 0:
-                stats['field_goal_percentage'] = round((total_made / total_attempted) * 100, 1)
-            else:
-                stats['field_goal_percentage'] = 0.0
-            
-            if stats['three_pointers_attempted'] and stats['three_pointers_attempted'] > 0:
-                stats['three_point_percentage'] = round((stats['three_pointers_made'] / stats['three_pointers_attempted']) * 100, 1)
-            else:
-                stats['three_point_percentage'] = 0.0
-            
-            if stats['free_throws_attempted'] and stats['free_throws_attempted'] > 0:
-                stats['free_throw_percentage'] = round((stats['free_throws_made'] / stats['free_throws_attempted']) * 100, 1)
-            else:
-                stats['free_throw_percentage'] = 0.0
-            
-            # Вычисляем КПИ по формуле:
-            # КПИ = (Очки + Подборы + Передачи + Перехваты + Блоки + Фолы соперника - Промахи - Потери - Фолы)
-            misses = total_attempted - total_made
-            opponent_fouls = stats.get('opponent_fouls', 0) or 0  # Берем из stats, если есть
-            
-            kpi = (stats['points'] + stats['rebounds'] + stats['assists'] + 
-                   stats['steals'] + stats['blocks'] + opponent_fouls - 
-                   misses - stats['turnovers'] - stats['fouls'])
-            
-            original_plus_minus = player_data.get('PlusMinus', 0) or 0
-            stats['plus_minus'] = original_plus_minus  # Сохраняем оригинальный плюс/минус
-            stats['kpi'] = kpi  # Добавляем отдельное поле КПИ
-            
-            return stats
+            return PlayerStatLine(
+                player_name.strip(),
+                player_data.get('TeamName') or player_data.get('team_name', ''),
+                points=self.extract_stat_value(player_data, ['Points', 'PTS', 'points', 'Очки']),
+                rebounds=self.extract_stat_value(player_data, ['Rebounds', 'REB', 'rebounds', 'Подборы', 'TRB']),
+                assists=self.extract_stat_value(player_data, ['Assists', 'AST', 'assists', 'Передачи', 'ПАС']),
+                steals=self.extract_stat_value(player_data, ['Steals', 'STL', 'steals', 'Перехваты', 'ПЕРЕХ']),
+                blocks=self.extract_stat_value(player_data, ['Blocks', 'BLK', 'blocks', 'Блокшоты', 'БЛОК']),
+                turnovers=self.extract_stat_value(player_data, ['Turnovers', 'TOV', 'turnovers', 'Потери', 'ПОТ']),
+                fouls=self.extract_stat_value(player_data, ['Fouls', 'PF', 'fouls', 'Фолы', 'ФОЛ']),
+                field_goals_made=self.extract_stat_value(player_data, ['FGM', 'field_goals_made', 'Попадания']),
+                field_goals_attempted=self.extract_stat_value(player_data, ['FGA', 'field_goals_attempted', 'Попытки']),
+                three_pointers_made=self.extract_stat_value(player_data, ['3PM', 'three_pointers_made', '3-очковые']),
+                three_pointers_attempted=self.extract_stat_value(player_data, ['3PA', 'three_pointers_attempted', '3-очковые попытки']),
+                free_throws_made=self.extract_stat_value(player_data, ['FTM', 'free_throws_made', 'Штрафные']),
+                free_throws_attempted=self.extract_stat_value(player_data, ['FTA', 'free_throws_attempted', 'Штрафные попытки']),
+                minutes=self.extract_stat_value(player_data, ['Minutes', 'MIN', 'minutes', 'Минуты', 'Время']),
+                position=player_data.get('Position') or player_data.get('position', ''),
+                jersey_number=player_data.get('JerseyNumber') or player_data.get('jersey_number', ''),
+                plus_minus=player_data.get('PlusMinus', 0),
+            )
             
         except Exception as e:
             print(f"❌ Ошибка парсинга статистики игрока: {e}")
@@ -803,70 +649,32 @@ class EnhancedGameParser:
                     return int(value)
         return 0
     
-    def find_best_players(self, players_stats: List[Dict]) -> Dict:
-        """Находит лучших игроков по различным показателям"""
+    def find_best_players(self, players_stats: List[PlayerStatLine]) -> Dict:
+        """Находит лучших игроков по различным показателям (один проход)"""
         try:
             if not players_stats:
                 return {}
 
-            best_players = {}
-
-            # MVP (игрок с наибольшим количеством очков)
-            mvp = max(players_stats, key=lambda p: p['points'])
-            best_players['mvp'] = {
-                'name': mvp['name'],
-                'points': mvp['points'],
-                'field_goal_percentage': mvp.get('field_goal_percentage', 0),
-                'team': mvp['team']
-            }
-
-            # Лучший по подборам
-            best_rebounder = max(players_stats, key=lambda p: p['rebounds'])
-            best_players['best_rebounder'] = {
-                'name': best_rebounder['name'],
-                'rebounds': best_rebounder['rebounds'],
-                'team': best_rebounder['team']
-            }
-
-            # Лучший по перехватам
-            best_stealer = max(players_stats, key=lambda p: p['steals'])
-            best_players['best_stealer'] = {
-                'name': best_stealer['name'],
-                'steals': best_stealer['steals'],
-                'team': best_stealer['team']
-            }
-
-            # Лучший по передачам
-            best_assister = max(players_stats, key=lambda p: p['assists'])
-            best_players['best_assister'] = {
-                'name': best_assister['name'],
-                'assists': best_assister['assists'],
-                'team': best_assister['team']
-            }
-
-            # Лучший по блокшотам
-            best_blocker = max(players_stats, key=lambda p: p['blocks'])
-            best_players['best_blocker'] = {
-                'name': best_blocker['name'],
-                'blocks': best_blocker['blocks'],
-                'team': best_blocker['team']
-            }
-
-            # Лучший плюс/минус
-            best_plus_minus = max(players_stats, key=lambda p: p['plus_minus'])
-            best_players['best_plus_minus'] = {
-                'name': best_plus_minus['name'],
-                'plus_minus': best_plus_minus['plus_minus'],
-                'team': best_plus_minus['team']
-            }
-
-            # Самый играющий игрок (по времени)
-            most_playing = max(players_stats, key=lambda p: p.get('minutes', '0:00'))
-            best_players['most_playing'] = {
-                'name': most_playing['name'],
-                'minutes': most_playing.get('minutes', '0:00'),
-                'team': most_playing['team']
+            selected = select_leaders(players_stats, BEST_PLAYER_RULES)
+            mvp = selected['mvp']
+            best_players = {
+                'mvp': {
+                    'name': mvp['name'],
+                    'points': mvp['points'],
+                    'field_goal_percentage': mvp.get('field_goal_percentage', 0),
+                    'team': mvp['team']
+                }
             }
+            for slot, field in (
+                ('best_rebounder', 'rebounds'),
+                ('best_stealer', 'steals'),
+                ('best_assister', 'assists'),
+                ('best_blocker', 'blocks'),
+                ('best_plus_minus', 'plus_minus'),
+                ('most_playing', 'minutes'),
+            ):
+                player = selected[slot]
+                best_players[slot] = {'name': player['name'], field: player.get(field), 'team': player['team']}
 
             print(f"🏆 Лучшие игроки найдены:")
             print(f"   MVP: {best_players['mvp']['name']} ({best_players['mvp']['points']} очков, {best_players['mvp']['field_goal_percentage']}%)")
@@ -882,34 +690,15 @@ class EnhancedGameParser:
             print(f"❌ Ошибка поиска лучших игроков: {e}")
             return {}
 
-    def find_our_team_leaders(self, players_stats: List[Dict], our_team_names: List[str] = None) -> Dict:
-        """Находит лидеров нашей команды в статистике"""
-        leaders = {}
-        
+    def find_our_team_leaders(self, players_stats: List[PlayerStatLine], our_team_names: List[str] = None) -> Dict:
+        """Находит лидеров нашей команды в статистике (один проход по игрокам)"""
         try:
-            if our_team_names is None:
-                our_team_names = []
-                if self.team_keywords:
-                    our_team_names.extend(self.team_keywords)
-                if self.team_configs:
-                    for data in self.team_configs.values():
-                        alt_name = data.get('alt_name')
-                        if isinstance(alt_name, str) and alt_name.strip():
-                            our_team_names.append(alt_name.strip())
-                our_team_names = list({name for name in our_team_names if isinstance(name, str) and name.strip()})
-
-            # Фильтруем игроков нашей команды
-            our_team_players = []
-            for player in players_stats:
-                # Проверяем, что игрок валидный (не None и имеет имя)
-                if (not player or not player.get('name') or 
-                    player.get('name').strip() == '' or 
-                    'None' in player.get('name', '')):
-                    continue
-                    
-                team_name = player.get('team', '')
-                if any(self._normalize_name(our_name) == self._normalize_name(team_name) for our_name in our_team_names):
-                    our_team_players.append(player)
+            # Фильтруем игроков нашей команды (названия нормализуются один раз);
+            # по умолчанию — ключевые слова и alt_name из справочника команд
+            our_team_players = team_players(
+                players_stats,
+                self.team_directory.our_team_matcher if our_team_names is None else our_team_names,
+            )
 
             if not our_team_players:
                 print("⚠️ Игроки нашей команды не найдены в статистике")
@@ -917,182 +706,19 @@ class EnhancedGameParser:
 
             print(f"🏀 Найдено игроков нашей команды: {len(our_team_players)}")
 
-            def _filter_players(attr: str) -> List[Dict[str, Any]]:
-                return [player for player in our_team_players if player.get(attr) is not None]
-
-            def _best_player(attr: str, default: float = float('-inf')) -> Optional[Dict[str, Any]]:
-                candidates = _filter_players(attr)
-                if not candidates:
-                    return None
-                return max(candidates, key=lambda p: p.get(attr, default))
-
-            def _worst_player(attr: str, default: float = float('inf')) -> Optional[Dict[str, Any]]:
-                candidates = _filter_players(attr)
-                if not candidates:
-                    return None
-                return min(candidates, key=lambda p: p.get(attr, default))
-
-            # Лучшие показатели
-            best_points_player = _best_player('points')
-            if best_points_player:
-                leaders['points'] = {
-                    'name': best_points_player['name'],
-                    'value': best_points_player.get('points', 0),
-                    'percentage': best_points_player.get('field_goal_percentage')
-                }
-
-            best_rebounds_player = _best_player('rebounds')
-            if best_rebounds_player:
-                leaders['rebounds'] = {
-                    'name': best_rebounds_player['name'],
-                    'value': best_rebounds_player.get('rebounds', 0)
-                }
-
-            best_assists_player = _best_player('assists')
-            if best_assists_player:
-                leaders['assists'] = {
-                    'name': best_assists_player['name'],
-                    'value': best_assists_player.get('assists', 0)
-                }
-
-            best_steals_player = _best_player('steals')
-            if best_steals_player:
-                leaders['steals'] = {
-                    'name': best_steals_player['name'],
-                    'value': best_steals_player.get('steals', 0)
-                }
-
-            best_blocks_player = _best_player('blocks')
-            if best_blocks_player:
-                leaders['blocks'] = {
-                    'name': best_blocks_player['name'],
-                    'value': best_blocks_player.get('blocks', 0)
-                }
-
-            best_kpi_player = _best_player('kpi')
-            if best_kpi_player:
-                leaders['best_kpi'] = {
-                    'name': best_kpi_player['name'],
-                    'value': best_kpi_player.get('kpi', 0)
-                }
-
-            best_plus_minus_player = _best_player('plus_minus')
-            if best_plus_minus_player:
-                leaders['best_plus_minus'] = {
-                    'name': best_plus_minus_player['name'],
-                    'value': best_plus_minus_player.get('plus_minus', 0)
-                }
-
-            # Анти-лидеры (худшие показатели)
-            anti_leaders = {}
-
-            # Анти-лидер по проценту попаданий (самый низкий процент)
-            # Фильтруем игроков с валидными именами для анти-лидеров
-            valid_players = [p for p in our_team_players if p.get('name') and p.get('name').strip() != '' and 'None' not in p.get('name', '')]
-            
-            
-            if valid_players:
-                # Лучшие проценты среди бросавших
-                ft_players_best = [p for p in valid_players if p.get('free_throws_attempted', 0) > 0]
-                if ft_players_best:
-                    best_ft = max(ft_players_best, key=lambda p: p.get('free_throw_percentage', 0))
-                    leaders['best_free_throw'] = {
-                        'name': best_ft['name'],
-                        'value': best_ft.get('free_throw_percentage', 0)
-                    }
-
-                two_pt_players_best = [p for p in valid_players if p.get('field_goals_attempted', 0) > 0]
-                if two_pt_players_best:
-                    best_2p = max(two_pt_players_best, key=lambda p: p.get('two_point_percentage', p.get('field_goal_percentage', 0)))
-                    leaders['best_two_point'] = {
-                        'name': best_2p['name'],
-                        'value': best_2p.get('two_point_percentage', best_2p.get('field_goal_percentage', 0))
-                    }
-
-                three_pt_players_best = [p for p in valid_players if p.get('three_pointers_attempted', 0) > 0]
-                if three_pt_players_best:
-                    best_3p = max(three_pt_players_best, key=lambda p: p.get('three_point_percentage', 0))
-                    leaders['best_three_point'] = {
-                        'name': best_3p['name'],
-                        'value': best_3p.get('three_point_percentage', 0)
-                    }
-
-                worst_shooting_leader = _worst_player('field_goal_percentage', default=100)
-                if worst_shooting_leader:
-                    anti_leaders['worst_shooting'] = {
-                        'name': worst_shooting_leader['name'],
-                        'value': worst_shooting_leader.get('field_goal_percentage', 0)
-                    }
-
-                turnovers_leader = _best_player('turnovers')
-                if turnovers_leader:
-                    anti_leaders['turnovers'] = {
-                        'name': turnovers_leader['name'],
-                        'value': turnovers_leader.get('turnovers', 0)
-                    }
-
-                fouls_leader = _best_player('fouls')
-                if fouls_leader:
-                    anti_leaders['fouls'] = {
-                        'name': fouls_leader['name'],
-                        'value': fouls_leader.get('fouls', 0)
-                    }
-
-                # Анти-лидер по КПИ (минимальный KPI)
-                worst_kpi_player = _worst_player('kpi')
-                if worst_kpi_player:
-                    anti_leaders['worst_kpi'] = {
-                        'name': worst_kpi_player['name'],
-                        'value': worst_kpi_player.get('kpi', 0)
-                    }
-
-                worst_plus_minus_player = _worst_player('plus_minus')
-                if worst_plus_minus_player:
-                    anti_leaders['worst_plus_minus'] = {
-                        'name': worst_plus_minus_player['name'],
-                        'value': worst_plus_minus_player.get('plus_minus', 0)
-                    }
-                
-                # Анти-лидер по штрафным броскам (самый низкий процент среди бросавших)
-                ft_players = [p for p in valid_players if p.get('free_throws_attempted', 0) > 0]
-                if ft_players:
-                    # Сначала находим минимальный процент
-                    min_ft_percentage = min(p.get('free_throw_percentage', 100) for p in ft_players)
-                    # Затем среди игроков с минимальным процентом берем того, у кого больше попыток
-                    worst_ft_candidates = [p for p in ft_players if p.get('free_throw_percentage', 100) == min_ft_percentage]
-                    worst_free_throw_leader = max(worst_ft_candidates, key=lambda p: p.get('free_throws_attempted', 0))
-                    anti_leaders['worst_free_throw'] = {
-                        'name': worst_free_throw_leader['name'],
-                        'value': worst_free_throw_leader.get('free_throw_percentage', 0)
-                    }
-                
-                # Анти-лидер по двухочковым броскам (самый низкий процент среди бросавших)
-                two_pt_players = [p for p in valid_players if p.get('field_goals_attempted', 0) > 0]
-                if two_pt_players:
-                    # Сначала находим минимальный процент
-                    min_2pt_percentage = min(p.get('two_point_percentage', p.get('field_goal_percentage', 100)) for p in two_pt_players)
-                    # Затем среди игроков с минимальным процентом берем того, у кого больше попыток
-                    worst_2pt_candidates = [p for p in two_pt_players if p.get('two_point_percentage', p.get('field_goal_percentage', 100)) == min_2pt_percentage]
-                    worst_two_point_leader = max(worst_2pt_candidates, key=lambda p: p.get('field_goals_attempted', 0))
-                    anti_leaders['worst_two_point'] = {
-                        'name': worst_two_point_leader['name'],
-                        'value': worst_two_point_leader.get('two_point_percentage', worst_two_point_leader.get('field_goal_percentage', 0))
-                    }
-                
-                # Анти-лидер по трехочковым броскам (самый низкий процент среди бросавших)
-                three_pt_players = [p for p in valid_players if p.get('three_pointers_attempted', 0) > 0]
-                if three_pt_players:
-                    # Сначала находим минимальный процент
-                    min_3pt_percentage = min(p.get('three_point_percentage', 100) for p in three_pt_players)
-                    # Затем среди игроков с минимальным процентом берем того, у кого больше попыток
-                    worst_3pt_candidates = [p for p in three_pt_players if p.get('three_point_percentage', 100) == min_3pt_percentage]
-                    worst_three_point_leader = max(worst_3pt_candidates, key=lambda p: p.get('three_pointers_attempted', 0))
-                    anti_leaders['worst_three_point'] = {
-                        'name': worst_three_point_leader['name'],
-                        'value': worst_three_point_leader.get('three_point_percentage', 0)
-                    }
-            else:
-                print("⚠️ Нет игроков с валидными именами для анти-лидеров")
+            selected = select_leaders(our_team_players, TEAM_LEADER_RULES)
+            field_by_slot = {rule.slot: rule.field for rule in TEAM_LEADER_RULES}
+
+            leaders: Dict[str, Any] = {}
+            anti_leaders: Dict[str, Any] = {}
+            for slot, player in selected.items():
+                entry = {'name': player['name'], 'value': player.get(field_by_slot[slot], 0)}
+                if slot == 'points':
+                    entry['percentage'] = player.get('field_goal_percentage')
+                if slot in TEAM_ANTI_LEADER_SLOTS:
+                    anti_leaders[slot] = entry
+                else:
+                    leaders[slot] = entry
 
             leaders['anti_leaders'] = anti_leaders
 
@@ -1128,14 +754,12 @@ class EnhancedGameParser:
             print(f"🔍 Парсинг статистики через protocol: {game_url}")
             
             # Загружаем страницу с protocol
-            async with self.session.get(game_url) as response:
+            async with cached_get(game_url, self.session) as response:
                 if response.status == 200:
                     content = await response.text()
-                    from bs4 import BeautifulSoup
-                    soup = BeautifulSoup(content, 'html.parser')
                     
                     # Сначала пробуем парсить HTML таблицу статистики
-                    player_stats = self.parse_html_statistics_table(soup)
+                    player_stats = self.parse_html_statistics_table(content)
                     
                     if player_stats:
                         # Находим лучших игроков
@@ -1150,8 +774,7 @@ class EnhancedGameParser:
                     
                     # Если HTML таблица не найдена, пробуем protocol
                     print("🔍 HTML таблица не найдена, пробуем protocol...")
-                    page_text = soup.get_text()
-                    player_stats = self.parse_protocol_statistics(page_text)
+                    player_stats = self.parse_protocol_statistics(page_text(content))
                     
                     if player_stats:
                         # Находим лучших игроков
@@ -1174,161 +797,48 @@ class EnhancedGameParser:
             print(f"❌ Ошибка парсинга protocol: {e}")
             return None
     
-    def parse_protocol_statistics(self, page_text: str) -> List[Dict]:
-        """Парсит статистику игроков из текста protocol"""
+    def parse_protocol_statistics(self, page_text: str) -> List[PlayerStatLine]:
+        """Парсит статистику игроков из текста protocol
+
+        Пример: protocol.player1.Points: 15 или protocol.team1.player1.Points: 15.
+        Все показатели извлекаются одним проходом по тексту (scan_protocol_statistics).
+        """
         try:
-            players_stats = []
-            
-            # Ищем паттерны статистики игроков в protocol
-            # Пример: protocol.player1.Points = 15
-            # Или: protocol.team1.player1.Points = 15
-            
-            # Паттерны для поиска статистики
-            stat_patterns = {
-                'points': r'protocol\.(?:team\d+\.)?player\d+\.Points[:\s]*(\d+)',
-                'rebounds': r'protocol\.(?:team\d+\.)?player\d+\.Rebounds[:\s]*(\d+)',
-                'assists': r'protocol\.(?:team\d+\.)?player\d+\.Assists[:\s]*(\d+)',
-                'steals': r'protocol\.(?:team\d+\.)?player\d+\.Steals[:\s]*(\d+)',
-                'blocks': r'protocol\.(?:team\d+\.)?player\d+\.Blocks[:\s]*(\d+)',
-                'turnovers': r'protocol\.(?:team\d+\.)?player\d+\.Turnovers[:\s]*(\d+)',
-                'fouls': r'protocol\.(?:team\d+\.)?player\d+\.Fouls[:\s]*(\d+)',
-                'field_goals_made': r'protocol\.(?:team\d+\.)?player\d+\.FieldGoalsMade[:\s]*(\d+)',
-                'field_goals_attempted': r'protocol\.(?:team\d+\.)?player\d+\.FieldGoalsAttempted[:\s]*(\d+)',
-                'three_pointers_made': r'protocol\.(?:team\d+\.)?player\d+\.ThreePointersMade[:\s]*(\d+)',
-                'three_pointers_attempted': r'protocol\.(?:team\d+\.)?player\d+\.ThreePointersAttempted[:\s]*(\d+)',
-                'free_throws_made': r'protocol\.(?:team\d+\.)?player\d+\.FreeThrowsMade[:\s]*(\d+)',
-                'free_throws_attempted': r'protocol\.(?:team\d+\.)?player\d+\.FreeThrowsAttempted[:\s]*(\d+)',
-                'minutes': r'protocol\.(?:team\d+\.)?player\d+\.Minutes[:\s]*(\d+(?:\.\d+)?)'
-            }
-            
-            # Ищем имена игроков
-            name_pattern = r'protocol\.(?:team\d+\.)?player(\d+)\.Name[:\s]*([^\n\r]+)'
-            name_matches = re.findall(name_pattern, page_text)
-            
-            print(f"🔍 Найдено {len(name_matches)} игроков в protocol")
-            
-            # Для каждого игрока собираем статистику
-            for player_num, player_name in name_matches:
-                player_name = player_name.strip()
-                if not player_name:
-                    continue
-                
-                player_stats = {
-                    'name': player_name,
-                    'player_number': player_num,
-                    'points': 0,
-                    'rebounds': 0,
-                    'assists': 0,
-                    'steals': 0,
-                    'blocks': 0,
-                    'turnovers': 0,
-                    'fouls': 0,
-                    'field_goals_made': 0,
-                    'field_goals_attempted': 0,
-                    'three_pointers_made': 0,
-                    'three_pointers_attempted': 0,
-                    'free_throws_made': 0,
-                    'free_throws_attempted': 0,
-                    'minutes': 0,
-                    'team': '',
-                    'position': '',
-                    'jersey_number': ''
-                }
-                
-                # Извлекаем статистику для каждого игрока
-                for stat_name, pattern in stat_patterns.items():
-                    # Заменяем player\d+ на конкретный номер игрока
-                    specific_pattern = pattern.replace(r'player\d+', f'player{player_num}')
-                    matches = re.findall(specific_pattern, page_text)
-                    
-                    if matches:
-                        try:
-                            value = float(matches[0]) if '.' in matches[0] else int(matches[0])
-                            player_stats[stat_name] = value
-                        except (ValueError, IndexError):
-                            pass
-                
-                # Вычисляем проценты попаданий
-                # Общий процент попаданий = (все попадания) / (все попытки) * 100
-                total_made = (player_stats['free_throws_made'] + player_stats['field_goals_made'] + player_stats['three_pointers_made'])
-                total_attempted = (player_stats['free_throws_attempted'] + player_stats['field_goals_attempted'] + player_stats['three_pointers_attempted'])
-                
-                if total_attempted > 0:
-                    player_stats['field_goal_percentage'] = round((total_made / total_attempted) * 100, 1)
-                else:
-                    player_stats['field_goal_percentage'] = 0.0
-                
-                if player_stats['three_pointers_attempted'] > 0:
-                    player_stats['three_point_percentage'] = round((player_stats['three_pointers_made'] / player_stats['three_pointers_attempted']) * 100, 1)
-                else:
-                    player_stats['three_point_percentage'] = 0.0
-                
-                if player_stats['free_throws_attempted'] > 0:
-                    player_stats['free_throw_percentage'] = round((player_stats['free_throws_made'] / player_stats['free_throws_attempted']) * 100, 1)
-                else:
-                    player_stats['free_throw_percentage'] = 0.0
-                
-                # Вычисляем КПИ по формуле:
-                # КПИ = (Очки + Подборы + Передачи + Перехваты + Блоки + Фолы соперника - Промахи - Потери - Фолы)
-                misses = total_attempted - total_made
-                opponent_fouls = player_stats.get('opponent_fouls', 0) or 0  # Берем из данных, если есть
-                
-                kpi = (player_stats['points'] + player_stats['rebounds'] + player_stats['assists'] + 
-                       player_stats['steals'] + player_stats['blocks'] + opponent_fouls - 
-                       misses - player_stats['turnovers'] - player_stats['fouls'])
-                
-                original_plus_minus = player_data.get('PlusMinus', 0) or 0
-                player_stats['plus_minus'] = original_plus_minus  # Сохраняем оригинальный плюс/минус
-                player_stats['kpi'] = kpi  # Добавляем отдельное поле КПИ
-                player_stats['opponent_fouls'] = opponent_fouls  # Сохраняем фолы соперника
-                
-                # Определяем команду игрока
-                team_pattern = r'protocol\.team(\d+)\.player' + player_num
-                team_matches = re.findall(team_pattern, page_text)
-                if team_matches:
-                    player_stats['team'] = f"Team{team_matches[0]}"
-                
-                players_stats.append(player_stats)
-                print(f"   📊 {player_name}: {player_stats['points']} очков, {player_stats['rebounds']} подборов, {player_stats['steals']} перехватов")
-            
+            players_stats = scan_protocol_statistics(page_text)
+            print(f"🔍 Найдено {len(players_stats)} игроков в protocol")
+            for player in players_stats:
+                print(f"   📊 {player.name}: {player.points} очков, {player.rebounds} подборов, {player.steals} перехватов")
             return players_stats
             
         except Exception as e:
             print(f"❌ Ошибка парсинга protocol статистики: {e}")
             return []
     
-    def parse_html_statistics_table(self, soup) -> List[Dict]:
-        """Парсит статистику игроков из HTML таблицы"""
+    def parse_html_statistics_table(self, content: str) -> List[PlayerStatLine]:
+        """Парсит статистику игроков из HTML таблицы (разбирается только таблица)"""
         try:
-            players_stats = []
+            players_stats: List[PlayerStatLine] = []
             
             # Ищем таблицу со статистикой
-            stats_table = soup.find('table', class_='statistics__table')
-            if not stats_table:
+            stats_table = find_stats_table(content)
+            if stats_table is None:
                 print("⚠️ Таблица статистики не найдена")
                 return []
             
             print("✅ Найдена таблица статистики")
             
-            # Получаем заголовки таблицы
-            headers = []
-            header_row = stats_table.find('thead')
-            if header_row:
-                header_cells = header_row.find_all('th')
-                headers = [cell.get_text().strip() for cell in header_cells]
+            headers, rows = stats_table
+            if headers:
                 print(f"📋 Заголовки таблицы: {headers}")
             
-            # Получаем строки с данными игроков
-            tbody = stats_table.find('tbody')
-            if not tbody:
+            # Строки с данными игроков
+            if not rows:
                 print("⚠️ Тело таблицы не найдено")
                 return []
             
-            rows = tbody.find_all('tr')
             print(f"🔍 Найдено {len(rows)} строк с данными игроков")
             
-            for row in rows:
-                cells = row.find_all('td')
+            for cells in rows:
                 if len(cells) < 3:  # Минимум: имя, команда, очки
                     continue
                 
@@ -1336,20 +846,18 @@ class EnhancedGameParser:
                 player_data = {}
                 
                 # Имя игрока (обычно в первой колонке)
-                player_name_cell = cells[0]
-                player_name = player_name_cell.get_text().strip()
+                player_name = cells[0]
                 if not player_name:
                     continue
                 
                 player_data['name'] = player_name
                 
                 # Извлекаем статистику по колонкам
-                for i, cell in enumerate(cells[1:], 1):  # Пропускаем первую колонку с именем
+                for i, value_text in enumerate(cells[1:], 1):  # Пропускаем первую колонку с именем
                     if i >= len(headers):
                         continue
                     
                     header = headers[i].lower()
-                    value_text = cell.get_text().strip()
                     
                     # Пытаемся извлечь числовое значение
                     try:
@@ -1400,55 +908,11 @@ class EnhancedGameParser:
                     elif 'минут' in header or 'minute' in header or 'min' in header:
                         player_data['minutes'] = value
                 
-                # Устанавливаем значения по умолчанию для отсутствующих полей
-                default_stats = {
-                    'points': 0, 'rebounds': 0, 'assists': 0, 'steals': 0, 'blocks': 0,
-                    'turnovers': 0, 'fouls': 0, 'field_goals_made': 0, 'field_goals_attempted': 0,
-                    'three_pointers_made': 0, 'three_pointers_attempted': 0,
-                    'free_throws_made': 0, 'free_throws_attempted': 0, 'minutes': 0,
-                    'team': '', 'position': '', 'jersey_number': ''
-                }
-                
-                for key, default_value in default_stats.items():
-                    if key not in player_data:
-                        player_data[key] = default_value
-                
-                # Вычисляем проценты попаданий
-                # Общий процент попаданий = (все попадания) / (все попытки) * 100
-                total_made = (player_data['free_throws_made'] + player_data['field_goals_made'] + player_data['three_pointers_made'])
-                total_attempted = (player_data['free_throws_attempted'] + player_data['field_goals_attempted'] + player_data['three_pointers_attempted'])
-                
-                if total_attempted > 0:
-                    player_data['field_goal_percentage'] = round((total_made / total_attempted) * 100, 1)
-                else:
-                    player_data['field_goal_percentage'] = 0.0
-                
-                if player_data['three_pointers_attempted'] > 0:
-                    player_data['three_point_percentage'] = round((player_data['three_pointers_made'] / player_data['three_pointers_attempted']) * 100, 1)
-                else:
-                    player_data['three_point_percentage'] = 0.0
-                
-                if player_data['free_throws_attempted'] > 0:
-                    player_data['free_throw_percentage'] = round((player_data['free_throws_made'] / player_data['free_throws_attempted']) * 100, 1)
-                else:
-                    player_data['free_throw_percentage'] = 0.0
-                
-                # Вычисляем КПИ по формуле:
-                # КПИ = (Очки + Подборы + Передачи + Перехваты + Блоки + Фолы соперника - Промахи - Потери - Фолы)
-                misses = total_attempted - total_made
-                opponent_fouls = player_data.get('opponent_fouls', 0) or 0  # Берем из данных, если есть
-                
-                kpi = (player_data['points'] + player_data['rebounds'] + player_data['assists'] + 
-                       player_data['steals'] + player_data['blocks'] + opponent_fouls - 
-                       misses - player_data['turnovers'] - player_data['fouls'])
-                
-                original_plus_minus = player_data.get('PlusMinus', 0) or 0
-                player_data['plus_minus'] = original_plus_minus  # Сохраняем оригинальный плюс/минус
-                player_data['kpi'] = kpi  # Добавляем отдельное поле КПИ
-                player_data['opponent_fouls'] = opponent_fouls  # Сохраняем фолы соперника
-                
-                players_stats.append(player_data)
-                print(f"   📊 {player_name}: {player_data['points']} очков, {player_data['rebounds']} подборов, {player_data['steals']} перехватов")
+                # Отсутствующие поля получают значения по умолчанию, проценты и КПИ считаются в строке
+                player_data.pop('name', None)
+                player_line = PlayerStatLine(player_name, '', **player_data)
+                players_stats.append(player_line)
+                print(f"   📊 {player_name}: {player_line.points} очков, {player_line.rebounds} подборов, {player_line.steals} перехватов")
             
             return players_stats
             
@@ -1496,62 +960,18 @@ class EnhancedGameParser:
             print(f"❌ Ошибка парсинга игры: {e}")
             return None
 
-    def _compute_quarter_scores(self, online_data: Dict[str, Any]) -> List[str]:
-        """Рассчитывает счет по четвертям на основе OnlinePlays"""
-        try:
-            plays: List[Dict[str, Any]] = online_data.get('OnlinePlays') or []
-            starts: List[Dict[str, Any]] = online_data.get('OnlineStarts') or []
-            if not plays or not starts:
-                return []
-
-            start_map: Dict[Any, Dict[str, Any]] = {}
-            for start in starts:
-                start_id = start.get('StartID')
-                if start_id is not None:
-                    start_map[start_id] = start
-
-            online_meta: Dict[str, Any] = online_data.get('Online') or {}
-            scoring_values: Dict[int, int] = {
-                1: int(online_meta.get('FreeThrowValue') or 1),
-                2: int(online_meta.get('FieldGoalValue') or 2),
-                3: int(online_meta.get('LongShotValue') or 3),
-            }
-
-            quarter_totals: Dict[int, Dict[int, int]] = defaultdict(lambda: {1: 0, 2: 0})
-
-            def _sort_key(play: Dict[str, Any]) -> Any:
-                return (
-                    play.get('PlayPeriod') or 0,
-                    play.get('PlaySecond') or 0,
-                    play.get('PlaySortOrder') or 0,
-                    play.get('PlayID') or 0,
-                )
-
-            for play in sorted(plays, key=_sort_key):
-                if play.get('SysStatus') not in (None, 1):
-                    continue
-
-                points = scoring_values.get(play.get('PlayTypeID'))
-                if not points:
-                    continue
-
-                start_data = start_map.get(play.get('StartID'))
-                team_number = start_data.get('TeamNumber') if start_data else None
-                if team_number not in (1, 2):
-                    continue
+    def _compute_quarter_scores(self, online_data: Dict[str, Any], game_id: Any = None) -> List[str]:
+        """Рассчитывает счет по четвертям на основе OnlinePlays
 
-                period = play.get('PlayPeriod')
-                if period is None:
-                    continue
-
-                entry = quarter_totals[period]
-                entry[team_number] = entry.get(team_number, 0) + int(points)
-
-            if not quarter_totals:
+        Для игры с game_id процессор сохраняется между вызовами: повторный опрос
+        идущей игры учитывает только новые эпизоды.
+        """
+        try:
+            if not online_data.get('OnlinePlays') or not online_data.get('OnlineStarts'):
                 return []
-
-            ordered_periods = sorted(quarter_totals.items())
-            return [f"{period_scores.get(1, 0)}:{period_scores.get(2, 0)}" for _, period_scores in ordered_periods]
+            processor = processor_for_game(game_id)
+            processor.apply(online_data)
+            return processor.quarter_scores()
 
         except Exception as error:
             print(f"⚠️ Не удалось вычислить счет по четвертям: {error}")
@@ -1608,6 +1028,7 @@ async def test_parser():
                 print(f"\n⚠️ Статистика игроков недоступна")
         else:
             print(f"❌ Парсинг не удался")
+    await shared_http_client.close()
 
 if __name__ == "__main__":
     asyncio.run(test_parser())
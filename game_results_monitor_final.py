@@ -9,13 +9,19 @@ import asyncio
 import os
 import json
 import re
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Set, Any
+import aiohttp
 from dotenv import load_dotenv
 from telegram import Bot
 from datetime_utils import get_moscow_time
 from game_system_manager import GameSystemManager
 from enhanced_duplicate_protection import duplicate_protection, TEST_MODE
+from sheets_rate_limiter import sheets_rate_limiter
+from html_extract import page_text
+from http_client import cached_get, http_session, shared_http_client
+from play_by_play import forget_game
 
 # Централизованная загрузка переменных окружения
 def load_environment():
@@ -35,21 +41,43 @@ BOT_TOKEN = os.getenv("BOT_TOKEN")
 CHAT_ID = os.getenv("CHAT_ID")
 ANNOUNCEMENTS_TOPIC_ID = os.getenv("ANNOUNCEMENTS_TOPIC_ID")
 
+# Режим демона: типичная длительность игры, интервалы опроса (сек) и ограничения
+RESULTS_GAME_DURATION_MINUTES = int(os.getenv("RESULTS_GAME_DURATION_MINUTES", "100"))
+RESULTS_POLL_INITIAL_SECONDS = float(os.getenv("RESULTS_POLL_INITIAL_SECONDS", "120"))
+RESULTS_POLL_MAX_SECONDS = float(os.getenv("RESULTS_POLL_MAX_SECONDS", "900"))
+RESULTS_GIVE_UP_MINUTES = int(os.getenv("RESULTS_GIVE_UP_MINUTES", "180"))
+RESULTS_DAEMON_MAX_RUNTIME_MINUTES = int(os.getenv("RESULTS_DAEMON_MAX_RUNTIME_MINUTES", "330"))
+
 print(f"🔧 ПЕРЕМЕННЫЕ ОКРУЖЕНИЯ:")
 print(f"   BOT_TOKEN: {'✅' if BOT_TOKEN else '❌'}")
 print(f"   CHAT_ID: {'✅' if CHAT_ID else '❌'}")
 print(f"   ANNOUNCEMENTS_TOPIC_ID: {'✅' if ANNOUNCEMENTS_TOPIC_ID else '❌'}")
 
+@dataclass
+class TrackedGame:
+    """Сегодняшняя игра, результат которой ждёт демон"""
+
+    link: str
+    label: str
+    expected_end: datetime
+    next_check: datetime
+    attempts: int = 0
+    # Время начала не указано: опрос с интервалом RESULTS_POLL_MAX_SECONDS
+    untimed: bool = False
+
+
 class GameResultsMonitorFinal:
     """Финальная система мониторинга результатов игр"""
     
-    def __init__(self):
+    def __init__(self, http_session: Optional[aiohttp.ClientSession] = None):
         self.bot = None
         if BOT_TOKEN:
             self.bot = Bot(token=BOT_TOKEN)
+        # Общая HTTP-сессия; без неё используется shared_http_client
+        self.http_session = http_session
         
         # Создаем экземпляр менеджера игр
-        self.game_manager = GameSystemManager()
+        self.game_manager = GameSystemManager(bot=self.bot, http_session=http_session)
     
     def create_result_key(self, game_info: Dict) -> str:
         """Создает уникальный ключ для результата игры"""
@@ -74,19 +102,14 @@ class GameResultsMonitorFinal:
     async def fetch_game_results(self) -> List[Dict]:
         """Получает результаты игр с сайта letobasket.ru"""
         try:
-            import aiohttp
-            from bs4 import BeautifulSoup
-            
             url = "http://letobasket.ru/"
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
+            async with http_session(self.http_session) as session:
+                async with cached_get(url, session) as response:
                     if response.status == 200:
                         content = await response.text()
-                        soup = BeautifulSoup(content, 'html.parser')
-                        
                         # Получаем весь текст страницы
-                        full_text = soup.get_text()
+                        full_text = page_text(content)
                         
                         # Ищем завершенные игры с нашими командами
                         games = []
@@ -99,6 +122,7 @@ class GameResultsMonitorFinal:
                         
                         print(f"🔍 Найдено {len(matches)} потенциальных игр в тексте")
                         
+                        team_directory = self.game_manager.team_directory
                         for match in matches:
                             date, raw_team1, raw_team2, score1, score2, quarters = match
                             team1 = raw_team1.strip()
@@ -109,8 +133,8 @@ class GameResultsMonitorFinal:
                             
                             # Проверяем, что игра сегодняшняя и содержит нашу команду
                             if self.game_manager.is_game_today({'date': date}) and self.game_manager.find_target_teams_in_text(game_text):
-                                team1_config = self.game_manager.resolve_team_config(team1)
-                                team2_config = self.game_manager.resolve_team_config(team2)
+                                team1_config = team_directory.resolve(team1)
+                                team2_config = team_directory.resolve(team2)
                                 team1_matches = bool(team1_config) or bool(self.game_manager.find_target_teams_in_text(team1))
                                 team2_matches = bool(team2_config) or bool(self.game_manager.find_target_teams_in_text(team2))
                                 
@@ -187,24 +211,27 @@ class GameResultsMonitorFinal:
             today = get_moscow_time().strftime('%d.%m.%Y')
             games = []
             
-            # Получаем все данные из сервисного листа
-            worksheet = duplicate_protection._get_service_worksheet()
-            if not worksheet:
+            # Получаем записи из снимка сервисного листа
+            if not await duplicate_protection.aservice_storage_ready():
                 print("❌ Сервисный лист недоступен")
                 return []
             
-            all_data = worksheet.get_all_values()
-            
+            # Игры, результат которых уже записан, не опрашиваем
+            reported = {
+                self._normalize_game_link(record['link'])
+                for record in await duplicate_protection.aget_records_for_date("РЕЗУЛЬТАТ_ИГРА", today)
+                if record.get('link')
+            }
+
             # Ищем записи типа АНОНС_ИГРА за сегодня с ссылками
-            for row in all_data:
-                if (len(row) >= 6 and 
-                    row[0] == "АНОНС_ИГРА" and 
-                    today in row[1] and 
-                    row[5]):  # Есть ссылка
+            for record in await duplicate_protection.aget_records_for_date("АНОНС_ИГРА", today):
+                if (record['type'] == "АНОНС_ИГРА" and 
+                    record['link']):  # Есть ссылка
                     
-                    game_link = row[5]
-                    if not game_link.startswith('http'):
-                        game_link = f"http://letobasket.ru/{game_link}"
+                    game_link = self._normalize_game_link(record['link'])
+                    if game_link in reported:
+                        print(f"⏭️ Результат уже отправлен: {game_link}")
+                        continue
                     
                     print(f"🔍 Парсим игру по ссылке: {game_link}")
                     
@@ -227,7 +254,7 @@ class GameResultsMonitorFinal:
         try:
             # 1. Сначала ищем в сервисном листе Google Sheets (самый надежный способ)
             from enhanced_duplicate_protection import duplicate_protection
-            link_from_service_sheet = duplicate_protection.find_game_link_for_today(team1, team2)
+            link_from_service_sheet = await duplicate_protection.afind_game_link_for_today(team1, team2)
             if link_from_service_sheet:
                 print(f"🔗 Найдена ссылка в сервисном листе: {link_from_service_sheet}")
                 return link_from_service_sheet
@@ -259,8 +286,9 @@ class GameResultsMonitorFinal:
             from enhanced_game_parser import EnhancedGameParser
             
             async with EnhancedGameParser(
-                team_configs=self.game_manager.team_configs,
-                team_keywords=self.game_manager.team_name_keywords,
+                team_directory=self.game_manager.team_directory,
+                http_session=self.http_session,
+                base_url=self.game_manager.base_url,
             ) as parser:
                 game_info = await parser.parse_game_from_url(game_link)
                 if game_info and game_info.get('result'):
@@ -320,8 +348,9 @@ class GameResultsMonitorFinal:
             from enhanced_game_parser import EnhancedGameParser
 
             async with EnhancedGameParser(
-                team_configs=self.game_manager.team_configs,
-                team_keywords=self.game_manager.team_name_keywords,
+                team_directory=self.game_manager.team_directory,
+                http_session=self.http_session,
+                base_url=self.game_manager.base_url,
             ) as parser:
                 game_id = parser.extract_game_id_from_url(game_link)
                 api_url = parser.extract_api_url_from_url(game_link)
@@ -367,12 +396,13 @@ class GameResultsMonitorFinal:
                         if isinstance(value, str) and value.strip():
                             candidate_names.add(value.strip())
 
+                team_directory = self.game_manager.team_directory
                 for team_id in self.game_manager.config_team_ids:
-                    resolved = self.game_manager._resolve_team_name(team_id)
+                    resolved = team_directory.display_name(team_id)
                     if isinstance(resolved, str) and resolved.strip():
                         candidate_names.add(resolved.strip())
 
-                candidate_names.update(self.game_manager.team_name_keywords or [])
+                candidate_names.update(team_directory.keywords)
 
                 if not candidate_names:
                     return None
@@ -450,7 +480,7 @@ class GameResultsMonitorFinal:
             
             # Проверяем дублирование в Google Sheets
             print(f"🔍 Проверяем дублирование в Google Sheets для игры: {game_info['team1']} vs {game_info['team2']}")
-            duplicate_check = duplicate_protection.check_duplicate("РЕЗУЛЬТАТ_ИГРА", result_key)
+            duplicate_check = await duplicate_protection.acheck_duplicate("РЕЗУЛЬТАТ_ИГРА", result_key)
             
             if duplicate_check.get('exists'):
                 print(f"⏭️ Результат для игры {game_info['team1']} vs {game_info['team2']} уже отправлен (найдено в Google Sheets)")
@@ -497,7 +527,7 @@ class GameResultsMonitorFinal:
             our_team_label = self.game_manager._get_team_display_name(our_team_id, game_info.get('our_team')) if hasattr(self.game_manager, '_get_team_display_name') else game_info.get('our_team')
             opponent_label = self.game_manager._get_team_display_name(opponent_team_id, game_info.get('opponent')) if hasattr(self.game_manager, '_get_team_display_name') else game_info.get('opponent')
 
-            protection_result = duplicate_protection.add_record(
+            protection_result = await duplicate_protection.aadd_record(
                 "РЕЗУЛЬТАТ_ИГРА",
                 result_key,
                 "ОТПРАВЛЯЕТСЯ",  # Временный статус
@@ -532,14 +562,14 @@ class GameResultsMonitorFinal:
                 
                 # Обновляем статус в Google Sheets на "ОТПРАВЛЕНО"
                 if protection_result.get('success') and protection_result.get('unique_key'):
-                    duplicate_protection.update_record_status(protection_result['unique_key'], "ОТПРАВЛЕНО")
+                    await duplicate_protection.aupdate_record_status(protection_result['unique_key'], "ОТПРАВЛЕНО")
                     print(f"✅ Статус обновлен в Google Sheets: ОТПРАВЛЕНО")
                 
             except Exception as send_error:
                 print(f"❌ Ошибка отправки: {send_error}")
                 # Обновляем статус на "ОШИБКА" если отправка не удалась
                 if protection_result.get('success') and protection_result.get('unique_key'):
-                    duplicate_protection.update_record_status(protection_result['unique_key'], "ОШИБКА")
+                    await duplicate_protection.aupdate_record_status(protection_result['unique_key'], "ОШИБКА")
                 return False
             
             print(f"✅ Результат игры отправлен: {game_info['our_team']} vs {game_info['opponent']}")
@@ -565,7 +595,10 @@ class GameResultsMonitorFinal:
         print(f"\n📊 Статистика из Google Sheets:")
         try:
             from enhanced_duplicate_protection import duplicate_protection
-            stats = duplicate_protection.get_statistics()
+            # Сервисный лист читается один раз за запуск, дальше работаем со снимком
+            sheets_rate_limiter.set_phase("мониторинг результатов")
+            await duplicate_protection.areload_service_snapshot()
+            stats = await duplicate_protection.aget_statistics()
             if 'РЕЗУЛЬТАТ_ИГРА' in stats:
                 result_stats = stats['РЕЗУЛЬТАТ_ИГРА']
                 print(f"   📈 Всего результатов: {result_stats.get('total', 0)}")
@@ -594,19 +627,13 @@ class GameResultsMonitorFinal:
             from datetime_utils import get_moscow_time
             today = get_moscow_time().strftime('%d.%m.%Y')
             
-            # Получаем все данные из сервисного листа
-            worksheet = duplicate_protection._get_service_worksheet()
-            if worksheet:
-                all_data = worksheet.get_all_values()
-                
+            if await duplicate_protection.aservice_storage_ready():
                 # Ищем записи типа АНОНС_ИГРА за сегодня
-                for row in all_data:
-                    if (len(row) >= 6 and 
-                        row[0] == "АНОНС_ИГРА" and 
-                        today in row[1] and  # Дата в колонке B
-                        row[5]):  # Ссылка в колонке F
+                for record in await duplicate_protection.aget_records_for_date("АНОНС_ИГРА", today):
+                    if (record['type'] == "АНОНС_ИГРА" and 
+                        record['link']):  # Ссылка в колонке F
                         today_games_found = True
-                        print(f"✅ Найдена игра на сегодня: {row[2]} (ссылка: {row[5]})")
+                        print(f"✅ Найдена игра на сегодня: {record['unique_key']} (ссылка: {record['link']})")
                         break
                 
                 if not today_games_found:
@@ -647,6 +674,9 @@ class GameResultsMonitorFinal:
             # Небольшая пауза между отправками
             await asyncio.sleep(2)
         
+        await duplicate_protection.aflush_pending_writes()
+        sheets_rate_limiter.print_report()
+        
         print(f"\n📊 ИТОГИ:")
         print(f"✅ Отправлено результатов: {sent_count}")
         print(f"📋 Всего игр: {len(games)}")
@@ -656,10 +686,178 @@ class GameResultsMonitorFinal:
         else:
             print("\n⚠️ Результаты не отправлены (возможно, уже были отправлены ранее)")
 
+    @staticmethod
+    def _expected_end(record: Dict[str, Any], now: datetime) -> Optional[datetime]:
+        """Ожидаемое окончание игры: начало + типичная длительность (None — время начала неизвестно)"""
+        game_time = str(record.get('game_time') or '').replace('.', ':').strip()
+        try:
+            start = datetime.strptime(game_time, '%H:%M')
+        except ValueError:
+            return None
+        started_at = now.replace(hour=start.hour, minute=start.minute, second=0, microsecond=0)
+        return started_at + timedelta(minutes=RESULTS_GAME_DURATION_MINUTES)
+
+    @staticmethod
+    def _normalize_game_link(link: str) -> str:
+        return link if link.startswith('http') else f"http://letobasket.ru/{link}"
+
+    async def build_today_games(
+        self,
+        tracked: Optional[List[TrackedGame]] = None,
+        retired: Optional[Set[str]] = None,
+    ) -> List[TrackedGame]:
+        """Собирает сегодняшние игры с ссылками из снимка сервисного листа.
+
+        Игры, результат которых уже записан (этим или другим запуском), пропускаются,
+        как и ссылки из retired — игры, которые демон уже перестал ждать.
+        Игры из tracked сохраняют своё расписание опроса.
+        """
+        now = get_moscow_time()
+        today = now.strftime('%d.%m.%Y')
+        known = {game.link: game for game in tracked or []}
+        retired = retired or set()
+        reported = {
+            self._normalize_game_link(record['link'])
+            for record in await duplicate_protection.aget_records_for_date("РЕЗУЛЬТАТ_ИГРА", today)
+            if record.get('link')
+        }
+        games: Dict[str, TrackedGame] = {}
+        for record in await duplicate_protection.aget_records_for_date("АНОНС_ИГРА", today):
+            game_link = record.get('link')
+            if not game_link:
+                continue
+            game_link = self._normalize_game_link(game_link)
+            if game_link in reported or game_link in retired:
+                continue
+            if game_link in known:
+                games[game_link] = known[game_link]
+                continue
+            expected_end = self._expected_end(record, now)
+            if expected_end is None:
+                # Время начала неизвестно: опрашиваем редко, ожидание отсчитывается от момента обнаружения
+                if game_link not in games:
+                    games[game_link] = TrackedGame(
+                        link=game_link,
+                        label=record.get('unique_key') or game_link,
+                        expected_end=now,
+                        next_check=now + timedelta(seconds=RESULTS_POLL_MAX_SECONDS),
+                        untimed=True,
+                    )
+                continue
+            current = games.get(game_link)
+            if current is None or current.untimed or expected_end < current.expected_end:
+                games[game_link] = TrackedGame(
+                    link=game_link,
+                    label=record.get('unique_key') or game_link,
+                    expected_end=expected_end,
+                    next_check=expected_end,
+                )
+        return sorted(games.values(), key=lambda game: game.next_check)
+
+    async def _check_due_games(self, due: List[TrackedGame], pending: List[TrackedGame], retired: Set[str]) -> int:
+        """Опрашивает игры, время которых подошло; завершённые отправляет и убирает из ожидания.
+
+        Ссылки игр, которые больше не ждём (результат не появился или уже была
+        попытка отправки), попадают в retired и не возвращаются при перестроении списка.
+        """
+        # Новый цикл: ответы предыдущего опроса не переиспользуются
+        shared_http_client.reset_run()
+        parsed = await asyncio.gather(*(self.parse_game_from_link(game.link) for game in due))
+        now = get_moscow_time()
+
+        finished = [(game, info) for game, info in zip(due, parsed) if info]
+        for game, info in zip(due, parsed):
+            if info:
+                continue
+            if now >= game.expected_end + timedelta(minutes=RESULTS_GIVE_UP_MINUTES):
+                print(f"⌛ {game.label}: результат так и не появился, прекращаем ожидание")
+                pending.remove(game)
+                retired.add(game.link)
+                continue
+            if game.untimed:
+                delay = RESULTS_POLL_MAX_SECONDS
+            else:
+                delay = min(RESULTS_POLL_INITIAL_SECONDS * (2 ** game.attempts), RESULTS_POLL_MAX_SECONDS)
+            game.attempts += 1
+            game.next_check = now + timedelta(seconds=delay)
+            print(f"⏳ {game.label}: игра не завершена, следующая проверка в {game.next_check.strftime('%H:%M:%S')}")
+
+        if not finished:
+            return 0
+        # Перед отправкой перечитываем сервисный лист: результат мог отправить другой запуск
+        await duplicate_protection.areload_service_snapshot()
+        sent_count = 0
+        for game, info in finished:
+            if await self.send_game_result(info):
+                sent_count += 1
+            pending.remove(game)
+            retired.add(game.link)
+            forget_game(info.get('game_id'))
+        await duplicate_protection.aflush_pending_writes()
+        return sent_count
+
+    async def run_results_daemon(self, max_runtime_minutes: int = RESULTS_DAEMON_MAX_RUNTIME_MINUTES) -> int:
+        """Режим демона: спит до ожидаемого окончания игр и опрашивает только незавершённые.
+
+        Список сегодняшних игр перестраивается после каждого сна: добавляются новые
+        анонсы, выпадают игры, результат которых уже записан; игры, которые
+        демон перестал ждать или уже пытался отправить, не возвращаются. Каждая игра впервые
+        проверяется в момент начало + RESULTS_GAME_DURATION_MINUTES, дальше — с
+        растущим интервалом (до RESULTS_POLL_MAX_SECONDS). Работа заканчивается,
+        когда все результаты отправлены, либо по истечении max_runtime_minutes.
+        Возвращает число отправленных результатов.
+        """
+        print("🏀 МОНИТОРИНГ РЕЗУЛЬТАТОВ ИГР (РЕЖИМ ДЕМОНА)")
+        print("=" * 50)
+        if not BOT_TOKEN or not CHAT_ID:
+            print("❌ Не все переменные окружения настроены")
+            return 0
+
+        sheets_rate_limiter.set_phase("мониторинг результатов")
+        await duplicate_protection.areload_service_snapshot()
+        pending = await self.build_today_games()
+        if not pending:
+            print(f"ℹ️ Игр на сегодня ({get_moscow_time().strftime('%d.%m.%Y')}) с ссылками нет, завершаем работу")
+            return 0
+
+        print(f"📋 Игр для ожидания: {len(pending)}")
+        for game in pending:
+            if game.untimed:
+                print(f"   • {game.label}: время начала неизвестно, проверка в {game.next_check.strftime('%H:%M')}")
+            else:
+                print(f"   • {game.label}: ожидаемое окончание {game.expected_end.strftime('%H:%M')}")
+
+        deadline = get_moscow_time() + timedelta(minutes=max_runtime_minutes)
+        sent_count = 0
+        # Игры, которые больше не ждём: не должны вернуться при перестроении списка
+        retired: Set[str] = set()
+        while pending:
+            now = get_moscow_time()
+            due = [game for game in pending if game.next_check <= now]
+            if due:
+                sent_count += await self._check_due_games(due, pending, retired)
+                continue
+            wake_at = min(game.next_check for game in pending)
+            if wake_at > deadline:
+                print(f"⏹️ Следующая проверка ({wake_at.strftime('%H:%M')}) позже лимита работы, завершаем")
+                break
+            print(f"💤 Сон до {wake_at.strftime('%H:%M:%S')} MSK")
+            await asyncio.sleep((wake_at - now).total_seconds())
+            # Пока спали, могли появиться новые анонсы или результаты от другого запуска
+            await duplicate_protection.areload_service_snapshot()
+            pending = await self.build_today_games(pending, retired)
+
+        sheets_rate_limiter.print_report()
+        print(f"\n📊 ИТОГИ: отправлено результатов {sent_count}, без результата {len(pending)}")
+        return sent_count
+
 async def main():
     """Основная функция"""
     monitor = GameResultsMonitorFinal()
-    await monitor.run_game_results_monitor()
+    try:
+        await monitor.run_game_results_monitor()
+    finally:
+        await shared_http_client.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
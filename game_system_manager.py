@@ -12,13 +12,19 @@ import json
 import re
 import uuid
 from urllib.parse import urljoin
-from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, cast
+from typing import Any, AsyncContextManager, Dict, List, Optional, Sequence, Set, Tuple, cast
 from zoneinfo import ZoneInfo
 from datetime_utils import get_moscow_time, is_today, log_current_time
 from enhanced_duplicate_protection import duplicate_protection
+from sheets_rate_limiter import sheets_rate_limiter
 from info_basket_client import InfoBasketClient
 from infobasket_smart_parser import InfobasketSmartParser
-from comp_names import get_comp_name
+from comp_names import get_comp_name, register_from_payload, warm_up_comp_names
+from html_extract import page_anchors, page_text
+from http_client import INFOBASKET_BASE_URL, cached_get, http_session as shared_session, shared_http_client
+from lazy_singleton import LazySingleton
+from team_directory import TeamDirectory, fallback_source_names
+from team_matcher import TeamAliasMatcher, normalize_for_search
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -107,11 +113,23 @@ def format_date_without_year(date_str: str) -> str:
 class GameSystemManager:
     """Единый класс для управления всей системой игр"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        bot: Optional['Bot'] = None,
+        http_session: Optional['aiohttp.ClientSession'] = None,
+        base_url: Optional[str] = None,
+    ):
         # Type annotation for bot to help linter understand it's a Telegram Bot
-        self.bot: Optional['Bot'] = None
+        self.bot: Optional['Bot'] = bot
+        # Общая HTTP-сессия (передаётся оркестратором); без неё используется shared_http_client
+        self.http_session: Optional['aiohttp.ClientSession'] = http_session
+        # Подмена Infobasket API (локальная заглушка); передаётся всем парсерам
+        self.base_url: Optional[str] = (base_url or INFOBASKET_BASE_URL).rstrip("/") or None
+        self.reg_api_url: str = self.base_url or "https://reg.infobasket.su"
         self.team_name_keywords: List[str] = []
         self.team_names_by_id: Dict[int, str] = {}
+        # Справочник команд (алиасы, имена, ключевые слова); пересобирается при загрузке конфигурации
+        self.team_directory: TeamDirectory = TeamDirectory()
         self.team_configs: Dict[int, Dict[str, Any]] = {}
         self.training_poll_configs: List[Dict[str, Any]] = []
         self.voting_configs: List[Dict[str, Any]] = []
@@ -125,6 +143,9 @@ class GameSystemManager:
         # Кэш для проверок дублирования (чтобы избежать повторных запросов к API)
         # Ключ: (data_type, game_id), Значение: Optional[Dict] (None = не найдено, Dict = найдено)
         self._duplicate_check_cache: Dict[tuple, Optional[Dict[str, Any]]] = {}
+        # Данные, загруженные заранее на этапе предзагрузки (ключ — GameID строкой)
+        self._prefetched_widgets: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._prefetched_highlights: Dict[str, List[str]] = {}
         
         config_snapshot = duplicate_protection.get_config_ids()
         self.config_comp_ids = config_snapshot.get('comp_ids', [])
@@ -176,10 +197,14 @@ class GameSystemManager:
             f"topic={self.calendar_events_topic_id}"
         )
         
-        if BOT_TOKEN:
+        if self.bot is None and BOT_TOKEN:
             from telegram import Bot
             self.bot = Bot(token=BOT_TOKEN)
     
+    def _http_session(self) -> AsyncContextManager['aiohttp.ClientSession']:
+        """Переданная HTTP-сессия или общая сессия с пулом соединений"""
+        return shared_session(self.http_session)
+    
     def _to_int(self, value: Any) -> Optional[int]:
         """Безопасно конвертирует значение в int"""
         try:
@@ -235,9 +260,7 @@ class GameSystemManager:
     @staticmethod
     def _normalize_name_for_search(name: str) -> str:
         """Нормализует имя команды для сравнения"""
-        if not isinstance(name, str):
-            return ""
-        return re.sub(r"[\s\-_/]", "", name.strip().lower())
+        return normalize_for_search(name)
 
     def _build_name_variants(self, *names: Optional[str]) -> Set[str]:
         """Формирует набор уникальных вариантов имени команды"""
@@ -253,82 +276,21 @@ class GameSystemManager:
                     variants.add(normalized)
         return variants
 
-    def _find_matching_variant(self, normalized_text: str, variants: Sequence[str]) -> Optional[str]:
-        """Ищет первый вариант имени, встречающийся в нормализованном тексте"""
-        for variant in variants:
-            normalized_variant = self._normalize_name_for_search(variant)
-            if normalized_variant and normalized_variant in normalized_text:
-                return variant
-        return None
+    def _build_variant_matcher(self, *names: Optional[str]) -> TeamAliasMatcher:
+        """Матчер вариантов имени команды: варианты нормализуются один раз на поиск"""
+        return TeamAliasMatcher(sorted(self._build_name_variants(*names)))
 
     def resolve_team_config(self, team_name: str) -> Optional[Dict[str, Any]]:
         """Возвращает конфигурацию команды по названию (с учетом альтернатив и алиасов)"""
-        if not team_name:
-            return None
-        normalized = self._normalize_name_for_search(team_name)
-        if not normalized:
-            return None
-        for team_id, data in self.team_configs.items():
-            metadata = data.get('metadata') or {}
-            candidates = set()
-            alt_name = data.get('alt_name')
-            if isinstance(alt_name, str) and alt_name.strip():
-                candidates.add(alt_name.strip())
-            aliases = metadata.get('aliases') if isinstance(metadata, dict) else []
-            if isinstance(aliases, list):
-                for alias in aliases:
-                    if isinstance(alias, str) and alias.strip():
-                        candidates.add(alias.strip())
-            for candidate in candidates:
-                if self._normalize_name_for_search(candidate) == normalized:
-                    return {
-                        'team_id': team_id,
-                        'alt_name': alt_name,
-                        'metadata': metadata
-                    }
-        return None
+        return self.team_directory.resolve(team_name)
 
     def _update_team_mappings(self) -> None:
-        self.team_names_by_id = {}
-        for team_id, data in self.team_configs.items():
-            alt_name = data.get('alt_name')
-            if isinstance(alt_name, str) and alt_name.strip():
-                self.team_names_by_id[team_id] = alt_name.strip()
-            metadata = data.get('metadata') or {}
-            aliases = metadata.get('aliases') if isinstance(metadata, dict) else []
-            if isinstance(aliases, list):
-                for alias in aliases:
-                    if isinstance(alias, str) and alias.strip() and team_id not in self.team_names_by_id:
-                        self.team_names_by_id[team_id] = alias.strip()
-        keyword_sources: Set[str] = set()
-        keyword_sources.update(self.team_names_by_id.values())
-        for data in self.team_configs.values():
-            metadata = data.get('metadata') or {}
-            aliases = metadata.get('aliases') if isinstance(metadata, dict) else []
-            if isinstance(aliases, list):
-                for alias in aliases:
-                    if isinstance(alias, str) and alias.strip():
-                        keyword_sources.add(alias.strip())
-        for source in self.fallback_sources:
-            name = source.get('name')
-            if isinstance(name, str) and name.strip():
-                keyword_sources.add(name.strip())
-        self.team_name_keywords = sorted(keyword_sources)
+        self.team_directory = TeamDirectory(self.team_configs, fallback_source_names(self.fallback_sources))
+        self.team_names_by_id = dict(self.team_directory.primary_names)
+        self.team_name_keywords = list(self.team_directory.keywords)
     
     def _resolve_team_name(self, team_id: Optional[int], fallback: Optional[str] = None) -> Optional[str]:
-        if team_id is None:
-            return fallback
-        config = self.team_configs.get(team_id) if isinstance(self.team_configs, dict) else None
-        if isinstance(config, dict):
-            alt_name = config.get('alt_name')
-            if isinstance(alt_name, str) and alt_name.strip():
-                return alt_name.strip()
-            metadata = config.get('metadata') if isinstance(config, dict) else {}
-            if isinstance(metadata, dict):
-                display_name = metadata.get('display_name')
-                if isinstance(display_name, str) and display_name.strip():
-                    return display_name.strip()
-        return fallback.strip() if isinstance(fallback, str) else fallback
+        return self.team_directory.display_name(team_id, fallback)
     
     def _get_team_display_name(self, team_id: Optional[int], fallback: Optional[str] = None) -> str:
         resolved = self._resolve_team_name(team_id, fallback)
@@ -429,29 +391,18 @@ class GameSystemManager:
     
     def find_target_teams_in_text(self, text: str) -> List[str]:
         """Находит целевые команды в тексте"""
-        found_teams: List[str] = []
-        
-        search_names = []
-        if self.team_name_keywords:
-            search_names.extend(self.team_name_keywords)
-        if self.team_names_by_id:
-            search_names.extend(self.team_names_by_id.values())
-        
-        # Удаляем дубликаты и пустые значения
-        search_names = [name for name in {name.strip() for name in search_names} if name]
-        
-        if not search_names:
-            return found_teams
-        
-        text_normalized = re.sub(r"[\s\-_/]", "", text.lower())
+        matcher = self.team_directory.keyword_matcher
+        if not matcher:
+            return []
         
-        for name in search_names:
-            normalized_name = re.sub(r"[\s\-_/]", "", name.lower())
-            if normalized_name and normalized_name in text_normalized:
-                found_teams.append(name)
-                print(f"   ✅ Найдена команда по названию: {name}")
+        # Все названия ищутся за один проход по нормализованному тексту
+        found_teams = matcher.find_all(text)
+        for name in found_teams:
+            print(f"   ✅ Найдена команда по названию: {name}")
         
         if not found_teams:
+            # Нормализованный текст нужен только для диагностики промаха
+            text_normalized = self._normalize_name_for_search(text)
             print(f"   ❌ Целевые команды не найдены в тексте: {text[:100]}...")
             print(f"   🔍 Нормализованный текст: {text_normalized[:100]}...")
         
@@ -515,7 +466,9 @@ class GameSystemManager:
             parser = InfobasketSmartParser(
                 comp_ids=self.config_comp_ids,
                 team_ids=self.config_team_ids,
-                team_name_keywords=self.team_name_keywords
+                team_name_keywords=self.team_name_keywords,
+                http_session=self.http_session,
+                base_url=self.base_url,
             )
 
             all_games = await parser.get_all_team_games()
@@ -554,6 +507,7 @@ class GameSystemManager:
                             self.team_names_by_id[our_team_id] = our_team_name
                             if our_team_name not in self.team_name_keywords:
                                 self.team_name_keywords.append(our_team_name)
+                                self.team_directory = self.team_directory.with_keywords(our_team_name)
 
                         storage.append({
                             'date': game.get('GameDate'),
@@ -590,15 +544,15 @@ class GameSystemManager:
 
     async def fetch_widget_game_details(self, game_id: int) -> Optional[Dict[str, Any]]:
         try:
-            import aiohttp
-            url = f"https://reg.infobasket.su/Widget/GetOnline/{game_id}?format=json&lang=ru"
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
+            url = f"{self.reg_api_url}/Widget/GetOnline/{game_id}?format=json&lang=ru"
+            async with self._http_session() as session:
+                async with cached_get(url, session) as response:
                     if response.status != 200:
                         print(f"⚠️ Widget API вернул статус {response.status} для GameID {game_id}")
                         return None
                     data = await response.json()
 
+            register_from_payload(data)
             game_date = data.get('GameDate') or ''
             game_time = data.get('GameTimeMsk') or data.get('GameTime') or ''
             online_block = data.get('Online') or {}
@@ -618,6 +572,87 @@ class GameSystemManager:
             print(f"⚠️ Ошибка получения данных Widget для GameID {game_id}: {e}")
             return None
 
+    async def _get_widget_details(self, game_id: Any) -> Optional[Dict[str, Any]]:
+        """Данные Widget из предзагрузки, иначе запрос к API"""
+        key = str(game_id)
+        if key in self._prefetched_widgets:
+            return self._prefetched_widgets[key]
+        return await self.fetch_widget_game_details(int(game_id))
+
+    @staticmethod
+    def _is_future_date(date_str: Any) -> bool:
+        try:
+            game_date = datetime.datetime.strptime(str(date_str), '%d.%m.%Y').date()
+        except (TypeError, ValueError):
+            return False
+        return game_date > get_moscow_time().date()
+
+    async def prefetch_game_details(
+        self,
+        future_games: Sequence[Dict[str, Any]],
+        today_games: Sequence[Dict[str, Any]],
+    ) -> None:
+        """Параллельно загружает всё, что нужно для обработки игр, до отправки сообщений.
+
+        Одновременно запрашиваются: Widget/GetOnline для всех кандидатов,
+        превью соперника для сегодняшних игр и снимок сервисного листа.
+        Превью сегодняшней игры запрашивается сразу после её виджета: соперник
+        определяется по составу из виджета (см. _prefetch_today_game).
+        Число одновременных запросов к одному хосту ограничивает пул shared_http_client.
+        """
+        self._prefetched_widgets.clear()
+        self._prefetched_highlights.clear()
+
+        today_by_id: Dict[str, Dict[str, Any]] = {}
+        for game in today_games:
+            game_id = game.get('game_id')
+            if game_id and str(game_id) not in today_by_id:
+                today_by_id[str(game_id)] = game
+        widget_ids: List[str] = []
+        for game in future_games:
+            game_id = game.get('game_id')
+            if (
+                game_id
+                and self._is_future_date(game.get('date'))
+                and str(game_id) not in widget_ids
+                and str(game_id) not in today_by_id
+            ):
+                widget_ids.append(str(game_id))
+
+        if not widget_ids and not today_by_id:
+            return
+
+        print(
+            f"⚡ Предзагрузка: {len(widget_ids) + len(today_by_id)} игр (Widget), "
+            f"{len(today_by_id)} превью соперников"
+        )
+        started = asyncio.get_running_loop().time()
+        widget_tasks = [self.fetch_widget_game_details(int(game_id)) for game_id in widget_ids]
+        today_tasks = [self._prefetch_today_game(game) for game in today_by_id.values()]
+        # Каждая группа собирает свои ошибки сама: сбой одного запроса не прерывает остальные
+        _, widget_results, today_results = await asyncio.gather(
+            asyncio.gather(duplicate_protection.aget_service_snapshot(), return_exceptions=True),
+            asyncio.gather(*widget_tasks, return_exceptions=True),
+            asyncio.gather(*today_tasks, return_exceptions=True),
+        )
+        for game_id, widget_data in zip(widget_ids, widget_results):
+            # Ошибку не кэшируем: при обработке игры запрос будет повторён
+            if not isinstance(widget_data, BaseException):
+                self._prefetched_widgets[game_id] = widget_data
+        for game_id, today_result in zip(today_by_id, today_results):
+            if not isinstance(today_result, BaseException):
+                self._prefetched_widgets[game_id], self._prefetched_highlights[game_id] = today_result
+        elapsed = asyncio.get_running_loop().time() - started
+        print(f"⚡ Предзагрузка завершена за {elapsed:.1f} сек")
+
+    async def _prefetch_today_game(self, game: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+        """Виджет сегодняшней игры и превью соперника, определённого по составу из виджета"""
+        widget_data = await self.fetch_widget_game_details(int(game['game_id']))
+        resolved = dict(game)
+        if widget_data:
+            self._merge_widget_details(resolved, widget_data)
+        return widget_data, await self._fetch_opponent_highlights(resolved)
+
     def _merge_widget_details(self, game_info: Dict[str, Any], widget_data: Dict[str, Any]) -> None:
         if not widget_data:
             return
@@ -631,6 +666,13 @@ class GameSystemManager:
             game_info['team1_id'] = widget_data['team_a_id']
         if widget_data.get('team_b_id') is not None:
             game_info['team2_id'] = widget_data['team_b_id']
+        if widget_data.get('team_a_id') is not None or widget_data.get('team_b_id') is not None:
+            # Соперник по составу из виджета: в календаре он мог быть не указан или устареть
+            our_team_id = self._to_int(game_info.get('our_team_id'))
+            team1_id = self._to_int(game_info.get('team1_id'))
+            team2_id = self._to_int(game_info.get('team2_id'))
+            if our_team_id is not None and team1_id != team2_id and our_team_id in (team1_id, team2_id):
+                game_info['opponent_team_id'] = team2_id if our_team_id == team1_id else team1_id
 
     def _game_record_matches(self, record: Dict[str, Any], game_info: Dict[str, Any]) -> bool:
         if not record:
@@ -732,8 +774,8 @@ class GameSystemManager:
                 parts.append(f"{label}: {old or '—'} → {new or '—'}")
         return '; '.join(parts)
 
-    def _log_game_action(self, data_type: str, game_info: Dict[str, Any], status: str, additional_data: str) -> None:
-        duplicate_protection.upsert_game_record(
+    async def _log_game_action(self, data_type: str, game_info: Dict[str, Any], status: str, additional_data: str) -> None:
+        await duplicate_protection.aupsert_game_record(
             data_type=data_type,
             identifier=str(game_info.get('game_id')),
             status=status,
@@ -765,7 +807,7 @@ class GameSystemManager:
 
         game_id = str(game_info.get('game_id') or '')
         if game_id:
-            existing_calendar = duplicate_protection.get_game_record("КАЛЕНДАРЬ_ИГРА", game_id)
+            existing_calendar = await duplicate_protection.aget_game_record("КАЛЕНДАРЬ_ИГРА", game_id)
             if existing_calendar and self._game_record_matches(existing_calendar, game_info):
                 print(f"⏭️ Календарное событие для GameID {game_id} уже отправлено")
                 return
@@ -808,7 +850,7 @@ class GameSystemManager:
                     raise primary_error
 
             print(f"📆 Отправлено календарное событие {filename}")
-            self._log_game_action("КАЛЕНДАРЬ_ИГРА", game_info, "ICS ОТПРАВЛЁН", filename)
+            await self._log_game_action("КАЛЕНДАРЬ_ИГРА", game_info, "ICS ОТПРАВЛЁН", filename)
 
         except Exception as e:
             print(f"⚠️ Ошибка отправки календарного события: {e}")
@@ -913,12 +955,12 @@ class GameSystemManager:
                 print(f"⏭️ Опрос для GameID {game_id} уже есть (из кэша)")
                 return False
         else:
-            # Проверяем через API и кэшируем результат
-            widget_data = await self.fetch_widget_game_details(int(game_id))
+            # Проверяем через API (или предзагрузку) и кэшируем результат
+            widget_data = await self._get_widget_details(game_id)
             if widget_data:
                 self._merge_widget_details(game_info, widget_data)
 
-            existing_record = duplicate_protection.get_game_record("ОПРОС_ИГРА", str(game_id))
+            existing_record = await duplicate_protection.aget_game_record("ОПРОС_ИГРА", str(game_id))
             self._duplicate_check_cache[cache_key] = existing_record
             
             if existing_record:
@@ -926,7 +968,7 @@ class GameSystemManager:
                 if changes:
                     await self._notify_game_update(changes, game_info)
                     summary = self._format_changes_summary(changes)
-                    self._log_game_action("ОПРОС_ИГРА", game_info, "ДАННЫЕ ОБНОВЛЕНЫ", summary)
+                    await self._log_game_action("ОПРОС_ИГРА", game_info, "ДАННЫЕ ОБНОВЛЕНЫ", summary)
                 else:
                     print(f"⏭️ Опрос для GameID {game_id} уже есть в сервисном листе")
                 return False
@@ -937,7 +979,7 @@ class GameSystemManager:
 
         # Обновляем кэш после успешного создания опроса
         self._duplicate_check_cache[cache_key] = {"created": True}
-        self._log_game_action("ОПРОС_ИГРА", game_info, "ОПРОС СОЗДАН", question)
+        await self._log_game_action("ОПРОС_ИГРА", game_info, "ОПРОС СОЗДАН", question)
         return True
 
     async def _process_today_game(self, game_info: Dict[str, Any]) -> bool:
@@ -949,11 +991,11 @@ class GameSystemManager:
             print("⚠️ Нет GameID для анонса, пропускаем")
             return False
 
-        widget_data = await self.fetch_widget_game_details(int(game_id))
+        widget_data = await self._get_widget_details(game_id)
         if widget_data:
             self._merge_widget_details(game_info, widget_data)
 
-        existing_record = duplicate_protection.get_game_record("АНОНС_ИГРА", str(game_id))
+        existing_record = await duplicate_protection.aget_game_record("АНОНС_ИГРА", str(game_id))
         if existing_record and self._game_record_matches(existing_record, game_info):
             print(f"⏭️ Анонс для GameID {game_id} уже отправлен")
             return False
@@ -963,25 +1005,21 @@ class GameSystemManager:
             return False
 
         summary = f"{game_info.get('date')} {game_info.get('time')} {game_info.get('team1')} vs {game_info.get('team2')}"
-        self._log_game_action("АНОНС_ИГРА", game_info, "АНОНС ОТПРАВЛЕН", summary)
+        await self._log_game_action("АНОНС_ИГРА", game_info, "АНОНС ОТПРАВЛЕН", summary)
         return True
 
     async def fetch_letobasket_schedule(self) -> List[Dict]:
         """Получает расписание игр с сайта letobasket.ru"""
         try:
-            import aiohttp
-            from bs4 import BeautifulSoup
-            
             url = "http://letobasket.ru/"
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
+            async with self._http_session() as session:
+                async with cached_get(url, session) as response:
                     if response.status == 200:
                         content = await response.text()
-                        soup = BeautifulSoup(content, 'html.parser')
                         
                         # Получаем весь текст страницы
-                        full_text = soup.get_text()
+                        full_text = page_text(content)
                         
                         # Ищем игры с нашими командами
                         games = []
@@ -1382,23 +1420,21 @@ class GameSystemManager:
     async def find_game_link(self, team1: str, team2: str) -> Optional[tuple]:
         """Ищет ссылку на игру, используя сервисный лист и fallback-источники"""
         try:
-            sheet_link = duplicate_protection.find_game_link_for_today(team1, team2)
+            sheet_link = await duplicate_protection.afind_game_link_for_today(team1, team2)
             if sheet_link:
                 return sheet_link, None
 
-            import aiohttp
-
             sources = self.fallback_sources or [{'url': 'http://letobasket.ru/'}]
-            own_variants = self._build_name_variants(team1, *self.team_name_keywords)
-            opponent_variants = self._build_name_variants(team2)
+            own_matcher = self._build_variant_matcher(team1, *self.team_name_keywords)
+            opponent_matcher = self._build_variant_matcher(team2)
 
-            async with aiohttp.ClientSession() as session:
+            async with self._http_session() as session:
                 for source in sources:
                     url = source.get('url')
                     if not url:
                         continue
                     try:
-                        result = await self._search_fallback_source(session, url, own_variants, opponent_variants)
+                        result = await self._search_fallback_source(session, url, own_matcher, opponent_matcher)
                         if result:
                             return result
                     except Exception as source_error:
@@ -1414,34 +1450,26 @@ class GameSystemManager:
         self,
         session: "aiohttp.ClientSession",
         url: str,
-        own_variants: Set[str],
-        opponent_variants: Set[str]
+        own_matcher: TeamAliasMatcher,
+        opponent_matcher: TeamAliasMatcher
     ) -> Optional[tuple]:
-        from bs4 import BeautifulSoup
-
         async with session.get(url) as response:
             if response.status != 200:
                 print(f"⚠️ Fallback {url} вернул статус {response.status}")
                 return None
             content = await response.text()
 
-        soup = BeautifulSoup(content, 'html.parser')
-        anchors = soup.find_all('a', href=True)
+        anchors = page_anchors(content)
         print(f"🔗 {url}: найдено {len(anchors)} ссылок")
 
         # Сначала пробуем найти по тексту ссылки (быстрее, не требует загрузки страницы игры)
-        for anchor in anchors:
-            href = anchor.get('href')
-            if not href:
-                continue
-            
+        for href, link_text in anchors:
             # Проверяем, что это ссылка на игру
             is_game_link = 'gameId=' in href or 'game.html' in href
             if not is_game_link:
                 continue
             
-            # Получаем текст ссылки (обычно содержит названия команд)
-            link_text = anchor.get_text(strip=True)
+            # Текст ссылки обычно содержит названия команд
             if not link_text:
                 continue
             
@@ -1449,8 +1477,8 @@ class GameSystemManager:
             normalized_text = self._normalize_name_for_search(link_text)
             
             # Проверяем, есть ли обе команды в тексте ссылки
-            own_match = self._find_matching_variant(normalized_text, list(own_variants))
-            opponent_match = self._find_matching_variant(normalized_text, list(opponent_variants))
+            own_match = own_matcher.first_match(normalized_text)
+            opponent_match = opponent_matcher.first_match(normalized_text) if own_match else None
             
             if own_match and opponent_match:
                 full_link = href if href.startswith('http') else urljoin(url, href)
@@ -1459,12 +1487,11 @@ class GameSystemManager:
                 return full_link, own_match
         
         # Если не нашли по тексту, пробуем старый способ (проверка содержимого страницы игры)
-        for anchor in anchors:
-            href = anchor.get('href')
-            if not href or ('gameId=' not in href and 'game.html' not in href):
+        for href, _ in anchors:
+            if 'gameId=' not in href and 'game.html' not in href:
                 continue
             full_link = urljoin(url, href)
-            matched_name = await self._verify_game_link(session, full_link, own_variants, opponent_variants)
+            matched_name = await self._verify_game_link(session, full_link, own_matcher, opponent_matcher)
             if matched_name:
                 print(f"✅ Найдена подходящая игра в fallback: {full_link}")
                 return full_link, matched_name
@@ -1474,8 +1501,8 @@ class GameSystemManager:
         self,
         session: "aiohttp.ClientSession",
         link: str,
-        own_variants: Set[str],
-        opponent_variants: Set[str]
+        own_matcher: TeamAliasMatcher,
+        opponent_matcher: TeamAliasMatcher
     ) -> Optional[str]:
         try:
             async with session.get(link) as response:
@@ -1487,8 +1514,8 @@ class GameSystemManager:
             return None
 
         normalized_content = self._normalize_name_for_search(content)
-        own_match = self._find_matching_variant(normalized_content, list(own_variants))
-        opponent_match = self._find_matching_variant(normalized_content, list(opponent_variants))
+        own_match = own_matcher.first_match(normalized_content)
+        opponent_match = opponent_matcher.first_match(normalized_content) if own_match else None
 
         if own_match and opponent_match:
             return own_match
@@ -1498,16 +1525,14 @@ class GameSystemManager:
     async def _fetch_opponent_highlights(self, game_info: Dict[str, Any]) -> List[str]:
         highlights: List[str] = []
         try:
-            import aiohttp
-
             game_id = self._to_int(game_info.get('game_id') or game_info.get('GameID'))
             opponent_team_id = self._to_int(game_info.get('opponent_team_id') or game_info.get('opponentTeamId'))
             if not game_id or not opponent_team_id:
                 return highlights
 
-            url = f"https://reg.infobasket.su/Comp/GetTeamStatsForPreview/{game_id}?compId=0"
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
+            url = f"{self.reg_api_url}/Comp/GetTeamStatsForPreview/{game_id}?compId=0"
+            async with self._http_session() as session:
+                async with cached_get(url, session) as response:
                     if response.status != 200:
                         print(f"⚠️ Не удалось получить превью статистику соперника: {response.status}")
                         return highlights
@@ -1831,7 +1856,11 @@ class GameSystemManager:
             form_color = determine_form_color(game_info)
             game_info.setdefault('form_color', form_color)
 
-            opponent_highlights = await self._fetch_opponent_highlights(game_info)
+            prefetched_highlights = self._prefetched_highlights.get(str(game_info.get('game_id')))
+            if prefetched_highlights is not None:
+                opponent_highlights = prefetched_highlights
+            else:
+                opponent_highlights = await self._fetch_opponent_highlights(game_info)
 
             # Формируем сообщение анонса
             announcement_text = self.format_announcement_message(game_info, game_link, found_team, opponent_highlights)
@@ -1859,7 +1888,7 @@ class GameSystemManager:
                 f"Место: {game_info.get('venue', '')}".strip()
             ]))
 
-            duplicate_protection.add_record(
+            await duplicate_protection.aadd_record(
                 "АНОНС_ИГРА",
                 announcement_key,
                 "ОТПРАВЛЕН",
@@ -1895,8 +1924,12 @@ class GameSystemManager:
     
 
     
-    async def run_full_system(self):
-        """Запускает полную систему: парсинг → опросы → анонсы"""
+    async def run_full_system(self, auto_cleanup: bool = True):
+        """Запускает полную систему: парсинг → опросы → анонсы
+
+        auto_cleanup=False — автоочистку сервисного листа уже выполнил вызывающий код
+        (ежедневный оркестратор делает её до параллельного запуска задач).
+        """
         try:
             print("🚀 ЗАПУСК ПОЛНОЙ СИСТЕМЫ УПРАВЛЕНИЯ ИГРАМИ")
             print("=" * 60)
@@ -1907,7 +1940,8 @@ class GameSystemManager:
             print(f"📅 День недели: {time_info['weekday_name']}")
             
             print(f"\n🔧 НАСТРОЙКИ:")
-            latest_config = duplicate_protection.get_config_ids()
+            sheets_rate_limiter.set_phase("конфигурация")
+            latest_config = await duplicate_protection.aget_config_ids()
             self.config_comp_ids = latest_config.get('comp_ids', [])
             self.config_team_ids = latest_config.get('team_ids', [])
             self.config_comp_ids_set = set(self.config_comp_ids)
@@ -1935,20 +1969,20 @@ class GameSystemManager:
             print(f"   ⚙️ Конфигурации опросов тренировок: {len(self.training_poll_configs)}")
             print(f"   ⚙️ Конфигурации голосований: {len(self.voting_configs)}")
             print(f"   ⚙️ Fallback-источники: {len(self.fallback_sources)}")
-            cleanup_result = duplicate_protection.cleanup_expired_records(30)
-            if cleanup_result.get('success'):
-                cleaned_count = cleanup_result.get('cleaned_count', 0)
-                if cleaned_count > 0:
-                    print(f"🧹 Автоочистка сервисного листа: удалено {cleaned_count} записей старше 30 дней")
-                else:
-                    print("🧹 Автоочистка сервисного листа: старые записи не найдены")
-            else:
-                print(f"⚠️ Не удалось выполнить автоочистку сервисного листа: {cleanup_result.get('error')}")
+            # Сервисный лист читается один раз за запуск, дальше работаем со снимком
+            if auto_cleanup:
+                sheets_rate_limiter.set_phase("автоочистка")
+                await duplicate_protection.ainvalidate_service_snapshot()
+                await run_service_auto_cleanup()
             
             # ШАГ 1: Парсинг расписания
             print(f"\n📊 ШАГ 1: ПАРСИНГ РАСПИСАНИЯ")
             print("-" * 40)
-            games_by_status = await self.fetch_infobasket_schedule()
+            # Справочник соревнований дополняется параллельно (те же запросы календаря)
+            games_by_status, _ = await asyncio.gather(
+                self.fetch_infobasket_schedule(),
+                warm_up_comp_names(self.config_comp_ids, self.http_session, base_url=self.reg_api_url),
+            )
             future_games = games_by_status.get('future', [])
             today_games = games_by_status.get('today', [])
             total_games = len(future_games) + len(today_games)
@@ -1963,6 +1997,7 @@ class GameSystemManager:
             
             # Очищаем кэш перед обработкой новых игр
             self._duplicate_check_cache.clear()
+            sheets_rate_limiter.set_phase("опросы")
             
             # Удаляем дубликаты из списка игр (по game_id)
             seen_game_ids = set()
@@ -1979,38 +2014,67 @@ class GameSystemManager:
             if len(future_games) != len(unique_future_games):
                 print(f"⚠️ Найдено {len(future_games) - len(unique_future_games)} дубликатов в списке игр, удалены")
             
+            # Сетевые данные для всех игр загружаются параллельно до отправки сообщений
+            await self.prefetch_game_details(unique_future_games, today_games)
+            
             created_polls = 0
             for game in unique_future_games:
                 print(f"\n🏀 Проверка игры (будущая): {game.get('team1', '')} vs {game.get('team2', '')}")
                 if await self._process_future_game(game):
                     created_polls += 1
             print(f"✅ Создано {created_polls} опросов")
+            await duplicate_protection.aflush_pending_writes()
             
             # ШАГ 3: Создание анонсов
             print(f"\n📢 ШАГ 3: СОЗДАНИЕ АНОНСОВ")
             print("-" * 40)
+            sheets_rate_limiter.set_phase("анонсы")
             sent_announcements = 0
             for game in today_games:
                 print(f"\n🏀 Проверка игры (сегодня): {game.get('team1', '')} vs {game.get('team2', '')}")
                 if await self._process_today_game(game):
                     sent_announcements += 1
             print(f"✅ Отправлено {sent_announcements} анонсов")
+            await duplicate_protection.aflush_pending_writes()
             
             # Итоги
             print(f"\n📊 ИТОГИ РАБОТЫ:")
             print(f"   📊 Создано опросов: {created_polls}")
             print(f"   📢 Отправлено анонсов: {sent_announcements}")
             print(f"   📋 Всего игр обработано: {total_games}")
+            sheets_rate_limiter.print_report()
             
         except Exception as e:
             print(f"❌ Ошибка выполнения системы: {e}")
 
-# Глобальный экземпляр
-game_system_manager = GameSystemManager()
+async def run_service_auto_cleanup(max_age_days: int = 30) -> None:
+    """Автоочистка сервисного листа от записей старше max_age_days"""
+    cleanup_result = await duplicate_protection.acleanup_expired_records(max_age_days)
+    if cleanup_result.get('success'):
+        cleaned_count = cleanup_result.get('cleaned_count', 0)
+        if cleaned_count > 0:
+            print(f"🧹 Автоочистка сервисного листа: удалено {cleaned_count} записей старше {max_age_days} дней")
+        else:
+            print("🧹 Автоочистка сервисного листа: старые записи не найдены")
+    else:
+        print(f"⚠️ Не удалось выполнить автоочистку сервисного листа: {cleanup_result.get('error')}")
+
+# Глобальный экземпляр (конфигурация читается при первом обращении, а не при импорте)
+game_system_manager: GameSystemManager = LazySingleton(  # type: ignore[assignment]
+    GameSystemManager, "game_system_manager"
+)
+
+
+def get_game_system_manager() -> GameSystemManager:
+    """Возвращает общий экземпляр, создавая его при первом вызове"""
+    return game_system_manager._resolve()  # type: ignore[attr-defined]
 
 async def main():
     """Основная функция"""
-    await game_system_manager.run_full_system()
+    try:
+        await game_system_manager.run_full_system()
+    finally:
+        await shared_http_client.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Точечное извлечение данных из HTML-страниц (letobasket.ru, fallback-источники, протоколы)
+
+Раньше каждая страница целиком разбиралась в дерево BeautifulSoup
+(html.parser), после чего из него брались только ссылки, только текст или
+одна таблица. Здесь страница разбирается парсером lxml (на C, в разы быстрее
+и экономнее по памяти) и извлекается только нужное:
+- page_text — текст страницы (аналог soup.get_text());
+- page_anchors — пары (href, текст) для ссылок с href;
+- find_stats_table — заголовки и строки таблицы статистики.
+
+lxml входит в requirements-github.txt; если его нет, используется
+BeautifulSoup с SoupStrainer, который строит дерево только для нужных тегов.
+"""
+
+from typing import Any, List, Optional, Tuple
+
+try:
+    import lxml.etree as etree
+    from lxml import html as lxml_html
+    LXML_AVAILABLE = True
+except ImportError:
+    etree = None
+    lxml_html = None
+    LXML_AVAILABLE = False
+
+# (заголовки, строки ячеек)
+StatsTable = Tuple[List[str], List[List[str]]]
+
+STATS_TABLE_CLASS = "statistics__table"
+_STATS_TABLE_XPATH = (
+    f"//table[contains(concat(' ', normalize-space(@class), ' '), ' {STATS_TABLE_CLASS} ')]"
+)
+
+
+def _parse(content: str):
+    """Документ lxml или None для пустой/битой страницы"""
+    assert lxml_html is not None and etree is not None
+    if not content or not content.strip():
+        return None
+    try:
+        return lxml_html.document_fromstring(content)
+    except (etree.ParserError, ValueError):
+        # ValueError — строка с объявлением кодировки: разбираем байты
+        try:
+            return lxml_html.document_fromstring(content.encode("utf-8"))
+        except (etree.ParserError, ValueError):
+            return None
+
+
+def _stripped_text(element) -> str:
+    """Текст элемента как get_text(strip=True): части без пробелов по краям, без разделителя"""
+    return "".join(part.strip() for part in element.itertext())
+
+
+def _soup_strainer(*args: Any, **kwargs: Any) -> Any:
+    """SoupStrainer из публичного модуля bs4.filter (в beautifulsoup4 < 4.13 — из bs4)"""
+    try:
+        from bs4.filter import SoupStrainer
+    except ImportError:
+        from bs4 import SoupStrainer  # type: ignore[attr-defined]
+    return SoupStrainer(*args, **kwargs)
+
+
+def page_text(content: str) -> str:
+    """Весь текст страницы без содержимого script/style (как get_text() в bs4)"""
+    if LXML_AVAILABLE:
+        document = _parse(content)
+        if document is None:
+            return ""
+        assert etree is not None
+        etree.strip_elements(document, "script", "style", "template", with_tail=False)
+        return document.text_content()
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(content, "html.parser").get_text()
+
+
+def page_anchors(content: str) -> List[Tuple[str, str]]:
+    """Ссылки страницы: (href, текст ссылки) для всех <a> с непустым href"""
+    if LXML_AVAILABLE:
+        document = _parse(content)
+        if document is None:
+            return []
+        return [
+            (str(anchor.get("href")), _stripped_text(anchor))
+            for anchor in document.iter("a")
+            if anchor.get("href")
+        ]
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(content, "html.parser", parse_only=_soup_strainer("a", href=True))
+    return [(str(anchor.get("href")), anchor.get_text(strip=True)) for anchor in soup.find_all("a", href=True)]
+
+
+def find_stats_table(content: str) -> Optional[StatsTable]:
+    """Таблица статистики игроков: заголовки из thead и ячейки строк tbody.
+
+    None — таблицы на странице нет; пустой список строк — нет tbody.
+    """
+    if LXML_AVAILABLE:
+        document = _parse(content)
+        if document is None:
+            return None
+        tables = document.xpath(_STATS_TABLE_XPATH)
+        if not tables:
+            return None
+        table = tables[0]
+        heads = table.xpath(".//thead")
+        headers = [cell.text_content().strip() for cell in heads[0].iter("th")] if heads else []
+        bodies = table.xpath(".//tbody")
+        if not bodies:
+            return headers, []
+        rows = [
+            [cell.text_content().strip() for cell in row.iter("td")]
+            for row in bodies[0].iter("tr")
+        ]
+        return headers, rows
+    from bs4 import BeautifulSoup
+    # Класс проверяем после разбора: SoupStrainer сравнивает атрибут class целиком
+    soup = BeautifulSoup(content, "html.parser", parse_only=_soup_strainer("table"))
+    table = soup.find("table", class_=STATS_TABLE_CLASS)
+    if table is None:
+        return None
+    thead = table.find("thead")
+    headers = [cell.get_text().strip() for cell in thead.find_all("th")] if thead else []
+    tbody = table.find("tbody")
+    if tbody is None:
+        return headers, []
+    rows = [[cell.get_text().strip() for cell in row.find_all("td")] for row in tbody.find_all("tr")]
+    return headers, rows
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Постоянный кэш HTTP-ответов для Infobasket и letobasket.ru
+
+Мониторинг результатов запускается каждые 15 минут и каждый раз заново
+скачивает календари, сезоны, данные Widget и страницу letobasket.ru.
+Кэш хранит ответы в локальной базе SQLite (.cache/http_cache.sqlite3):
+- у каждого вида запроса свой TTL (HTTP_CACHE_TTLS); пока ответ свежий,
+  сеть не используется;
+- устаревший ответ перепроверяется условным запросом
+  (If-None-Match / If-Modified-Since), при 304 тело берётся из кэша;
+- размер базы ограничен HTTP_CACHE_MAX_BYTES, вытесняются давно
+  не использованные записи (LRU);
+- счётчики попаданий/промахов выводятся в конце запуска.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+# Загружаем переменные окружения
+load_dotenv()
+
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "true").lower() != "false"
+HTTP_CACHE_PATH = os.getenv("HTTP_CACHE_PATH", os.path.join(".cache", "http_cache.sqlite3"))
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# TTL (сек) по фрагменту URL; первый подходящий. URL без правила не кэшируются.
+HTTP_CACHE_TTLS: List[Tuple[str, str, int]] = [
+    # (название, фрагмент URL, TTL)
+    ("seasons", "/Comp/GetSeasonsForTag", 24 * 60 * 60),
+    ("calendar", "/Comp/GetCalendar", 10 * 60),
+    ("preview", "/Comp/GetTeamStatsForPreview", 60 * 60),
+    # Онлайн-данные игры меняются во время матча: короткий TTL, дальше — перепроверка
+    ("online", "/Widget/GetOnline", 60),
+    ("letobasket", "letobasket.ru", 5 * 60),
+]
+
+
+@dataclass
+class CachedResponse:
+    """Сохранённый ответ и его валидаторы"""
+
+    url: str
+    status: int
+    body: bytes
+    content_type: str
+    etag: str
+    last_modified: str
+    stored_at: float
+
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+
+class HttpResponseCache:
+    """Кэш ответов на диске с TTL, условными запросами и LRU-вытеснением"""
+
+    def __init__(
+        self,
+        path: str = HTTP_CACHE_PATH,
+        max_bytes: int = HTTP_CACHE_MAX_BYTES,
+        enabled: bool = HTTP_CACHE_ENABLED,
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "revalidated": 0,
+            "misses": 0,
+            "stored": 0,
+            "evicted": 0,
+            "stale_served": 0,
+        }
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    # --- Правила ---
+
+    @staticmethod
+    def ttl_for(url: str) -> Optional[int]:
+        """TTL для URL или None, если URL не кэшируется"""
+        for _, fragment, ttl in HTTP_CACHE_TTLS:
+            if fragment in url:
+                return ttl
+        return None
+
+    def is_cacheable(self, url: str) -> bool:
+        return self.enabled and self.ttl_for(url) is not None
+
+    # --- Хранилище ---
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._conn is not None:
+            return self._conn
+        try:
+            cache_dir = os.path.dirname(self.path)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "url TEXT PRIMARY KEY, status INTEGER NOT NULL, body BLOB NOT NULL, "
+                    "content_type TEXT NOT NULL DEFAULT '', etag TEXT NOT NULL DEFAULT '', "
+                    "last_modified TEXT NOT NULL DEFAULT '', stored_at REAL NOT NULL, "
+                    "accessed_at REAL NOT NULL, size INTEGER NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+        except (OSError, sqlite3.Error) as e:
+            print(f"⚠️ HTTP-кэш недоступен ({self.path}): {e}")
+            self.enabled = False
+            return None
+        self._conn = conn
+        return conn
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        """Сохранённый ответ (свежий или устаревший) без учёта TTL"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            row = conn.execute(
+                "SELECT status, body, content_type, etag, last_modified, stored_at FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+            with conn:
+                conn.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        status, body, content_type, etag, last_modified, stored_at = row
+        return CachedResponse(url, status, bytes(body), content_type, etag, last_modified, stored_at)
+
+    def is_fresh(self, cached: CachedResponse) -> bool:
+        ttl = self.ttl_for(cached.url)
+        return ttl is not None and cached.age() < ttl
+
+    def store(self, url: str, status: int, body: bytes, content_type: str, etag: str, last_modified: str) -> None:
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses "
+                    "(url, status, body, content_type, etag, last_modified, stored_at, accessed_at, size) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (url, status, body, content_type, etag, last_modified, now, now, len(body)),
+                )
+            self.stats["stored"] += 1
+            self._evict(conn)
+
+    def touch(self, url: str) -> None:
+        """Ответ подтверждён сервером (304): срок свежести отсчитывается заново"""
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            with conn:
+                conn.execute(
+                    "UPDATE responses SET stored_at = ?, accessed_at = ? WHERE url = ?",
+                    (now, now, url),
+                )
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Удаляет давно не использованные записи, пока кэш больше max_bytes"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        with conn:
+            for url, size in conn.execute("SELECT url, size FROM responses ORDER BY accessed_at").fetchall():
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+                total -= size
+                evicted += 1
+        self.stats["evicted"] += evicted
+
+    def count(self, field: str) -> None:
+        with self._lock:
+            self.stats[field] = self.stats.get(field, 0) + 1
+
+    def print_report(self) -> None:
+        stats = self.stats
+        if not any(stats[field] for field in ("hits", "revalidated", "misses")):
+            return
+        print(
+            "📦 HTTP-кэш: "
+            f"попаданий {stats['hits']}, подтверждено (304) {stats['revalidated']}, "
+            f"промахов {stats['misses']}, сохранено {stats['stored']}, вытеснено {stats['evicted']}"
+            + (f", устаревших при ошибке сети {stats['stale_served']}" if stats["stale_served"] else "")
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Общий экземпляр на процесс
+http_response_cache = HttpResponseCache()
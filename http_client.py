@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Общий HTTP-клиент для запросов к Infobasket и сайтам с расписанием
+
+Все модули, которые ходят в сеть (InfobasketSmartParser, InfoBasketClient,
+GameSystemManager, GameResultsMonitorFinal, EnhancedGameParser), используют
+одну aiohttp-сессию с пулом соединений:
+- keep-alive: соединения и TLS-сессии переиспользуются между запросами;
+- кэш DNS на HTTP_DNS_CACHE_TTL секунд;
+- ограничение числа соединений всего и на один хост;
+- единые таймауты (общий, на подключение, на чтение);
+- проверка TLS-сертификатов; для хостов из HTTP_INSECURE_HOSTS (по умолчанию
+  Infobasket, как было в EnhancedGameParser) она отключена, HTTP_VERIFY_SSL=false
+  отключает её для всех.
+
+Сессию можно передать в конструктор модуля явно (например, из ежедневного
+оркестратора); иначе используется общий экземпляр shared_http_client.
+В конце работы точки входа вызывают `await shared_http_client.close()`.
+
+GET-запросы к Infobasket и letobasket.ru идут через cached_get: ответы
+сохраняются в постоянном кэше http_cache (TTL, ETag/Last-Modified, LRU).
+В пределах одного запуска одинаковые запросы схлопываются (single-flight):
+параллельные вызовы ждут один и тот же запрос, повторные получают уже
+готовый ответ — каждый URL скачивается один раз. JSON разбирается при каждом
+вызове json(): парсеры дополняют словари игр на месте, и общий объект
+передал бы эти поля следующему получателю.
+"""
+
+import asyncio
+import json
+import os
+import ssl
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+from dotenv import load_dotenv
+
+from http_cache import CachedResponse, http_response_cache
+
+# Загружаем переменные окружения
+load_dotenv()
+
+HTTP_TOTAL_TIMEOUT = float(os.getenv("HTTP_TOTAL_TIMEOUT", "20"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "15"))
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "32"))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "8"))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+HTTP_USER_AGENT = os.getenv("HTTP_USER_AGENT", "PullUP-TG-Bot/1.0 (+aiohttp)")
+HTTP_VERIFY_SSL = os.getenv("HTTP_VERIFY_SSL", "true").lower() != "false"
+# Хосты без проверки сертификата (вместе с поддоменами): серверы Infobasket
+# EnhancedGameParser всегда запрашивал с ssl.CERT_NONE
+HTTP_INSECURE_HOSTS = tuple(
+    host.strip().lower().lstrip(".")
+    for host in os.getenv("HTTP_INSECURE_HOSTS", "infobasket.su").split(",")
+    if host.strip()
+)
+# Подмена адреса Infobasket API (reg/org) для прогонов против локальной заглушки
+# infobasket_stub_server.py; пусто — боевые серверы
+INFOBASKET_BASE_URL = os.getenv("INFOBASKET_BASE_URL", "").strip().rstrip("/")
+
+
+class SharedHttpClient:
+    """Одна aiohttp-сессия с пулом соединений на процесс (на event loop)"""
+
+    def __init__(self) -> None:
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        # Single-flight в пределах запуска: запросы в полёте и готовые ответы по URL
+        self._inflight: Dict[str, "asyncio.Future[HttpResponse]"] = {}
+        self._completed: Dict[str, "HttpResponse"] = {}
+        self.coalesced = 0
+        self.timeout = aiohttp.ClientTimeout(
+            total=HTTP_TOTAL_TIMEOUT,
+            connect=HTTP_CONNECT_TIMEOUT,
+            sock_read=HTTP_READ_TIMEOUT,
+        )
+
+    @staticmethod
+    def _create_ssl_context() -> ssl.SSLContext:
+        """Контекст TLS с проверкой сертификатов и современными протоколами"""
+        context = ssl.create_default_context()
+        context.minimum_version = ssl.TLSVersion.TLSv1_2
+        if not HTTP_VERIFY_SSL:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        return context
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            use_dns_cache=True,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            ssl=self._create_ssl_context(),
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=self.timeout,
+            headers={"User-Agent": HTTP_USER_AGENT},
+        )
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Сессия и futures привязаны к event loop: в новом asyncio.run начинаем заново
+            self._session = None
+            self._lock = asyncio.Lock()
+            self._loop = loop
+            self._inflight.clear()
+            self._completed.clear()
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Возвращает общую сессию, создавая её в текущем event loop"""
+        self._bind_loop()
+        if self._session is not None and not self._session.closed:
+            return self._session
+        assert self._lock is not None
+        async with self._lock:
+            if self._session is None or self._session.closed:
+                self._session = self._create_session()
+        return self._session
+
+    async def single_flight(self, url: str, request: Callable[[], Awaitable["HttpResponse"]]) -> "HttpResponse":
+        """Один запрос на URL за запуск: ожидающие делят future, готовый ответ переиспользуется"""
+        self._bind_loop()
+        completed = self._completed.get(url)
+        if completed is not None:
+            self.coalesced += 1
+            return completed
+        future = self._inflight.get(url)
+        if future is None:
+            future = asyncio.ensure_future(request())
+            self._inflight[url] = future
+            future.add_done_callback(lambda done: self._finish_flight(url, done))
+        else:
+            self.coalesced += 1
+        # shield: отмена одного ожидающего не отменяет запрос для остальных
+        return await asyncio.shield(future)
+
+    def _finish_flight(self, url: str, future: "asyncio.Future[HttpResponse]") -> None:
+        if self._inflight.get(url) is future:
+            del self._inflight[url]
+        if future.cancelled() or future.exception() is not None:
+            return
+        response = future.result()
+        # Ошибочные ответы не запоминаем: следующий вызов повторит запрос
+        if response.status == 200:
+            self._completed[url] = response
+
+    def reset_run(self) -> None:
+        """Начало нового запуска (режим демона): готовые ответы больше не переиспользуются"""
+        self._completed.clear()
+        self.coalesced = 0
+
+    async def close(self) -> None:
+        """Закрывает общую сессию (в конце работы точки входа) и выводит статистику кэша"""
+        session = self._session
+        self._session = None
+        if session is not None and not session.closed:
+            await session.close()
+        if self.coalesced:
+            print(f"🔁 Повторных запросов схлопнуто за запуск: {self.coalesced}")
+        self.reset_run()
+        http_response_cache.print_report()
+
+
+# Общий экземпляр на процесс
+shared_http_client = SharedHttpClient()
+
+
+def verifies_tls(url: str) -> bool:
+    """Проверяется ли сертификат для URL (HTTP_VERIFY_SSL и исключения HTTP_INSECURE_HOSTS)"""
+    if not HTTP_VERIFY_SSL:
+        return False
+    host = (urlsplit(url).hostname or "").lower()
+    return not any(host == insecure or host.endswith(f".{insecure}") for insecure in HTTP_INSECURE_HOSTS)
+
+
+@asynccontextmanager
+async def http_session(session: Optional[aiohttp.ClientSession] = None) -> AsyncIterator[aiohttp.ClientSession]:
+    """Переданная сессия, если она открыта, иначе общая. Сессию не закрывает."""
+    if session is not None and not session.closed:
+        yield session
+        return
+    yield await shared_http_client.get_session()
+
+
+@dataclass
+class HttpResponse:
+    """Ответ GET-запроса (из сети или из кэша) с интерфейсом как у aiohttp"""
+
+    url: str
+    status: int
+    body: bytes
+    content_type: str
+    from_cache: bool = False
+
+    @classmethod
+    def from_cached(cls, cached: CachedResponse) -> "HttpResponse":
+        return cls(cached.url, cached.status, cached.body, cached.content_type, from_cache=True)
+
+    async def read(self) -> bytes:
+        return self.body
+
+    async def json(self, content_type: Optional[str] = None) -> Any:
+        """JSON ответа; каждый вызов получает свой объект, который можно менять"""
+        return json.loads(self.body) if self.body else None
+
+    async def text(self) -> str:
+        charset = ""
+        for part in self.content_type.split(";")[1:]:
+            key, _, value = part.strip().partition("=")
+            if key.lower() == "charset":
+                charset = value.strip().strip('"')
+        for encoding in filter(None, [charset, "utf-8"]):
+            try:
+                return self.body.decode(encoding)
+            except (LookupError, UnicodeDecodeError):
+                continue
+        return self.body.decode("cp1251", errors="replace")
+
+
+async def _fetch(
+    url: str,
+    session: Optional[aiohttp.ClientSession],
+    timeout: Optional[aiohttp.ClientTimeout],
+) -> HttpResponse:
+    cache = http_response_cache
+    cacheable = cache.is_cacheable(url)
+    cached = cache.get(url) if cacheable else None
+    if cached is not None and cache.is_fresh(cached):
+        cache.count("hits")
+        return HttpResponse.from_cached(cached)
+
+    headers = {}
+    if cached is not None:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+    request_kwargs: dict = {"headers": headers}
+    if timeout is not None:
+        request_kwargs["timeout"] = timeout
+    if not verifies_tls(url):
+        request_kwargs["ssl"] = False
+
+    try:
+        async with http_session(session) as active_session:
+            async with active_session.get(url, **request_kwargs) as response:
+                if response.status == 304 and cached is not None:
+                    cache.touch(url)
+                    cache.count("revalidated")
+                    return HttpResponse.from_cached(cached)
+                body = await response.read()
+                content_type = response.headers.get("Content-Type", "")
+                if cacheable:
+                    cache.count("misses")
+                    if response.status == 200:
+                        cache.store(
+                            url,
+                            response.status,
+                            body,
+                            content_type,
+                            response.headers.get("ETag", ""),
+                            response.headers.get("Last-Modified", ""),
+                        )
+                return HttpResponse(url, response.status, body, content_type)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        if cached is None:
+            raise
+        # Сеть недоступна — лучше устаревшие данные, чем никаких
+        cache.count("stale_served")
+        print(f"⚠️ {url}: ошибка сети ({e or type(e).__name__}), используем сохранённый ответ")
+        return HttpResponse.from_cached(cached)
+
+
+class _ResponseContext:
+    """Позволяет писать `async with cached_get(url) as response:` как с session.get"""
+
+    def __init__(self, request: Awaitable[HttpResponse]) -> None:
+        self._request = request
+
+    def __await__(self):
+        return self._request.__await__()
+
+    async def __aenter__(self) -> HttpResponse:
+        return await self._request
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+def cached_get(
+    url: str,
+    session: Optional[aiohttp.ClientSession] = None,
+    timeout: Optional[aiohttp.ClientTimeout] = None,
+) -> _ResponseContext:
+    """GET через общий пул соединений, постоянный кэш ответов и single-flight"""
+    return _ResponseContext(
+        shared_http_client.single_flight(url, lambda: _fetch(url, session, timeout))
+    )
@@ -12,10 +12,12 @@ from typing import Any, Dict, List, Optional
 import aiohttp
 from dotenv import load_dotenv
 
+from http_client import INFOBASKET_BASE_URL, cached_get, http_session, shared_http_client
+
 # Загружаем переменные окружения
 load_dotenv()
 
-INFOBASKET_API_BASE = os.getenv("INFOBASKET_API_BASE", "https://asb.infobasket.su").rstrip("/")
+INFOBASKET_API_BASE = (os.getenv("INFOBASKET_API_BASE") or INFOBASKET_BASE_URL or "https://asb.infobasket.su").rstrip("/")
 INFOBASKET_COMPETITION_ID = os.getenv("INFOBASKET_COMPETITION_ID")
 INFOBASKET_COMPETITION_TAG = os.getenv("INFOBASKET_COMPETITION_TAG")
 
@@ -23,14 +25,19 @@ INFOBASKET_COMPETITION_TAG = os.getenv("INFOBASKET_COMPETITION_TAG")
 class InfoBasketClient:
     """Легкий клиент для работы с Infobasket Widget/Comp API."""
 
-    def __init__(self, base_url: Optional[str] = None) -> None:
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        session: Optional[aiohttp.ClientSession] = None,
+    ) -> None:
         self.base_url = (base_url or INFOBASKET_API_BASE).rstrip("/")
+        # Общая HTTP-сессия; без неё используется shared_http_client
+        self.session = session
 
     async def _get_json(self, url: str) -> Optional[Dict[str, Any]]:
         try:
-            timeout = aiohttp.ClientTimeout(total=20)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(url) as resp:
+            async with http_session(self.session) as session:
+                async with cached_get(url, session) as resp:
                     if resp.status == 200:
                         return await resp.json(content_type=None)
                     return None
@@ -280,7 +287,10 @@ class InfoBasketClient:
 if __name__ == "__main__":
     async def _main():
         client = InfoBasketClient()
-        games = await client.get_schedule()
+        try:
+            games = await client.get_schedule()
+        finally:
+            await shared_http_client.close()
         print(f"📊 Найдено игр: {len(games)}")
         for g in games[:5]:
             print(f" - {g['date']} {g['time']}: {g['team1']} vs {g['team2']} @ {g['venue']} (id={g['game_id']})")
@@ -8,19 +8,38 @@
 import asyncio
 import aiohttp
 import json
+import os
 from datetime import datetime, timedelta
 from typing import Any, List, Dict, Optional
 import pytz
+from comp_names import register_from_payload
+from http_client import INFOBASKET_BASE_URL, cached_get, http_session, shared_http_client
+
+# Сколько календарей/сезонов запрашивать одновременно и таймаут одного запроса (сек)
+INFOBASKET_FETCH_CONCURRENCY = int(os.getenv("INFOBASKET_FETCH_CONCURRENCY", "4"))
+INFOBASKET_REQUEST_TIMEOUT = float(os.getenv("INFOBASKET_REQUEST_TIMEOUT", "15"))
 
 class InfobasketSmartParser:
     def __init__(
         self,
         comp_ids: Optional[List[int]] = None,
         team_ids: Optional[List[int]] = None,
-        team_name_keywords: Optional[List[str]] = None
+        team_name_keywords: Optional[List[str]] = None,
+        http_session: Optional[aiohttp.ClientSession] = None,
+        max_concurrency: int = INFOBASKET_FETCH_CONCURRENCY,
+        request_timeout: float = INFOBASKET_REQUEST_TIMEOUT,
+        base_url: Optional[str] = None
     ):
-        self.org_api_url = "https://org.infobasket.su"
-        self.reg_api_url = "https://reg.infobasket.su"
+        # Общая HTTP-сессия; без неё используется shared_http_client
+        self.http_session = http_session
+        self.max_concurrency = max(1, max_concurrency)
+        self.request_timeout = request_timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        # base_url (или INFOBASKET_BASE_URL) заменяет и reg, и org — например, локальной заглушкой
+        base_url = (base_url or INFOBASKET_BASE_URL).rstrip("/")
+        self.org_api_url = base_url or "https://org.infobasket.su"
+        self.reg_api_url = base_url or "https://reg.infobasket.su"
         
         sanitized_keywords = []
         if team_name_keywords:
@@ -94,22 +113,38 @@ class InfobasketSmartParser:
         today = self.get_moscow_date().date()
         return game_date.date() < today
     
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Ограничитель одновременных запросов (создаётся в текущем event loop)"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+    
+    async def _fetch_json_list(self, url: str, what: str) -> List[Dict]:
+        """GET с ограничением параллельности и таймаутом; при ошибке — пустой список"""
+        timeout = aiohttp.ClientTimeout(total=self.request_timeout)
+        async with self._get_semaphore():
+            async with http_session(self.http_session) as session:
+                try:
+                    async with cached_get(url, session, timeout) as response:
+                        if response.status == 200:
+                            data = await response.json()
+                            return data or []
+                        else:
+                            print(f"❌ Ошибка получения {what}: {response.status}")
+                            return []
+                except asyncio.TimeoutError:
+                    print(f"⏱️ Таймаут {self.request_timeout:.0f} сек при получении {what}")
+                    return []
+                except Exception as e:
+                    print(f"❌ Исключение при получении {what}: {e}")
+                    return []
+    
     async def get_seasons_for_tag(self, tag: str) -> List[Dict]:
         """Получает сезоны по тегу"""
         url = f"{self.org_api_url}/Comp/GetSeasonsForTag?tag={tag}"
-        
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data
-                    else:
-                        print(f"❌ Ошибка получения сезонов: {response.status}")
-                        return []
-            except Exception as e:
-                print(f"❌ Исключение при получении сезонов: {e}")
-                return []
+        return await self._fetch_json_list(url, f"сезонов ({tag})")
     
     def get_active_season(self, seasons: List[Dict]) -> Optional[Dict]:
         """Находит активный сезон (самый новый)"""
@@ -122,19 +157,10 @@ class InfobasketSmartParser:
     async def get_calendar_for_comp(self, comp_id: int) -> List[Dict]:
         """Получает календарь игр для соревнования"""
         url = f"{self.reg_api_url}/Comp/GetCalendar/?comps={comp_id}&format=json"
-        
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data
-                    else:
-                        print(f"❌ Ошибка получения календаря: {response.status}")
-                        return []
-            except Exception as e:
-                print(f"❌ Исключение при получении календаря: {e}")
-                return []
+        games = await self._fetch_json_list(url, f"календаря ({comp_id})")
+        # Попутно пополняем справочник названий соревнований
+        register_from_payload(games, default_comp_id=comp_id)
+        return games
     
     def filter_games_by_teams(self, games: List[Dict]) -> List[Dict]:
         """Фильтрует игры по нашим командам"""
@@ -280,13 +306,10 @@ class InfobasketSmartParser:
         if self.config_mode:
             return await self._get_games_for_config_ids()
         
-        all_games = {}
-        
-        for team_type in self.tags.keys():
-            games = await self.get_team_games(team_type)
-            all_games[team_type] = games
-            
-        return all_games
+        # Составы запрашиваются параллельно, результат собирается в порядке self.tags
+        team_types = list(self.tags.keys())
+        results = await asyncio.gather(*(self.get_team_games(team_type) for team_type in team_types))
+        return dict(zip(team_types, results))
     
     async def _get_games_for_config_ids(self) -> Dict[str, Dict[str, List[Dict]]]:
         """Получает игры на основе конфигурации ID соревнований"""
@@ -296,9 +319,16 @@ class InfobasketSmartParser:
             print("⚠️ Конфигурация соревнований пуста, возвращаем пустой список игр")
             return {'configured': {'future': [], 'today': [], 'past': []}}
         
-        for comp_id in self.custom_comp_ids:
-            print(f"\n🔍 Получаем календарь для соревнования {comp_id}")
-            games = await self.get_calendar_for_comp(comp_id)
+        print(
+            f"\n🔍 Получаем календари для соревнований {self.custom_comp_ids} "
+            f"(параллельно до {self.max_concurrency})"
+        )
+        # Календари запрашиваются параллельно; порядок обработки — по возрастанию comp_id,
+        # поэтому итог не зависит от того, какой ответ пришёл первым
+        calendars = await asyncio.gather(
+            *(self.get_calendar_for_comp(comp_id) for comp_id in self.custom_comp_ids)
+        )
+        for comp_id, games in zip(self.custom_comp_ids, calendars):
             if not games:
                 print(f"⚠️ Игры не найдены для соревнования {comp_id}")
                 continue
@@ -389,6 +419,8 @@ async def main():
                 
     except Exception as e:
         print(f"❌ Ошибка: {e}")
+    finally:
+        await shared_http_client.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,514 @@
+#!/usr/bin/env python3
+"""
+Локальная заглушка Infobasket API на записанных фикстурах (benchmark_fixtures/)
+
+Отдаёт те же маршруты, что и reg/org.infobasket.su:
+- /Comp/GetCalendar/?comps=ID       — записанный календарь; для остальных ID
+  календарь клонируется из записанного (новые CompID, название и GameID),
+  поэтому можно запросить хоть 50+ соревнований;
+- /Comp/GetSeasonsForTag?tag=TAG    — сезоны тега (CompID, SeasonYear, issueId);
+- /Widget/GetOnline/ID              — записанный GetOnline с командами и счётом
+  игры из календаря;
+- /Widget/CompIssue/ID              — выпуск соревнования с играми календаря;
+- /Comp/GetTeamStatsForPreview/ID   — средние показатели игроков обеих команд;
+- /__stats                          — счётчики запросов, ошибок и медленных ответов.
+
+Поведение сети задаётся профилем: задержка с разбросом, доля ответов с
+ошибкой (500/503/429) и доля «медленных тел», которые отдаются по частям.
+Ответы содержат ETag, поэтому проверяется и перепроверка кэша (304).
+
+Все модули принимают base_url (или переменную INFOBASKET_BASE_URL), так что
+против заглушки можно запустить и весь бот целиком.
+
+Запуск:
+    python infobasket_stub_server.py --port 8765 --latency-ms 80 --jitter-ms 40 --error-rate 0.05
+    INFOBASKET_BASE_URL=http://127.0.0.1:8765 python run_daily_operations.py
+    python infobasket_stub_server.py --load-test 60 --concurrency 1 4 16 --latency-ms 50
+"""
+
+import argparse
+import asyncio
+import contextlib
+import copy
+import gzip
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import zlib
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_fixtures")
+MANIFEST_FILE = "manifest.json"
+# Статусы, которыми отвечает заглушка при внесённой ошибке
+ERROR_STATUSES = (500, 503, 429)
+# Сколько готовых ответов GetOnline держать в памяти (тело ~100 КБ)
+ONLINE_BODY_CACHE_SIZE = 256
+# Поля календаря с датой ДД.ММ.ГГГГ (сдвигаются на date_offset_days)
+CALENDAR_DATE_FIELDS = ("GameDate", "DisplayDateTimeMsk")
+
+
+@dataclass
+class FaultProfile:
+    """Поведение «сети»: задержка, ошибки и медленная отдача тела"""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    slow_body_rate: float = 0.0
+    slow_body_ms: float = 500.0
+    slow_body_chunks: int = 8
+    seed: int = 2026
+
+
+def shift_calendar_date(value: Any, days: int) -> Any:
+    """Сдвигает дату ДД.ММ.ГГГГ в начале строки на days дней (прочие значения не меняет)"""
+    if not days or not isinstance(value, str) or len(value) < 10:
+        return value
+    try:
+        moved = datetime.strptime(value[:10], "%d.%m.%Y") + timedelta(days=days)
+    except ValueError:
+        return value
+    return moved.strftime("%d.%m.%Y") + value[10:]
+
+
+class InfobasketFixtures:
+    """Ответы Infobasket, собранные из записанных фикстур.
+
+    date_offset_days сдвигает даты календарей: фикстуры записаны на конкретные
+    дни, а прогоны «сегодня» (опросы, анонсы) должны находить будущие игры.
+    """
+
+    def __init__(self, fixtures_dir: str = FIXTURES_DIR, date_offset_days: int = 0) -> None:
+        self.fixtures_dir = fixtures_dir
+        manifest = self._read_json(MANIFEST_FILE)
+        self._recorded: Dict[int, List[Dict[str, Any]]] = {}
+        for name in manifest.get("calendars") or []:
+            games = self._read_json(name)
+            for game in games:
+                for field in CALENDAR_DATE_FIELDS:
+                    if field in game:
+                        game[field] = shift_calendar_date(game[field], date_offset_days)
+            if games:
+                self._recorded[int(games[0]["CompID"])] = games
+        if not self._recorded:
+            raise ValueError(f"В {fixtures_dir} нет записанных календарей")
+        self._templates = [self._recorded[comp_id] for comp_id in sorted(self._recorded)]
+        self._online: Dict[str, Any] = self._read_json(manifest["online"])
+
+        self._calendars: Dict[int, List[Dict[str, Any]]] = dict(self._recorded)
+        # GameID -> игра календаря (для GetOnline и превью)
+        self._games: Dict[int, Dict[str, Any]] = {}
+        for games in self._recorded.values():
+            self._index(games)
+        self._online_bodies: "OrderedDict[int, bytes]" = OrderedDict()
+
+    def _read_json(self, name: str) -> Any:
+        path = os.path.join(self.fixtures_dir, name)
+        opener = gzip.open if name.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as fixture_file:
+            return json.load(fixture_file)
+
+    def _index(self, games: List[Dict[str, Any]]) -> None:
+        for game in games:
+            self._games[int(game["GameID"])] = game
+
+    @property
+    def recorded_comp_ids(self) -> List[int]:
+        return sorted(self._recorded)
+
+    def calendar(self, comp_id: int) -> List[Dict[str, Any]]:
+        """Календарь соревнования; незаписанные клонируются из записанных"""
+        games = self._calendars.get(comp_id)
+        if games is None:
+            template = self._templates[comp_id % len(self._templates)]
+            games = []
+            for index, source in enumerate(template):
+                game = dict(source)
+                game["CompID"] = comp_id
+                game["CompNameRu"] = f"Соревнование {comp_id}"
+                # GameID не пересекаются между клонами: comp_id * 1000 + номер игры
+                game["GameID"] = comp_id * 1000 + index
+                games.append(game)
+            self._calendars[comp_id] = games
+            self._index(games)
+        return games
+
+    def seasons(self, tag: str) -> List[Dict[str, Any]]:
+        """Сезоны тега: текущий — одно из записанных соревнований, прошлые — клоны"""
+        comp_ids = self.recorded_comp_ids
+        current = comp_ids[zlib.crc32(tag.encode("utf-8")) % len(comp_ids)]
+        seasons = []
+        for offset in range(3):
+            comp_id = current - offset * 1000
+            seasons.append({
+                "CompID": comp_id,
+                "SeasonYear": 2026 - offset,
+                "CompNameRu": self.calendar(comp_id)[0]["CompNameRu"],
+                "Tag": tag,
+                "issueId": comp_id,
+            })
+        return seasons
+
+    def comp_issue(self, issue_id: int) -> Dict[str, Any]:
+        """Выпуск соревнования в формате Widget/CompIssue"""
+        games = self.calendar(issue_id)
+        return {
+            "CompID": issue_id,
+            "CompNameRu": games[0]["CompNameRu"],
+            "Comps": [{"CompID": issue_id, "CompNameRu": games[0]["CompNameRu"]}],
+            "Games": [
+                {
+                    "GameID": game["GameID"],
+                    "Team1Name": game.get("ShortTeamNameAru"),
+                    "Team2Name": game.get("ShortTeamNameBru"),
+                    "GameDate": game.get("GameDate"),
+                    "GameTime": game.get("GameTimeMsk"),
+                    "GymName": game.get("ArenaRu"),
+                    "State": game.get("GameStatus"),
+                }
+                for game in games
+            ],
+        }
+
+    def _game_teams(self, game_id: int) -> List[Tuple[Any, Optional[str], Any]]:
+        """(TeamID, название, счёт) команд 1 и 2: из календаря или из записанной игры"""
+        game = self._games.get(game_id)
+        if game is None:
+            return [
+                (team.get("TeamID"), team.get("TeamName2"), team.get("Score"))
+                for team in self._online.get("OnlineTeams") or []
+            ]
+        return [
+            (game.get("TeamAid"), game.get("ShortTeamNameAru"), game.get("ScoreA")),
+            (game.get("TeamBid"), game.get("ShortTeamNameBru"), game.get("ScoreB")),
+        ]
+
+    def online_body(self, game_id: int) -> bytes:
+        """Тело GetOnline: записанная игра с ID, соревнованием и командами запрошенной"""
+        body = self._online_bodies.get(game_id)
+        if body is not None:
+            self._online_bodies.move_to_end(game_id)
+            return body
+
+        online = dict(self._online)
+        online["GameID"] = game_id
+        game = self._games.get(game_id)
+        if game is not None:
+            online["CompID"] = game["CompID"]
+            online["CompNameRu"] = game.get("CompNameRu")
+            online["GameStatus"] = game.get("GameStatus", online.get("GameStatus"))
+        teams = self._game_teams(game_id)
+        online_teams = copy.deepcopy(online.get("OnlineTeams") or [])
+        game_teams = copy.deepcopy(online.get("GameTeams") or [])
+        for entries in (online_teams, game_teams):
+            for entry, (team_id, name, score) in zip(entries, teams):
+                entry["TeamID"] = team_id
+                if score is not None:
+                    entry["Score"] = score
+                if "TeamName1" in entry:
+                    entry["TeamName1"] = f"БК {name}"
+                    entry["TeamName2"] = name
+                if isinstance(entry.get("TeamName"), dict):
+                    entry["TeamName"] = {"CompTeamNameRu": name, "CompTeamShortNameRu": name}
+        online["OnlineTeams"] = online_teams
+        online["GameTeams"] = game_teams
+
+        body = json.dumps(online, ensure_ascii=False).encode("utf-8")
+        self._online_bodies[game_id] = body
+        if len(self._online_bodies) > ONLINE_BODY_CACHE_SIZE:
+            self._online_bodies.popitem(last=False)
+        return body
+
+    def team_stats_for_preview(self, game_id: int) -> List[Dict[str, Any]]:
+        """Средние показатели игроков обеих команд (по протоколу записанной игры)"""
+        players_by_team: Dict[int, List[Dict[str, Any]]] = {}
+        for player in (self._online.get("Protocol") or [{}])[0].get("Players") or []:
+            points = player.get("Points") or 0
+            rebounds = player.get("Rebound") or 0
+            assists = player.get("Assist") or 0
+            steals = player.get("Steal") or 0
+            players_by_team.setdefault(player.get("TeamNumber"), []).append({
+                "PersonID": player.get("PersonID"),
+                "PlayerNumber": player.get("PlayerNumber"),
+                "DisplayNumber": player.get("DisplayNumber"),
+                "PersonInfo": {
+                    "PersonID": player.get("PersonID"),
+                    "PersonLastNameRu": player.get("LastNameRu"),
+                    "PersonFirstNameRu": player.get("FirstNameRu"),
+                },
+                "AvgPoints": points,
+                "AvgRebound": rebounds,
+                "AvgAssist": assists,
+                "AvgSteal": steals,
+                "AvgKPI": points + rebounds + assists + steals - (player.get("Turnover") or 0),
+            })
+        return [
+            {"TeamID": team_id, "TeamNameRu": name, "Players": players_by_team.get(number, [])}
+            for number, (team_id, name, _) in enumerate(self._game_teams(game_id), start=1)
+        ]
+
+
+# --- Приложение -----------------------------------------------------------
+
+
+def _json_response(data: Any) -> web.Response:
+    return web.json_response(data, dumps=lambda value: json.dumps(value, ensure_ascii=False))
+
+
+def _int_param(raw: str) -> int:
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        raise web.HTTPBadRequest(text=f"Некорректный ID: {raw!r}")
+
+
+async def _handle_calendar(request: web.Request) -> web.Response:
+    fixtures: InfobasketFixtures = request.app["fixtures"]
+    comps = [part for part in request.query.get("comps", "").split(",") if part.strip()]
+    if not comps:
+        raise web.HTTPBadRequest(text="Не указан параметр comps")
+    games: List[Dict[str, Any]] = []
+    for comp in comps:
+        games.extend(fixtures.calendar(_int_param(comp.strip())))
+    return _json_response(games)
+
+
+async def _handle_seasons(request: web.Request) -> web.Response:
+    tag = request.query.get("tag", "").strip()
+    if not tag:
+        raise web.HTTPBadRequest(text="Не указан параметр tag")
+    return _json_response(request.app["fixtures"].seasons(tag))
+
+
+async def _handle_online(request: web.Request) -> web.Response:
+    body = request.app["fixtures"].online_body(_int_param(request.match_info["game_id"]))
+    return web.Response(body=body, content_type="application/json", charset="utf-8")
+
+
+async def _handle_comp_issue(request: web.Request) -> web.Response:
+    return _json_response(request.app["fixtures"].comp_issue(_int_param(request.match_info["issue_id"])))
+
+
+async def _handle_team_stats(request: web.Request) -> web.Response:
+    return _json_response(request.app["fixtures"].team_stats_for_preview(_int_param(request.match_info["game_id"])))
+
+
+async def _handle_stats(request: web.Request) -> web.Response:
+    return _json_response({key: dict(counter) for key, counter in request.app["stats"].items()})
+
+
+async def _send_slowly(request: web.Request, response: web.Response, profile: FaultProfile) -> web.StreamResponse:
+    """Отдаёт тело частями, растягивая передачу на slow_body_ms"""
+    # Ответы заглушки собираются из готовых байтов (_json_response), Payload здесь не бывает
+    body = response.body if isinstance(response.body, (bytes, bytearray)) else b""
+    stream = web.StreamResponse(status=response.status, headers=response.headers)
+    stream.content_length = len(body)
+    await stream.prepare(request)
+    chunks = max(1, profile.slow_body_chunks)
+    chunk_size = max(1, -(-len(body) // chunks))
+    pause = profile.slow_body_ms / 1000 / chunks
+    for start in range(0, len(body), chunk_size):
+        await stream.write(body[start:start + chunk_size])
+        await asyncio.sleep(pause)
+    await stream.write_eof()
+    return stream
+
+
+@web.middleware
+async def _fault_middleware(request: web.Request, handler) -> web.StreamResponse:
+    """Задержка, ошибки, ETag/304 и медленные тела для маршрутов Infobasket"""
+    route = request.match_info.route.name
+    if route is None or route == "stats":
+        return await handler(request)
+
+    profile: FaultProfile = request.app["profile"]
+    rng: random.Random = request.app["rng"]
+    stats = request.app["stats"]
+    stats["hits"][route] += 1
+
+    delay = profile.latency_ms + (rng.uniform(-profile.jitter_ms, profile.jitter_ms) if profile.jitter_ms else 0.0)
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+
+    if profile.error_rate and rng.random() < profile.error_rate:
+        status = rng.choice(ERROR_STATUSES)
+        stats["errors"][route] += 1
+        headers = {"Retry-After": "1"} if status == 429 else None
+        return web.Response(status=status, text=f"Внесённая ошибка {status}", headers=headers)
+
+    response = await handler(request)
+    body = response.body if isinstance(response, web.Response) else None
+    if response.status != 200 or not isinstance(body, bytes):
+        return response
+
+    etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+    if request.headers.get("If-None-Match") == etag:
+        stats["not_modified"][route] += 1
+        return web.Response(status=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    stats["bytes"][route] += len(body)
+
+    if profile.slow_body_rate and rng.random() < profile.slow_body_rate:
+        stats["slow"][route] += 1
+        return await _send_slowly(request, response, profile)
+    return response
+
+
+def create_app(
+    profile: Optional[FaultProfile] = None,
+    fixtures_dir: str = FIXTURES_DIR,
+    date_offset_days: int = 0,
+) -> web.Application:
+    """Приложение aiohttp с маршрутами Infobasket и заданным профилем сети"""
+    profile = profile or FaultProfile()
+    app = web.Application(middlewares=[_fault_middleware])
+    app["profile"] = profile
+    app["rng"] = random.Random(profile.seed)
+    app["fixtures"] = InfobasketFixtures(fixtures_dir, date_offset_days)
+    app["stats"] = {key: Counter() for key in ("hits", "errors", "not_modified", "slow", "bytes")}
+    app.router.add_get("/Comp/GetCalendar", _handle_calendar, name="calendar")
+    app.router.add_get("/Comp/GetCalendar/", _handle_calendar, name="calendar_slash")
+    app.router.add_get("/Comp/GetSeasonsForTag", _handle_seasons, name="seasons")
+    app.router.add_get("/Widget/GetOnline/{game_id}", _handle_online, name="online")
+    app.router.add_get("/Widget/CompIssue/{issue_id}", _handle_comp_issue, name="comp_issue")
+    app.router.add_get("/Comp/GetTeamStatsForPreview/{game_id}", _handle_team_stats, name="preview")
+    app.router.add_get("/__stats", _handle_stats, name="stats")
+    return app
+
+
+@asynccontextmanager
+async def run_stub_server(
+    app: web.Application,
+    host: str = "127.0.0.1",
+    port: int = 0,
+) -> AsyncIterator[str]:
+    """Запускает заглушку в текущем event loop и возвращает её base URL (port=0 — свободный порт)"""
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    try:
+        bound_host, bound_port = runner.addresses[0][:2]
+        yield f"http://{bound_host}:{bound_port}"
+    finally:
+        await runner.cleanup()
+
+
+# --- Нагрузочный прогон ---------------------------------------------------
+
+
+def _configure_load_test_environment(work_dir: str) -> None:
+    """Без постоянного HTTP-кэша: каждый прогон действительно ходит в заглушку"""
+    os.environ["HTTP_CACHE_ENABLED"] = "false"
+    os.environ["COMP_NAMES_PATH"] = os.path.join(work_dir, "comp_names.json")
+
+
+async def run_load_test(app: web.Application, base_url: str, comp_count: int, concurrency: List[int], online_games: int) -> None:
+    """Календари comp_count соревнований и GetOnline первых игр при разной параллельности"""
+    from enhanced_game_parser import EnhancedGameParser
+    from http_client import shared_http_client
+    from infobasket_smart_parser import InfobasketSmartParser
+
+    fixtures: InfobasketFixtures = app["fixtures"]
+    comp_ids = fixtures.recorded_comp_ids
+    comp_ids += [900 + index for index in range(max(0, comp_count - len(comp_ids)))]
+    comp_ids = comp_ids[:comp_count]
+    hits = app["stats"]["hits"]
+    errors = app["stats"]["errors"]
+
+    print(f"🏋️ Нагрузочный прогон: {len(comp_ids)} соревнований, заглушка {base_url}")
+    try:
+        for limit in concurrency:
+            shared_http_client.reset_run()
+            hits_before, errors_before = sum(hits.values()), sum(errors.values())
+            started = time.perf_counter()
+            with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+                parser = InfobasketSmartParser(
+                    comp_ids=comp_ids,
+                    team_ids=[1001, 1002],
+                    base_url=base_url,
+                    max_concurrency=limit,
+                )
+                games = (await parser.get_all_team_games())["configured"]
+                calendars_done = time.perf_counter()
+                game_ids = [game.get("GameID") for game in games["past"][:online_games]]
+                async with EnhancedGameParser(base_url=base_url) as game_parser:
+                    widgets = await asyncio.gather(
+                        *(game_parser.get_game_data_from_api(str(game_id)) for game_id in game_ids)
+                    )
+            finished = time.perf_counter()
+            found = sum(len(games[key]) for key in ("future", "today", "past"))
+            print(
+                f"   ⚙️ параллельность {limit}: календари {(calendars_done - started) * 1000:.0f} мс, "
+                f"GetOnline {len(game_ids)} игр {(finished - calendars_done) * 1000:.0f} мс; "
+                f"игр найдено {found}, GetOnline получено {sum(1 for widget in widgets if widget)}; "
+                f"запросов {sum(hits.values()) - hits_before}, ошибок {sum(errors.values()) - errors_before}, "
+                f"схлопнуто {shared_http_client.coalesced}"
+            )
+    finally:
+        await shared_http_client.close()
+
+
+async def _serve(args: argparse.Namespace, profile: FaultProfile) -> None:
+    app = create_app(profile, args.fixtures, args.date_offset_days)
+    async with run_stub_server(app, args.host, args.port) as base_url:
+        if args.load_test:
+            await run_load_test(app, base_url, args.load_test, args.concurrency, args.online_games)
+            return
+        print(f"🧪 Заглушка Infobasket: {base_url} (INFOBASKET_BASE_URL={base_url})")
+        print(
+            f"   задержка {profile.latency_ms:.0f}±{profile.jitter_ms:.0f} мс, ошибки {profile.error_rate:.0%}, "
+            f"медленные тела {profile.slow_body_rate:.0%} по {profile.slow_body_ms:.0f} мс"
+        )
+        await asyncio.Event().wait()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Локальная заглушка Infobasket API на фикстурах")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None, help="по умолчанию 8765; 0 — свободный порт (так в --load-test)")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="каталог с manifest.json")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="задержка перед ответом")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="разброс задержки (±)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 500/503/429")
+    parser.add_argument("--slow-body-rate", type=float, default=0.0, help="доля ответов, отдаваемых по частям")
+    parser.add_argument("--slow-body-ms", type=float, default=500.0, help="длительность отдачи медленного тела")
+    parser.add_argument("--seed", type=int, default=2026)
+    parser.add_argument("--date-offset-days", type=int, default=0, help="сдвиг дат календарей (дней)")
+    parser.add_argument("--load-test", type=int, default=0, metavar="N", help="прогнать парсеры на N соревнованиях и выйти")
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[1, 4, 16], help="параллельность для --load-test")
+    parser.add_argument("--online-games", type=int, default=20, help="сколько GetOnline запросить в --load-test")
+    args = parser.parse_args()
+
+    profile = FaultProfile(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        slow_body_rate=args.slow_body_rate,
+        slow_body_ms=args.slow_body_ms,
+        seed=args.seed,
+    )
+    if args.port is None:
+        args.port = 0 if args.load_test else 8765
+    with tempfile.TemporaryDirectory(prefix="pullup-stub-") as work_dir:
+        if args.load_test:
+            _configure_load_test_environment(work_dir)
+        try:
+            asyncio.run(_serve(args, profile))
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
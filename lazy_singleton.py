@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Ленивые глобальные экземпляры
+
+Модули проекта экспортируют общие объекты (duplicate_protection,
+game_system_manager, players_manager), конструкторы которых авторизуются
+в Google Sheets и читают листы по сети. LazySingleton откладывает создание
+объекта до первого обращения к его атрибуту, поэтому импорт модуля
+остаётся дешёвым, а существующий код вида
+`from enhanced_duplicate_protection import duplicate_protection` продолжает работать.
+"""
+
+import threading
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class LazySingleton(Generic[T]):
+    """Прокси, создающий объект при первом обращении к атрибуту"""
+
+    def __init__(self, factory: Callable[[], T], name: str) -> None:
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _resolve(self) -> T:
+        """Возвращает экземпляр, создавая его при первом вызове"""
+        instance: Optional[T] = self._instance
+        if instance is not None:
+            return instance
+        with self._lock:
+            instance = self._instance
+            if instance is not None:
+                return instance
+            created = self._factory()
+            object.__setattr__(self, "_instance", created)
+            return created
+
+    def _is_initialized(self) -> bool:
+        return self._instance is not None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._resolve(), name, value)
+
+    def __repr__(self) -> str:
+        state = "создан" if self._is_initialized() else "не создан"
+        return f"<LazySingleton {self._name}: {state}>"
+
+
+def is_initialized(obj: Any) -> bool:
+    """Создан ли объект за ленивым экземпляром (обычный объект считается созданным)"""
+    if isinstance(obj, LazySingleton):
+        return obj._is_initialized()
+    return True
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Замер времени холодного импорта точек входа
+
+Каждый модуль импортируется в отдельном чистом процессе несколько раз,
+берётся лучшее время. Цель — IMPORT_TIME_TARGET_SECONDS на модуль:
+импорт не должен обращаться к сети (общие экземпляры duplicate_protection,
+game_system_manager и players_manager создаются лениво), поэтому время
+определяется только загрузкой библиотек (gspread, telegram, aiohttp).
+
+Кроме времени скрипт проверяет, что после импорта ни один ленивый экземпляр
+не был создан. Код выхода 1, если цель не достигнута или импорт подключился к сети.
+
+Запуск: python measure_import_time.py [--runs 5] [--target 1.5] [модуль ...]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+IMPORT_TIME_TARGET_SECONDS = float(os.getenv("IMPORT_TIME_TARGET_SECONDS", "1.5"))
+
+ENTRY_POINTS = [
+    "run_game_system",
+    "run_game_results_monitor_final",
+    "run_birthday_notifications",
+    "training_polls_enhanced",
+    "cleanup_service_sheet",
+    "update_automation_config",
+    "game_system_manager",
+    "game_results_monitor_final",
+    "birthday_notifications",
+    "run_daily_operations",
+]
+
+# (модуль, имя ленивого экземпляра)
+LAZY_SINGLETONS = [
+    ("enhanced_duplicate_protection", "duplicate_protection"),
+    ("game_system_manager", "game_system_manager"),
+    ("players_manager", "players_manager"),
+]
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+from lazy_singleton import is_initialized
+created = []
+for module_name, attr in {singletons!r}:
+    module = sys.modules.get(module_name)
+    proxy = getattr(module, attr, None) if module else None
+    if proxy is not None and is_initialized(proxy):
+        created.append(attr)
+print(json.dumps({{"elapsed": elapsed, "created": created}}))
+"""
+
+
+def measure_module(module: str, runs: int) -> Dict[str, Any]:
+    """Импортирует модуль runs раз в новых процессах, возвращает лучшее время"""
+    best: Optional[float] = None
+    created: List[str] = []
+    error = ""
+    code = _PROBE.format(module=module, singletons=LAZY_SINGLETONS)
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+        if result.returncode != 0 or not lines:
+            error = (result.stderr.strip().splitlines() or ["неизвестная ошибка"])[-1]
+            break
+        data = json.loads(lines[-1])
+        best = data["elapsed"] if best is None else min(best, data["elapsed"])
+        created = data["created"]
+    return {"module": module, "seconds": best, "created": created, "error": error}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Время холодного импорта точек входа")
+    parser.add_argument("modules", nargs="*", default=ENTRY_POINTS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target", type=float, default=IMPORT_TIME_TARGET_SECONDS)
+    args = parser.parse_args()
+
+    print(f"⏱️ Холодный импорт (лучшее из {args.runs}), цель {args.target:.2f} сек")
+    failed = False
+    for module in args.modules:
+        result = measure_module(module, args.runs)
+        seconds = result["seconds"]
+        if result["error"]:
+            failed = True
+            print(f"   ❌ {module}: ошибка импорта — {result['error']}")
+            continue
+        status = "✅" if seconds <= args.target and not result["created"] else "❌"
+        failed = failed or status == "❌"
+        line = f"   {status} {module}: {seconds:.3f} сек"
+        if result["created"]:
+            line += f" (при импорте созданы: {', '.join(result['created'])})"
+        print(line)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
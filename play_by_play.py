@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Инкрементальная обработка хронологии игры (OnlinePlays) из Widget/GetOnline
+
+Раньше счёт по четвертям пересчитывался с нуля при каждом запросе:
+весь список OnlinePlays сортировался и суммировался заново. Процессор
+запоминает вклад каждого учтённого эпизода (по PlayID) и хранит текущие
+суммы по периодам, поэтому повторный опрос идущей игры только сверяет
+эпизоды с запомненными, без сортировки и пересуммирования:
+- новые эпизоды добавляют очки к своему периоду;
+- если у учтённого эпизода изменились SysStatus, PlayTypeID, StartID или
+  PlayPeriod (отмена или исправление протокола), его вклад пересчитывается;
+- эпизоды, пропавшие из ответа, вычитаются;
+- при смене цены бросков (FreeThrowValue/FieldGoalValue/LongShotValue) или
+  команды игрока в OnlineStarts счёт пересчитывается целиком;
+- эпизоды игрока, которого ещё нет в OnlineStarts, не учитываются до
+  появления стартового состава.
+
+Процессоры живут между опросами одной игры: processor_for_game(game_id).
+"""
+
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+# (период, номер команды, очки) — вклад эпизода в счёт
+_Contribution = Optional[Tuple[int, int, int]]
+# Поля эпизода, от которых зависит его вклад
+_Fingerprint = Tuple[Any, Any, Any, Any]
+
+
+class PlayByPlayProcessor:
+    """Текущий счёт по периодам с учётом только изменившихся эпизодов"""
+
+    def __init__(self) -> None:
+        self.period_totals: Dict[int, Dict[int, int]] = {}
+        # Число учтённых результативных эпизодов по периодам: период выводится, пока оно больше нуля
+        self._period_plays: Dict[int, int] = {}
+        self._team_by_start: Dict[Any, int] = {}
+        self._scoring_values: Dict[Any, int] = {1: 1, 2: 2, 3: 3}
+        # Учтённые эпизоды: ключ -> (поля эпизода, вклад)
+        self._applied: Dict[Hashable, Tuple[_Fingerprint, _Contribution]] = {}
+
+    @staticmethod
+    def _play_key(play: Dict[str, Any]) -> Hashable:
+        play_id = play.get('PlayID')
+        if play_id is not None:
+            return play_id
+        return (
+            play.get('PlayPeriod'),
+            play.get('PlaySecond'),
+            play.get('PlaySortOrder'),
+            play.get('StartID'),
+            play.get('PlayTypeID'),
+        )
+
+    @staticmethod
+    def _fingerprint(play: Dict[str, Any]) -> _Fingerprint:
+        return (play.get('SysStatus'), play.get('PlayTypeID'), play.get('StartID'), play.get('PlayPeriod'))
+
+    def _update_meta(self, online_data: Dict[str, Any]) -> bool:
+        """Обновляет стартовые составы и цену бросков; True, если учтённые вклады устарели
+        (изменилась цена бросков или команда уже известного игрока)"""
+        online_meta: Dict[str, Any] = online_data.get('Online') or {}
+        changed = False
+        if online_meta:
+            scoring_values: Dict[Any, int] = {
+                1: int(online_meta.get('FreeThrowValue') or 1),
+                2: int(online_meta.get('FieldGoalValue') or 2),
+                3: int(online_meta.get('LongShotValue') or 3),
+            }
+            changed = scoring_values != self._scoring_values
+            self._scoring_values = scoring_values
+        for start in online_data.get('OnlineStarts') or []:
+            start_id = start.get('StartID')
+            team_number = start.get('TeamNumber')
+            if start_id is not None and team_number in (1, 2):
+                known = self._team_by_start.get(start_id)
+                changed = changed or (known is not None and known != team_number)
+                self._team_by_start[start_id] = team_number
+        return changed
+
+    def _contribution(self, play: Dict[str, Any]) -> Tuple[_Contribution, bool]:
+        """Вклад эпизода в счёт и признак того, что команду игрока пока определить нельзя"""
+        if play.get('SysStatus') not in (None, 1):
+            return None, False
+        points = self._scoring_values.get(play.get('PlayTypeID'))
+        period = play.get('PlayPeriod')
+        if not points or period is None:
+            return None, False
+        team_number = self._team_by_start.get(play.get('StartID'))
+        if team_number is None:
+            return None, True
+        return (int(period), team_number, int(points)), False
+
+    def _add(self, contribution: _Contribution, sign: int) -> None:
+        if contribution is None:
+            return
+        period, team_number, points = contribution
+        entry = self.period_totals.setdefault(period, {1: 0, 2: 0})
+        entry[team_number] += sign * points
+        self._period_plays[period] = self._period_plays.get(period, 0) + sign
+
+    def _forget(self, key: Hashable) -> None:
+        previous = self._applied.pop(key, None)
+        if previous is not None:
+            self._add(previous[1], -1)
+
+    def reset(self) -> None:
+        """Забывает учтённые эпизоды (составы и цена бросков сохраняются)"""
+        self.period_totals.clear()
+        self._period_plays.clear()
+        self._applied.clear()
+
+    def apply(self, online_data: Dict[str, Any]) -> int:
+        """Сверяет эпизоды ответа с учтёнными, возвращает число добавленных, изменённых и убранных"""
+        if self._update_meta(online_data):
+            self.reset()
+        changes = 0
+        seen: Set[Hashable] = set()
+        for play in online_data.get('OnlinePlays') or []:
+            key = self._play_key(play)
+            seen.add(key)
+            fingerprint = self._fingerprint(play)
+            previous = self._applied.get(key)
+            if previous is not None and previous[0] == fingerprint:
+                continue
+            contribution, unresolved = self._contribution(play)
+            self._forget(key)
+            if unresolved:
+                # Игрока ещё нет в OnlineStarts: эпизод проверяется снова при следующем опросе
+                changes += previous is not None
+                continue
+            self._applied[key] = (fingerprint, contribution)
+            self._add(contribution, 1)
+            changes += 1
+        for key in [key for key in self._applied if key not in seen]:
+            self._forget(key)
+            changes += 1
+        return changes
+
+    def quarter_scores(self) -> List[str]:
+        """Счёт по периодам в формате ['20:18', '15:22', ...]"""
+        return [
+            f"{self.period_totals[period].get(1, 0)}:{self.period_totals[period].get(2, 0)}"
+            for period in sorted(self.period_totals)
+            if self._period_plays.get(period, 0) > 0
+        ]
+
+    def total_score(self) -> Tuple[int, int]:
+        return (
+            sum(scores.get(1, 0) for scores in self.period_totals.values()),
+            sum(scores.get(2, 0) for scores in self.period_totals.values()),
+        )
+
+
+# Процессоры игр, которые опрашиваются повторно (режим демона результатов)
+_processors: Dict[str, PlayByPlayProcessor] = {}
+
+
+def processor_for_game(game_id: Any) -> PlayByPlayProcessor:
+    """Процессор игры, сохраняющийся между опросами; без game_id — новый"""
+    if game_id is None or str(game_id) == '':
+        return PlayByPlayProcessor()
+    key = str(game_id)
+    processor = _processors.get(key)
+    if processor is None:
+        processor = _processors[key] = PlayByPlayProcessor()
+    return processor
+
+
+def forget_game(game_id: Any) -> None:
+    """Освобождает процессор завершённой игры"""
+    _processors.pop(str(game_id), None)
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Компактная статистика игроков и выбор лидеров за один проход
+
+PlayerStatLine — строка статистики игрока со __slots__ вместо большого
+словаря на каждого игрока. Для совместимости с кодом, который работает со
+словарями (форматирование результатов, лидеры в game_info), строка
+поддерживает line['points'], line.get('points') и to_dict().
+
+select_leaders проходит по игрокам один раз и сразу считает все лучшие и
+худшие показатели по набору правил (LeaderRule). Названия команд
+нормализуются один раз на игру (TeamNameMatcher), а не для каждого игрока.
+
+scan_protocol_statistics разбирает текст страницы с protocol.[teamN.]playerN.<Stat>
+одним предкомпилированным выражением за один проход.
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Union
+
+_STAT_FIELDS = (
+    'points',
+    'rebounds',
+    'assists',
+    'steals',
+    'blocks',
+    'turnovers',
+    'fouls',
+    'field_goals_made',
+    'field_goals_attempted',
+    'three_pointers_made',
+    'three_pointers_attempted',
+    'free_throws_made',
+    'free_throws_attempted',
+    'plus_minus',
+    'opponent_fouls',
+    'defensive_rebounds',
+    'offensive_rebounds',
+)
+
+_INFO_FIELDS = (
+    'name',
+    'team',
+    'jersey_number',
+    'person_id',
+    'player_number',
+    'position',
+    'minutes',
+    'height',
+    'weight',
+    'is_captain',
+)
+
+_COMPUTED_FIELDS = (
+    'field_goal_percentage',
+    'two_point_percentage',
+    'three_point_percentage',
+    'free_throw_percentage',
+    'kpi',
+)
+
+_INFO_DEFAULTS: Dict[str, Any] = {
+    'name': '',
+    'team': '',
+    'jersey_number': '',
+    'person_id': 0,
+    'player_number': 0,
+    'position': '',
+    'minutes': 0,
+    'height': 0,
+    'weight': 0,
+    'is_captain': False,
+}
+
+_NAME_CLEANUP = re.compile(r"[\s\-_/]")
+
+
+def normalize_team_name(name: Any) -> str:
+    """Нормализованное название команды для сравнения (как normalize_for_search в team_matcher)"""
+    if not isinstance(name, str):
+        return ""
+    return _NAME_CLEANUP.sub("", name.strip().lower())
+
+
+def _percentage(made: float, attempted: float) -> float:
+    return round((made / attempted) * 100, 1) if attempted > 0 else 0.0
+
+
+def _number(value: Any) -> Any:
+    """Значение показателя для расчётов: отсутствующее (None) считается нулём"""
+    return value or 0
+
+
+def _api_stat(player_data: Dict[str, Any], key: str) -> Any:
+    return player_data.get(key, 0) or 0
+
+
+# Показатель игрока; None — источник его не передал (такой игрок не участвует в выборе лидера)
+StatValue = Optional[Union[int, float]]
+
+
+class PlayerStatLine:
+    """Статистика одного игрока в игре"""
+
+    __slots__ = _INFO_FIELDS + _STAT_FIELDS + _COMPUTED_FIELDS
+    FIELDS = __slots__
+
+    name: str
+    team: str
+    jersey_number: Any
+    person_id: Any
+    player_number: Any
+    position: Any
+    minutes: Any
+    height: Any
+    weight: Any
+    is_captain: bool
+
+    points: StatValue
+    rebounds: StatValue
+    assists: StatValue
+    steals: StatValue
+    blocks: StatValue
+    turnovers: StatValue
+    fouls: StatValue
+    field_goals_made: StatValue
+    field_goals_attempted: StatValue
+    three_pointers_made: StatValue
+    three_pointers_attempted: StatValue
+    free_throws_made: StatValue
+    free_throws_attempted: StatValue
+    plus_minus: StatValue
+    opponent_fouls: StatValue
+    defensive_rebounds: StatValue
+    offensive_rebounds: StatValue
+
+    field_goal_percentage: float
+    two_point_percentage: float
+    three_point_percentage: float
+    free_throw_percentage: float
+    kpi: Union[int, float]
+
+    def __init__(self, name: str, team: str = '', **values: Any) -> None:
+        for field in _INFO_FIELDS:
+            setattr(self, field, values.get(field, _INFO_DEFAULTS[field]))
+        # Непереданный показатель — 0, явно переданный None сохраняется
+        for field in _STAT_FIELDS:
+            setattr(self, field, values.get(field, 0))
+        self.name = name
+        self.team = team
+        self.finalize()
+
+    def finalize(self) -> 'PlayerStatLine':
+        """Пересчитывает проценты попаданий и КПИ по текущим значениям"""
+        ft_made, ft_attempted = _number(self.free_throws_made), _number(self.free_throws_attempted)
+        fg_made, fg_attempted = _number(self.field_goals_made), _number(self.field_goals_attempted)
+        three_made, three_attempted = _number(self.three_pointers_made), _number(self.three_pointers_attempted)
+        total_made = ft_made + fg_made + three_made
+        total_attempted = ft_attempted + fg_attempted + three_attempted
+        # Общий процент попаданий = (все попадания) / (все попытки) * 100
+        self.field_goal_percentage = _percentage(total_made, total_attempted)
+        self.two_point_percentage = _percentage(fg_made, fg_attempted)
+        self.three_point_percentage = _percentage(three_made, three_attempted)
+        self.free_throw_percentage = _percentage(ft_made, ft_attempted)
+        # КПИ = Очки + Подборы + Передачи + Перехваты + Блоки + Фолы соперника - Промахи - Потери - Фолы
+        misses = total_attempted - total_made
+        self.kpi = (
+            _number(self.points) + _number(self.rebounds) + _number(self.assists)
+            + _number(self.steals) + _number(self.blocks) + _number(self.opponent_fouls)
+            - misses - _number(self.turnovers) - _number(self.fouls)
+        )
+        return self
+
+    @classmethod
+    def from_api(cls, player_data: Dict[str, Any], team_name: str) -> Optional['PlayerStatLine']:
+        """Строка из данных игрока Infobasket (Protocol.Players, GameTeams.Players)"""
+        player_name = f"{player_data.get('FirstNameRu', '')} {player_data.get('LastNameRu', '')}".strip()
+        if not player_name:
+            return None
+        return cls(
+            player_name,
+            team_name,
+            jersey_number=player_data.get('DisplayNumber', ''),
+            person_id=player_data.get('PersonID', 0),
+            player_number=player_data.get('PlayerNumber', 0),
+            points=_api_stat(player_data, 'Points'),
+            rebounds=_api_stat(player_data, 'Rebound'),
+            assists=_api_stat(player_data, 'Assist'),
+            steals=_api_stat(player_data, 'Steal'),
+            blocks=_api_stat(player_data, 'Blocks'),
+            turnovers=_api_stat(player_data, 'Turnover'),
+            fouls=_api_stat(player_data, 'Foul'),
+            field_goals_made=_api_stat(player_data, 'Goal2'),
+            field_goals_attempted=_api_stat(player_data, 'Shot2'),
+            three_pointers_made=_api_stat(player_data, 'Goal3'),
+            three_pointers_attempted=_api_stat(player_data, 'Shot3'),
+            free_throws_made=_api_stat(player_data, 'Goal1'),
+            free_throws_attempted=_api_stat(player_data, 'Shot1'),
+            minutes=player_data.get('PlayedTime', '0:00'),
+            plus_minus=_api_stat(player_data, 'PlusMinus'),
+            opponent_fouls=_api_stat(player_data, 'OpponentFoul'),
+            defensive_rebounds=_api_stat(player_data, 'DefRebound'),
+            offensive_rebounds=_api_stat(player_data, 'OffRebound'),
+            height=player_data.get('Height', 0) or 0,
+            weight=player_data.get('Weight', 0) or 0,
+            position=player_data.get('PosID', 0) or 0,
+            is_captain=player_data.get('Capitan', 0) == 1,
+        )
+
+    # --- Доступ как к словарю ---
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and key in self.FIELDS
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default) if key in self.FIELDS else default
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __repr__(self) -> str:
+        return f"PlayerStatLine({self.name!r}, {self.team!r}, points={self.points})"
+
+
+def has_valid_name(player: Any) -> bool:
+    name = player.get('name') if player else None
+    return bool(name) and name.strip() != '' and 'None' not in name
+
+
+class TeamNameMatcher:
+    """Проверка «игрок нашей команды» с нормализацией названий один раз на игру"""
+
+    def __init__(self, our_team_names: Iterable[str]) -> None:
+        self._our_keys = {normalize_team_name(name) for name in our_team_names}
+        self._our_keys.discard("")
+        self._memo: Dict[str, bool] = {}
+
+    def __call__(self, team_name: Any) -> bool:
+        key = team_name if isinstance(team_name, str) else ""
+        result = self._memo.get(key)
+        if result is None:
+            result = self._memo[key] = normalize_team_name(key) in self._our_keys
+        return result
+
+
+class LeaderRule(NamedTuple):
+    """Правило выбора лидера: поле, направление и (для процентов) поле попыток"""
+
+    slot: str
+    field: str
+    maximize: bool = True
+    # Только среди игроков с попытками > 0; при равном проценте — больше попыток
+    attempts_field: Optional[str] = None
+
+
+def select_leaders(players: Iterable[Any], rules: Sequence[LeaderRule]) -> Dict[str, Any]:
+    """Один проход по игрокам: для каждого правила — первый игрок с лучшим значением"""
+    best_player: Dict[str, Any] = {}
+    best_value: Dict[str, Any] = {}
+    best_attempts: Dict[str, Any] = {}
+    for player in players:
+        for rule in rules:
+            attempts = 0
+            if rule.attempts_field is not None:
+                attempts = player.get(rule.attempts_field, 0)
+                if not attempts > 0:
+                    continue
+            value = player.get(rule.field)
+            if value is None:
+                continue
+            current = best_value.get(rule.slot)
+            if rule.slot not in best_player:
+                better = True
+            elif value == current:
+                better = rule.attempts_field is not None and not rule.maximize and attempts > best_attempts[rule.slot]
+            else:
+                better = value > current if rule.maximize else value < current
+            if better:
+                best_player[rule.slot] = player
+                best_value[rule.slot] = value
+                best_attempts[rule.slot] = attempts
+    return best_player
+
+
+# Лучшие игроки матча (обе команды)
+BEST_PLAYER_RULES = (
+    LeaderRule('mvp', 'points'),
+    LeaderRule('best_rebounder', 'rebounds'),
+    LeaderRule('best_stealer', 'steals'),
+    LeaderRule('best_assister', 'assists'),
+    LeaderRule('best_blocker', 'blocks'),
+    LeaderRule('best_plus_minus', 'plus_minus'),
+    LeaderRule('most_playing', 'minutes'),
+)
+
+# Лидеры и анти-лидеры нашей команды
+TEAM_LEADER_RULES = (
+    LeaderRule('points', 'points'),
+    LeaderRule('rebounds', 'rebounds'),
+    LeaderRule('assists', 'assists'),
+    LeaderRule('steals', 'steals'),
+    LeaderRule('blocks', 'blocks'),
+    LeaderRule('best_kpi', 'kpi'),
+    LeaderRule('best_plus_minus', 'plus_minus'),
+    LeaderRule('best_free_throw', 'free_throw_percentage', attempts_field='free_throws_attempted'),
+    LeaderRule('best_two_point', 'two_point_percentage', attempts_field='field_goals_attempted'),
+    LeaderRule('best_three_point', 'three_point_percentage', attempts_field='three_pointers_attempted'),
+    LeaderRule('worst_shooting', 'field_goal_percentage', maximize=False),
+    LeaderRule('turnovers', 'turnovers'),
+    LeaderRule('fouls', 'fouls'),
+    LeaderRule('worst_kpi', 'kpi', maximize=False),
+    LeaderRule('worst_plus_minus', 'plus_minus', maximize=False),
+    LeaderRule('worst_free_throw', 'free_throw_percentage', maximize=False, attempts_field='free_throws_attempted'),
+    LeaderRule('worst_two_point', 'two_point_percentage', maximize=False, attempts_field='field_goals_attempted'),
+    LeaderRule('worst_three_point', 'three_point_percentage', maximize=False, attempts_field='three_pointers_attempted'),
+)
+
+TEAM_ANTI_LEADER_SLOTS = (
+    'worst_shooting',
+    'turnovers',
+    'fouls',
+    'worst_kpi',
+    'worst_plus_minus',
+    'worst_free_throw',
+    'worst_two_point',
+    'worst_three_point',
+)
+
+
+def team_players(players: Iterable[Any], our_team_names: Union[Iterable[str], TeamNameMatcher]) -> List[Any]:
+    """Игроки нашей команды с валидными именами (названия или готовый TeamNameMatcher)"""
+    is_our_team = our_team_names if isinstance(our_team_names, TeamNameMatcher) else TeamNameMatcher(our_team_names)
+    return [player for player in players if has_valid_name(player) and is_our_team(player.get('team', ''))]
+
+
+# protocol.[teamN.]playerN.Name: <имя до конца строки> | protocol.[teamN.]playerN.<Stat>: <число>
+_PROTOCOL_TOKEN = re.compile(
+    r'protocol\.(?:team(\d+)\.)?player(\d+)\.'
+    r'(?:(Name)[:\s]*([^\n\r]+)|([A-Za-z]+)[:\s]*(-?\d+(?:\.\d+)?))'
+)
+
+# Поле protocol -> поле PlayerStatLine
+PROTOCOL_FIELDS: Dict[str, str] = {
+    'Points': 'points',
+    'Rebounds': 'rebounds',
+    'Assists': 'assists',
+    'Steals': 'steals',
+    'Blocks': 'blocks',
+    'Turnovers': 'turnovers',
+    'Fouls': 'fouls',
+    'FieldGoalsMade': 'field_goals_made',
+    'FieldGoalsAttempted': 'field_goals_attempted',
+    'ThreePointersMade': 'three_pointers_made',
+    'ThreePointersAttempted': 'three_pointers_attempted',
+    'FreeThrowsMade': 'free_throws_made',
+    'FreeThrowsAttempted': 'free_throws_attempted',
+    'Minutes': 'minutes',
+    'PlusMinus': 'plus_minus',
+    'OpponentFouls': 'opponent_fouls',
+}
+
+
+def _protocol_value(field: str, raw: str) -> Any:
+    if field == 'minutes':
+        return float(raw) if '.' in raw else int(raw)
+    value = int(raw.split('.', 1)[0])
+    # Отрицательным может быть только плюс/минус
+    return value if value >= 0 or field == 'plus_minus' else 0
+
+
+def scan_protocol_statistics(page_text: str) -> List[PlayerStatLine]:
+    """Статистика игроков из protocol-переменных страницы за один проход по тексту.
+
+    Для каждого игрока берётся первое значение каждого показателя; порядок
+    игроков — порядок их имён на странице.
+    """
+    names: List[tuple] = []
+    values: Dict[str, Dict[str, Any]] = {}
+    teams: Dict[str, str] = {}
+    for team_num, player_num, name_key, name, stat_key, raw_value in _PROTOCOL_TOKEN.findall(page_text):
+        if team_num and player_num not in teams:
+            teams[player_num] = team_num
+        if name_key:
+            names.append((player_num, name.strip()))
+            continue
+        field = PROTOCOL_FIELDS.get(stat_key)
+        if field is None:
+            continue
+        player_values = values.setdefault(player_num, {})
+        if field not in player_values:
+            player_values[field] = _protocol_value(field, raw_value)
+
+    lines: List[PlayerStatLine] = []
+    for player_num, name in names:
+        if not name:
+            continue
+        team_num = teams.get(player_num)
+        lines.append(PlayerStatLine(
+            name,
+            f"Team{team_num}" if team_num else '',
+            player_number=player_num,
+            **values.get(player_num, {}),
+        ))
+    return lines
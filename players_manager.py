@@ -9,6 +9,8 @@ import datetime
 from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
 import gspread
+from lazy_singleton import LazySingleton
+from sheets_rate_limiter import sheets_rate_limiter
 
 # Загружаем переменные окружения
 load_dotenv()
@@ -26,11 +28,27 @@ SCOPES = [
 class PlayersManager:
     """Менеджер данных игроков"""
     
-    def __init__(self):
+    def __init__(self, spreadsheet: Optional[Any] = None):
         self.gc = None
         self.spreadsheet = None
         self.players_sheet = None
+        if spreadsheet is not None and self._use_shared_spreadsheet(spreadsheet):
+            return
         self._init_google_sheets()
+
+    def _use_shared_spreadsheet(self, spreadsheet: Any) -> bool:
+        """Берёт лист 'Игроки' из уже открытой таблицы (без повторной авторизации)"""
+        try:
+            self.players_sheet = sheets_rate_limiter.call("read", lambda: spreadsheet.worksheet("Игроки"))
+        except gspread.WorksheetNotFound:
+            return False
+        except Exception as e:
+            print(f"⚠️ Не удалось использовать общую таблицу для листа 'Игроки': {e}")
+            return False
+        self.spreadsheet = spreadsheet
+        self.gc = getattr(spreadsheet, 'client', None)
+        print("✅ Лист 'Игроки' открыт через общее подключение к таблице")
+        return True
     
     def _init_google_sheets(self):
         """Инициализация Google Sheets"""
@@ -225,8 +243,9 @@ class PlayersManager:
                 print("❌ Лист 'Игроки' не доступен")
                 return []
             
-            # Получаем все данные
-            all_records = self.players_sheet.get_all_records()
+            # Получаем все данные (через общий ограничитель квоты Sheets)
+            players_sheet = self.players_sheet
+            all_records = sheets_rate_limiter.call("read", players_sheet.get_all_records) or []
             
             players = []
             for record in all_records:
@@ -339,7 +358,8 @@ class PlayersManager:
             ]
             
             # Добавляем строку
-            self.players_sheet.append_row(row_data)
+            players_sheet = self.players_sheet
+            sheets_rate_limiter.call("write", lambda: players_sheet.append_row(row_data))
             print(f"✅ Игрок {surname} {name} добавлен")
             return True
             
@@ -354,11 +374,12 @@ class PlayersManager:
                 return False
             
             # Ищем игрока по имени
-            all_records = self.players_sheet.get_all_records()
+            players_sheet = self.players_sheet
+            all_records = sheets_rate_limiter.call("read", players_sheet.get_all_records) or []
             for i, record in enumerate(all_records, start=2):  # Начинаем с 2 (после заголовков)
                 if record.get('Имя') == name:
                     # Обновляем статус
-                    self.players_sheet.update(f'E{i}', status)
+                    sheets_rate_limiter.call("write", lambda: players_sheet.update(f'E{i}', status))
                     print(f"✅ Статус игрока {name} обновлен на '{status}'")
                     return True
             
@@ -382,8 +403,10 @@ class PlayersManager:
             print(f"❌ Ошибка поиска игрока: {e}")
             return None
 
-# Глобальный экземпляр менеджера
-players_manager = PlayersManager()
+# Глобальный экземпляр менеджера (подключение к таблице при первом обращении)
+players_manager: PlayersManager = LazySingleton(  # type: ignore[assignment]
+    PlayersManager, "players_manager"
+)
 
 def get_years_word(age: int) -> str:
     """Возвращает правильное склонение слова 'год'"""
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Регрессионные проверки поведения бота на таблице в памяти и заглушке Infobasket
+
+Окружение то же, что у sheets_call_budget.py (fake_gspread, infobasket_stub_server,
+RecordingBot); каждая проверка выполняется в отдельном процессе со свежими
+синглтонами и своим каталогом .cache:
+- config_snapshot_survives_service_writes — запись в "Сервисный" не сбрасывает
+  снимок конфигурации, а правка листа "Конфиг" сбрасывает;
+- results_daemon_retires_games — демон результатов (на виртуальных часах) не
+  возвращает в ожидание игры, которые бросил или уже пытался отправить;
+- shared_response_json_is_private — два потребителя одного URL за запуск
+  (парсеры календаря для двух команд) не видят правок друг друга;
+- schema_version_written_after_full_migration — если раздел листа "Конфиг"
+  не удалось привести в порядок, версия разметки не записывается;
+- today_highlights_use_widget_opponent — превью соперника сегодняшней игры
+  запрашивается для соперника из состава виджета, а не из календаря.
+
+Проверка, которая не прошла, — код выхода 1.
+
+Запуск:
+    python regression_checks.py [--only ИМЯ ...] [--verbose]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import traceback
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from unittest import mock
+
+from sheets_call_budget import (
+    FIXTURES_DIR,
+    OUR_TEAM_ID,
+    PREVIOUS_RUN_QUOTA,
+    SPREADSHEET_ID,
+    ScenarioEnvironment,
+    configure_scenario_env,
+    scenario_environment,
+)
+
+
+class CheckFailed(AssertionError):
+    """Поведение бота не совпало с ожидаемым"""
+
+
+def expect(condition: bool, message: str) -> None:
+    if not condition:
+        raise CheckFailed(message)
+
+
+# --- Проверки (выполняются в дочернем процессе) ---------------------------
+
+
+async def _check_config_snapshot(env: ScenarioEnvironment) -> None:
+    from enhanced_duplicate_protection import CONFIG_WORKSHEET_NAME, EnhancedDuplicateProtection
+
+    first = EnhancedDuplicateProtection()
+    config = first.get_config_ids()
+    expect(bool(config["team_ids"]), "конфигурация не прочитана из листа 'Конфиг'")
+    first.add_record("ПРОВЕРКА", "config-snapshot", additional_data="запись в сервисный лист")
+    first.flush_pending_writes()
+    first.close()
+
+    # Новый процесс (новый экземпляр) после записи в "Сервисный" берёт снимок
+    second = EnhancedDuplicateProtection()
+    with mock.patch.object(second, "get_full_config", wraps=second.get_full_config) as parse:
+        reused = second.get_config_ids()
+    second.close()
+    expect(parse.call_count == 0, "запись в 'Сервисный' сбросила снимок конфигурации")
+    expect(reused == config, "конфигурация из снимка отличается от прочитанной")
+
+    # Правка листа "Конфиг" снимок сбрасывает
+    env.client.spreadsheets[SPREADSHEET_ID].sheet(CONFIG_WORKSHEET_NAME).update([["Pull Up Новый"]], "D3")
+    third = EnhancedDuplicateProtection()
+    with mock.patch.object(third, "get_full_config", wraps=third.get_full_config) as parse:
+        changed = third.get_config_ids()
+    third.close()
+    expect(parse.call_count == 1, "правка листа 'Конфиг' не сбросила снимок")
+    expect(changed != config, "после правки листа 'Конфиг' вернулась старая конфигурация")
+
+
+def _announcement_row(today_text: str, game_id: int, game_time: str) -> List[str]:
+    """Строка анонса сегодняшней игры в сервисном листе"""
+    return [
+        "АНОНС_ИГРА",
+        f"{today_text} 08:00",
+        f"АНОНС_ИГРА_{game_id}_Проверка",
+        "ОТПРАВЛЕН",
+        f"Pull Up vs Соперник {game_id}",
+        f"https://www.fbp.ru/game.html?gameId={game_id}&apiUrl=https://reg.infobasket.su&lang=ru",
+        "", "", "", "",
+        str(game_id),
+        today_text,
+        game_time,
+        "", "", "",
+    ]
+
+
+async def _check_results_daemon(env: ScenarioEnvironment) -> None:
+    import game_results_monitor_final
+    from enhanced_duplicate_protection import DATE_COL, GAME_TIME_COL, LINK_COL, TYPE_COL
+    from game_results_monitor_final import (
+        RESULTS_GAME_DURATION_MINUTES,
+        RESULTS_GIVE_UP_MINUTES,
+        GameResultsMonitorFinal,
+    )
+    from gspread.utils import rowcol_to_a1
+
+    # Три игры: failed заканчивается первой, но отправка не удаётся; never так и не
+    # завершается и брошена, пока ещё ждём sent; sent заканчивается последней
+    service = env.client.spreadsheets[SPREADSHEET_ID].sheet("Сервисный")
+    today_text = env.today.strftime("%d.%m.%Y")
+    rows = service.rows
+    never_row = next(
+        index for index, row in enumerate(rows, 1)
+        if row[TYPE_COL] == "АНОНС_ИГРА" and row[DATE_COL].startswith(today_text)
+    )
+    never_link = rows[never_row - 1][LINK_COL]
+    service.update([["10:00"]], rowcol_to_a1(never_row, GAME_TIME_COL + 1))
+    failed_row = _announcement_row(today_text, 990001, "09:30")
+    sent_row = _announcement_row(today_text, 990002, "14:00")
+    service.append_rows([failed_row, sent_row])
+    failed_link, sent_link = failed_row[LINK_COL], sent_row[LINK_COL]
+
+    clock = [game_results_monitor_final.get_moscow_time().replace(hour=9, minute=0, second=0, microsecond=0)]
+    duration = timedelta(minutes=RESULTS_GAME_DURATION_MINUTES)
+    finishes = {
+        failed_link: clock[0] + timedelta(minutes=30) + duration,
+        sent_link: clock[0] + timedelta(hours=5, minutes=30) + duration,
+    }
+    never_given_up = clock[0] + timedelta(hours=1) + duration + timedelta(minutes=RESULTS_GIVE_UP_MINUTES)
+    polls: Dict[str, List[datetime]] = {}
+    sends: List[str] = []
+
+    async def parse_game_from_link(link: str) -> Optional[Dict[str, Any]]:
+        polls.setdefault(link, []).append(clock[0])
+        finish = finishes.get(link)
+        if finish is None or clock[0] < finish:
+            return None
+        return {"game_id": link, "link": link}
+
+    async def send_game_result(info: Dict[str, Any]) -> bool:
+        sends.append(info["link"])
+        return info["link"] == sent_link
+
+    real_sleep = asyncio.sleep
+
+    async def virtual_sleep(delay: float, result: Any = None) -> Any:
+        clock[0] += timedelta(seconds=max(delay, 0))
+        return await real_sleep(0, result)
+
+    monitor = GameResultsMonitorFinal()
+    monitor.bot = env.bot.as_bot()
+    monitor.game_manager.bot = env.bot.as_bot()
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(mock.patch.object(game_results_monitor_final, "get_moscow_time", lambda: clock[0]))
+        stack.enter_context(mock.patch.object(asyncio, "sleep", virtual_sleep))
+        stack.enter_context(mock.patch.object(monitor, "parse_game_from_link", parse_game_from_link))
+        stack.enter_context(mock.patch.object(monitor, "send_game_result", send_game_result))
+        sent_count = await monitor.run_results_daemon(max_runtime_minutes=12 * 60)
+
+    expect(sends.count(failed_link) == 1, f"результат с неудачной отправкой отправлялся {sends.count(failed_link)} раз")
+    expect(sends.count(sent_link) == 1, f"результат отправлялся {sends.count(sent_link)} раз")
+    expect(sent_count == 1, f"отправлено {sent_count} результатов вместо 1")
+    late_polls = [moment for moment in polls.get(never_link, []) if moment >= never_given_up]
+    expect(len(late_polls) <= 1, f"брошенная игра опрошена ещё {len(late_polls) - 1} раз после отказа")
+    failed_polls = [moment for moment in polls.get(failed_link, []) if moment >= finishes[failed_link]]
+    expect(len(failed_polls) == 1, f"игра с неудачной отправкой опрошена {len(failed_polls)} раз после окончания")
+
+
+async def _check_shared_response_json(env: ScenarioEnvironment) -> None:
+    from http_client import shared_http_client
+    from infobasket_smart_parser import InfobasketSmartParser
+    from infobasket_stub_server import InfobasketFixtures
+
+    fixtures = InfobasketFixtures(FIXTURES_DIR)
+    comp_id = fixtures.recorded_comp_ids[0]
+    game = next(game for game in fixtures.calendar(comp_id) if game.get("TeamAid") == OUR_TEAM_ID and game.get("TeamBid"))
+    game_id, opponent_id = game["GameID"], int(game["TeamBid"])
+
+    def configured_team(result: Dict[str, Any]) -> Optional[int]:
+        categorized = result["configured"]
+        for candidate in categorized["future"] + categorized["today"] + categorized["past"]:
+            if candidate.get("GameID") == game_id:
+                return candidate.get("ConfiguredTeamID")
+        return None
+
+    # Один календарь для двух команд: второй разбор идёт по уже скачанному ответу
+    ours = await InfobasketSmartParser(comp_ids=[comp_id], team_ids=[OUR_TEAM_ID], base_url=env.base_url).get_all_team_games()
+    theirs = await InfobasketSmartParser(comp_ids=[comp_id], team_ids=[opponent_id], base_url=env.base_url).get_all_team_games()
+    expect(shared_http_client.coalesced >= 1, "второй разбор календаря не переиспользовал ответ")
+    expect(configured_team(ours) == OUR_TEAM_ID, "игры первого потребителя изменены вторым")
+    expect(configured_team(theirs) == opponent_id, "второй потребитель получил игры с полями первого")
+
+
+async def _check_schema_migration(env: ScenarioEnvironment) -> None:
+    from enhanced_duplicate_protection import (
+        CONFIG_WORKSHEET_NAME,
+        SCHEMA_FINGERPRINT,
+        SCHEMA_METADATA_KEY,
+        EnhancedDuplicateProtection,
+    )
+    from fake_gspread import WRITE, quota_exceeded_error
+
+    spreadsheet = env.client.spreadsheets[SPREADSHEET_ID]
+    config_sheet = spreadsheet.sheet(CONFIG_WORKSHEET_NAME)
+
+    def stored_version() -> Optional[str]:
+        for item in spreadsheet.developer_metadata:
+            if item.get("metadataKey") == SCHEMA_METADATA_KEY:
+                return item.get("metadataValue")
+        return None
+
+    # Старая версия разметки: миграция обязательна, но запись в "Конфиг" падает
+    spreadsheet.set_developer_metadata(SCHEMA_METADATA_KEY, "previous-version")
+    with mock.patch.object(config_sheet, "update", side_effect=quota_exceeded_error(WRITE)):
+        EnhancedDuplicateProtection().close()
+    expect(stored_version() == "previous-version", "версия разметки записана после неудачной миграции раздела")
+
+    EnhancedDuplicateProtection().close()
+    expect(stored_version() == SCHEMA_FINGERPRINT, "версия разметки не записана после успешной миграции")
+
+
+async def _check_today_highlights(env: ScenarioEnvironment) -> None:
+    from game_system_manager import GameSystemManager
+
+    opponent_id = OUR_TEAM_ID + 1
+    widget = {"game_date": "", "game_time": "", "arena": "", "team_a_id": opponent_id, "team_b_id": OUR_TEAM_ID}
+    # В календаре соперник не указан: его знает только виджет
+    game = {"game_id": 990003, "our_team_id": OUR_TEAM_ID, "opponent_team_id": None}
+    requested: List[Optional[int]] = []
+
+    async def fake_highlights(game_info: Dict[str, Any]) -> List[str]:
+        requested.append(game_info.get("opponent_team_id"))
+        return ["превью"]
+
+    manager = GameSystemManager(bot=env.bot.as_bot())
+    with mock.patch.object(manager, "fetch_widget_game_details", mock.AsyncMock(return_value=widget)), \
+            mock.patch.object(manager, "_fetch_opponent_highlights", side_effect=fake_highlights):
+        await manager.prefetch_game_details([], [game])
+    expect(requested == [opponent_id], f"превью запрошено для соперника {requested}, ожидался {opponent_id}")
+    expect(manager._prefetched_highlights.get("990003") == ["превью"], "превью соперника не сохранено")
+    expect(game["opponent_team_id"] is None, "предзагрузка изменила игру из календаря")
+
+
+CHECKS: Dict[str, Callable[[ScenarioEnvironment], Awaitable[None]]] = {
+    "config_snapshot_survives_service_writes": _check_config_snapshot,
+    "results_daemon_retires_games": _check_results_daemon,
+    "shared_response_json_is_private": _check_shared_response_json,
+    "schema_version_written_after_full_migration": _check_schema_migration,
+    "today_highlights_use_widget_opponent": _check_today_highlights,
+}
+
+
+async def run_check(name: str) -> None:
+    async with scenario_environment(PREVIOUS_RUN_QUOTA, PREVIOUS_RUN_QUOTA) as env:
+        await CHECKS[name](env)
+
+
+def _check_main(name: str, verbose: bool) -> int:
+    configure_scenario_env(PREVIOUS_RUN_QUOTA, PREVIOUS_RUN_QUOTA)
+    output = sys.stderr if verbose else open(os.devnull, "w", encoding="utf-8")
+    result: Dict[str, object] = {"ok": True}
+    with output, contextlib.redirect_stdout(output):
+        try:
+            asyncio.run(run_check(name))
+        except CheckFailed as e:
+            result = {"ok": False, "error": str(e)}
+        except Exception as e:
+            traceback.print_exc(file=output)
+            result = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    print(json.dumps(result, ensure_ascii=False))
+    return 0
+
+
+def run_in_subprocess(name: str, verbose: bool, work_dir: str) -> Dict[str, object]:
+    """Проверка в отдельном процессе: свежие синглтоны, кэши и каталог .cache"""
+    command = [sys.executable, os.path.abspath(__file__), "--check", name]
+    if verbose:
+        command.append("--verbose")
+    check_dir = os.path.join(work_dir, name)
+    os.makedirs(check_dir, exist_ok=True)
+    completed = subprocess.run(command, cwd=check_dir, stdout=subprocess.PIPE, text=True)
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        return {"ok": False, "error": f"процесс завершился с кодом {completed.returncode}"}
+    return json.loads(lines[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Регрессионные проверки бота на таблице в памяти")
+    parser.add_argument("--only", nargs="*", default=None, help="проверки для запуска")
+    parser.add_argument("--verbose", action="store_true", help="показывать вывод проверок")
+    parser.add_argument("--check", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.check:
+        return _check_main(args.check, args.verbose)
+
+    names = [name for name in CHECKS if not args.only or name in args.only]
+    failures: List[str] = []
+    with tempfile.TemporaryDirectory(prefix="pullup-regression-") as work_dir:
+        for name in names:
+            result = run_in_subprocess(name, args.verbose, work_dir)
+            if result.get("ok"):
+                print(f"✅ {name}")
+            else:
+                print(f"❌ {name}: {result.get('error')}")
+                failures.append(name)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
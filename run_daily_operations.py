@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Ежедневные операции в одном процессе
+
+Вместо трёх отдельных запусков (дни рождения, голосования, система игр)
+задачи выполняются параллельно как asyncio-задачи и используют общие ресурсы:
+- одно подключение к Google Sheets и один снимок сервисного листа
+  (duplicate_protection), конфигурация читается один раз;
+- одну HTTP-сессию с пулом соединений (shared_http_client) для запросов к Infobasket;
+- один экземпляр telegram.Bot.
+
+Ошибка одной задачи не останавливает остальные: каждая завершается
+независимо, итог выводится в конце, код выхода 1 — если упала хотя бы одна.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import aiohttp
+from dotenv import load_dotenv
+
+from datetime_utils import log_current_time
+from enhanced_duplicate_protection import get_duplicate_protection
+from http_client import shared_http_client
+from sheets_rate_limiter import sheets_rate_limiter
+
+# Загружаем переменные окружения
+load_dotenv()
+
+BOT_TOKEN = os.getenv("BOT_TOKEN")
+
+
+async def run_birthdays(bot: Optional[Any], session: aiohttp.ClientSession) -> None:
+    from birthday_notifications import check_birthdays
+    await check_birthdays(bot=bot)
+
+
+async def run_voting_polls(bot: Optional[Any], session: aiohttp.ClientSession) -> None:
+    from training_polls_enhanced import VotingPollsManager
+    manager = VotingPollsManager(bot=bot)
+    created = await manager.create_due_polls()
+    if created:
+        print("✅ Хотя бы одно голосование создано")
+    else:
+        print("ℹ️ Новых голосований не создано")
+
+
+async def run_games(bot: Optional[Any], session: aiohttp.ClientSession) -> None:
+    from game_system_manager import GameSystemManager
+    # Автоочистка уже выполнена до параллельного запуска задач
+    manager = GameSystemManager(bot=bot, http_session=session)
+    await manager.run_full_system(auto_cleanup=False)
+
+
+DAILY_JOBS: Dict[str, Callable[[Optional[Any], aiohttp.ClientSession], Awaitable[None]]] = {
+    "дни рождения": run_birthdays,
+    "голосования": run_voting_polls,
+    "система игр": run_games,
+}
+
+
+async def _run_job(
+    name: str,
+    job: Callable[[Optional[Any], aiohttp.ClientSession], Awaitable[None]],
+    bot: Optional[Any],
+    session: aiohttp.ClientSession,
+) -> bool:
+    """Выполняет задачу, изолируя её ошибки от остальных"""
+    started = time.perf_counter()
+    try:
+        await job(bot, session)
+    except Exception as e:
+        print(f"❌ Задача '{name}' завершилась с ошибкой: {e}")
+        return False
+    print(f"✅ Задача '{name}' завершена за {time.perf_counter() - started:.1f} сек")
+    return True
+
+
+async def _prepare_shared_state() -> None:
+    """Один раз читает конфигурацию, чистит и загружает сервисный лист"""
+    from game_system_manager import run_service_auto_cleanup
+
+    sheets_rate_limiter.set_phase("конфигурация")
+    # Подключение к таблице (первое обращение к синглтону) — тоже вне event loop
+    duplicate_protection = await asyncio.to_thread(get_duplicate_protection)
+    await duplicate_protection.aget_config_ids()
+
+    # Очистка сдвигает номера строк — выполняем её до параллельного запуска задач
+    sheets_rate_limiter.set_phase("автоочистка")
+    await duplicate_protection.ainvalidate_service_snapshot()
+    await run_service_auto_cleanup()
+    await duplicate_protection.aget_service_snapshot()
+    sheets_rate_limiter.set_phase("ежедневные задачи")
+
+
+async def run_daily_operations() -> Dict[str, bool]:
+    """Запускает все ежедневные задачи параллельно с общими ресурсами"""
+    print("🚀 ЕЖЕДНЕВНЫЕ ОПЕРАЦИИ (ОДИН ПРОЦЕСС)")
+    print("=" * 60)
+    time_info = log_current_time()
+    print(f"🕐 Текущее время (Москва): {time_info['formatted_datetime']}")
+
+    await _prepare_shared_state()
+
+    bot: Optional[Any] = None
+    if BOT_TOKEN:
+        from telegram import Bot
+        bot = Bot(token=BOT_TOKEN)
+    else:
+        print("⚠️ BOT_TOKEN не настроен — сообщения отправлены не будут")
+
+    session = await shared_http_client.get_session()
+    if bot is not None:
+        try:
+            await bot.initialize()
+        except Exception as e:
+            print(f"⚠️ Не удалось инициализировать бота заранее: {e}")
+    try:
+        outcomes = await asyncio.gather(
+            *(_run_job(name, job, bot, session) for name, job in DAILY_JOBS.items())
+        )
+    finally:
+        if bot is not None:
+            await bot.shutdown()
+        await shared_http_client.close()
+
+    await get_duplicate_protection().aflush_pending_writes()
+    results = dict(zip(DAILY_JOBS.keys(), outcomes))
+
+    print("\n📊 ИТОГИ ЕЖЕДНЕВНЫХ ОПЕРАЦИЙ:")
+    for name, success in results.items():
+        print(f"   {'✅' if success else '❌'} {name}")
+    sheets_rate_limiter.print_report()
+    return results
+
+
+async def main() -> int:
+    results = await run_daily_operations()
+    return 0 if all(results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -6,20 +6,30 @@
 import asyncio
 import sys
 from game_results_monitor_final import GameResultsMonitorFinal
+from http_client import shared_http_client
 
 async def main():
     """Основная функция"""
     # Проверяем, есть ли аргумент для принудительного запуска
     force_run = "--force" in sys.argv or "-f" in sys.argv
+    daemon_mode = "--daemon" in sys.argv
     
-    if force_run:
+    if daemon_mode:
+        print("🚀 ЗАПУСК ФИНАЛЬНОЙ СИСТЕМЫ МОНИТОРИНГА РЕЗУЛЬТАТОВ (ДЕМОН)")
+    elif force_run:
         print("🚀 ЗАПУСК ФИНАЛЬНОЙ СИСТЕМЫ МОНИТОРИНГА РЕЗУЛЬТАТОВ (ПРИНУДИТЕЛЬНО)")
     else:
         print("🚀 ЗАПУСК ФИНАЛЬНОЙ СИСТЕМЫ МОНИТОРИНГА РЕЗУЛЬТАТОВ")
     print("=" * 60)
     
     monitor = GameResultsMonitorFinal()
-    await monitor.run_game_results_monitor(force_run=force_run)
+    try:
+        if daemon_mode:
+            await monitor.run_results_daemon()
+        else:
+            await monitor.run_game_results_monitor(force_run=force_run)
+    finally:
+        await shared_http_client.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
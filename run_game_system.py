@@ -5,12 +5,16 @@
 """
 
 import asyncio
-from game_system_manager import GameSystemManager
+from game_system_manager import get_game_system_manager
+from http_client import shared_http_client
 
 async def main():
     """Запускает полную систему управления играми"""
-    manager = GameSystemManager()
-    await manager.run_full_system()
+    manager = get_game_system_manager()
+    try:
+        await manager.run_full_system()
+    finally:
+        await shared_http_client.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
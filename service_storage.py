@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Хранилища для сервисного листа защиты от дублирования
+
+EnhancedDuplicateProtection работает со строками сервисного листа через
+общий интерфейс ServiceStorage:
+- GoogleSheetsServiceStorage — лист "Сервисный" в Google таблице (по умолчанию)
+- SQLiteServiceStorage — локальная база SQLite с индексами по ключевым колонкам
+- MirroredServiceStorage — основная база плюс фоновое зеркало в Google таблицу
+
+Выбор хранилища — переменная окружения SERVICE_STORAGE (sheets / sqlite).
+"""
+
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+# Загружаем переменные окружения
+load_dotenv()
+
+SERVICE_STORAGE = os.getenv("SERVICE_STORAGE", "sheets").strip().lower()
+SERVICE_SQLITE_PATH = os.getenv("SERVICE_SQLITE_PATH", "service_sheet.sqlite3")
+SERVICE_SQLITE_MIRROR = os.getenv("SERVICE_SQLITE_MIRROR", "false").lower() == "true"
+
+# Ключ записи: (тип, уникальный ключ, дата создания) — не зависит от номера строки
+RecordKey = Tuple[str, str, str]
+# Ссылка на строку: номер строки в листе и ключ записи в том виде, в котором она сохранена
+RowRef = Tuple[int, RecordKey]
+# Обновление строки: (номер строки, сохранённый ключ, значения, вся строка или только статус)
+RowUpdate = Tuple[int, RecordKey, List[str], bool]
+
+
+def record_key(values: Sequence[Any]) -> RecordKey:
+    """Ключ записи по значениям строки (колонки A, C и B сервисного листа)"""
+    padded = [str(value) for value in values[:3]] + [""] * (3 - min(len(values), 3))
+    return (padded[0], padded[2], padded[1])
+
+
+def coalesce_row_ranges(row_numbers: Sequence[int]) -> List[Tuple[int, int]]:
+    """Склеивает номера строк в непрерывные диапазоны (start, end) включительно"""
+    ranges: List[Tuple[int, int]] = []
+    for row_number in sorted(set(row_numbers)):
+        if ranges and ranges[-1][1] + 1 == row_number:
+            ranges[-1] = (ranges[-1][0], row_number)
+        else:
+            ranges.append((row_number, row_number))
+    return ranges
+
+
+class ServiceStorage:
+    """Интерфейс хранилища строк сервисного листа.
+
+    Строки адресуются так же, как в Google таблице: первая строка — заголовок,
+    данные начинаются со второй строки, новые записи вставляются сразу под
+    заголовок (самые свежие — сверху). Изменения и удаления передают и номер
+    строки, и ключ записи: лист адресуется по номеру, база — по ключу.
+    """
+
+    name = "base"
+
+    def is_ready(self) -> bool:
+        raise NotImplementedError
+
+    def read_all(self) -> List[List[str]]:
+        """Все строки, включая заголовок"""
+        raise NotImplementedError
+
+    def insert_rows(self, rows: List[List[str]]) -> None:
+        """Вставляет строки под заголовок: rows[0] станет второй строкой"""
+        raise NotImplementedError
+
+    def update_rows(self, updates: List[RowUpdate]) -> None:
+        raise NotImplementedError
+
+    def delete_rows(self, rows: Sequence[RowRef]) -> int:
+        """Удаляет строки, возвращает количество отправленных диапазонов (0 — ничего не удалено)"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class GoogleSheetsServiceStorage(ServiceStorage):
+    """Лист "Сервисный" в Google таблице"""
+
+    name = "sheets"
+
+    def __init__(
+        self,
+        get_worksheet: Callable[[], Any],
+        get_spreadsheet: Callable[[], Any],
+        retry: Callable[..., Any],
+        header: List[str],
+        status_col: int,
+    ) -> None:
+        self._get_worksheet = get_worksheet
+        self._get_spreadsheet = get_spreadsheet
+        self._retry = retry
+        self._end_column = chr(ord('A') + len(header) - 1)
+        self._status_column = chr(ord('A') + status_col)
+        self._status_col = status_col
+
+    def is_ready(self) -> bool:
+        return self._get_worksheet() is not None
+
+    def read_all(self) -> List[List[str]]:
+        worksheet = self._get_worksheet()
+        if not worksheet:
+            return []
+        return self._retry(worksheet.get_all_values, kind="read") or []
+
+    def insert_rows(self, rows: List[List[str]]) -> None:
+        worksheet = self._get_worksheet()
+        spreadsheet = self._get_spreadsheet()
+        if not worksheet or not spreadsheet or not rows:
+            return
+        # Пустые строки и значения в одном batchUpdate: явный диапазон вместо
+        # определения таблицы в append, запись атомарна и стоит одного запроса
+        requests = [
+            {
+                'insertDimension': {
+                    'range': {
+                        'sheetId': worksheet.id,
+                        'dimension': 'ROWS',
+                        'startIndex': 1,
+                        'endIndex': 1 + len(rows),
+                    },
+                    'inheritFromBefore': False,
+                }
+            },
+            {
+                'updateCells': {
+                    'start': {'sheetId': worksheet.id, 'rowIndex': 1, 'columnIndex': 0},
+                    'rows': [
+                        {'values': [{'userEnteredValue': {'stringValue': str(value)}} for value in row]}
+                        for row in rows
+                    ],
+                    'fields': 'userEnteredValue',
+                }
+            },
+        ]
+        self._retry(lambda: spreadsheet.batch_update({'requests': requests}), kind="write")
+
+    def update_rows(self, updates: List[RowUpdate]) -> None:
+        worksheet = self._get_worksheet()
+        if not worksheet or not updates:
+            return
+        batch = []
+        for row_number, _, values, full_row in updates:
+            if full_row:
+                batch.append({
+                    'range': f"A{row_number}:{self._end_column}{row_number}",
+                    'values': [list(values)],
+                })
+            else:
+                batch.append({
+                    'range': f"{self._status_column}{row_number}",
+                    'values': [[values[self._status_col]]],
+                })
+        self._retry(lambda: worksheet.batch_update(batch), kind="write")
+
+    def delete_rows(self, rows: Sequence[RowRef]) -> int:
+        worksheet = self._get_worksheet()
+        spreadsheet = self._get_spreadsheet()
+        ranges = coalesce_row_ranges([row_number for row_number, _ in rows])
+        if not worksheet or not spreadsheet or not ranges:
+            return 0
+
+        # Удаляем снизу вверх, чтобы индексы следующих диапазонов не сдвигались
+        requests = [
+            {
+                'deleteDimension': {
+                    'range': {
+                        'sheetId': worksheet.id,
+                        'dimension': 'ROWS',
+                        'startIndex': start - 1,
+                        'endIndex': end,
+                    }
+                }
+            }
+            for start, end in reversed(ranges)
+        ]
+        self._retry(lambda: spreadsheet.batch_update({'requests': requests}), kind="write")
+        return len(ranges)
+
+
+class SQLiteServiceStorage(ServiceStorage):
+    """Локальная база SQLite с колонками сервисного листа.
+
+    Порядок строк — по id (свежие сверху), изменения и удаления ищут запись по
+    ключу (тип, уникальный ключ, дата) через индекс idx_service_type_key.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, header: List[str], column_names: List[str], status_col: int) -> None:
+        if len(header) != len(column_names):
+            raise ValueError("Количество колонок SQLite не совпадает с заголовком сервисного листа")
+        self.path = path
+        self.header = list(header)
+        self.columns = list(column_names)
+        self._type_column, self._date_column, self._key_column = self.columns[0], self.columns[1], self.columns[2]
+        self._status_column = self.columns[status_col]
+        self._status_col = status_col
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._init_schema()
+
+    def _init_schema(self) -> None:
+        column_sql = ", ".join(f"{name} TEXT NOT NULL DEFAULT ''" for name in self.columns)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS service_records (id INTEGER PRIMARY KEY AUTOINCREMENT, {column_sql})"
+            )
+            # Все выборки идут из снимка в памяти; база ищет строку только по ключу записи
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_service_type_key "
+                f"ON service_records ({self._type_column}, {self._key_column})"
+            )
+            for unused_index in ("idx_service_key", "idx_service_type_date", "idx_service_type_game"):
+                self._conn.execute(f"DROP INDEX IF EXISTS {unused_index}")
+
+    def is_ready(self) -> bool:
+        return True
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM service_records LIMIT 1").fetchone()
+        return row is None
+
+    def _normalize(self, values: List[str]) -> List[str]:
+        normalized = [str(value) for value in values[:len(self.columns)]]
+        if len(normalized) < len(self.columns):
+            normalized.extend([""] * (len(self.columns) - len(normalized)))
+        return normalized
+
+    def _record_id_sql(self) -> str:
+        # Среди одинаковых ключей выбираем верхнюю строку (наибольший id), как снимок
+        return (
+            f"SELECT id FROM service_records WHERE {self._type_column} = ? AND {self._key_column} = ? "
+            f"AND {self._date_column} = ? ORDER BY id DESC LIMIT 1"
+        )
+
+    def read_all(self) -> List[List[str]]:
+        with self._lock:
+            cursor = self._conn.execute(
+                f"SELECT {', '.join(self.columns)} FROM service_records ORDER BY id DESC"
+            )
+            rows = [list(row) for row in cursor]
+        return [list(self.header)] + rows
+
+    def insert_rows(self, rows: List[List[str]]) -> None:
+        if not rows:
+            return
+        placeholders = ", ".join("?" for _ in self.columns)
+        with self._lock, self._conn:
+            # Нижняя из вставляемых строк получает меньший id
+            self._conn.executemany(
+                f"INSERT INTO service_records ({', '.join(self.columns)}) VALUES ({placeholders})",
+                [self._normalize(row) for row in reversed(rows)],
+            )
+
+    def update_rows(self, updates: List[RowUpdate]) -> None:
+        if not updates:
+            return
+        full_assignments = ", ".join(f"{name} = ?" for name in self.columns)
+        full_rows = []
+        status_rows = []
+        for _, key, values, full_row in updates:
+            if full_row:
+                full_rows.append(self._normalize(values) + list(key))
+            else:
+                status_rows.append([self._normalize(values)[self._status_col]] + list(key))
+        with self._lock, self._conn:
+            if full_rows:
+                self._conn.executemany(
+                    f"UPDATE service_records SET {full_assignments} WHERE id = ({self._record_id_sql()})",
+                    full_rows,
+                )
+            if status_rows:
+                self._conn.executemany(
+                    f"UPDATE service_records SET {self._status_column} = ? WHERE id = ({self._record_id_sql()})",
+                    status_rows,
+                )
+
+    def delete_rows(self, rows: Sequence[RowRef]) -> int:
+        ranges = coalesce_row_ranges([row_number for row_number, _ in rows])
+        if not ranges:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"DELETE FROM service_records WHERE id = ({self._record_id_sql()})",
+                [list(key) for _, key in rows],
+            )
+        return len(ranges)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class MirroredServiceStorage(ServiceStorage):
+    """Основное хранилище с фоновым зеркалированием записей в другое.
+
+    Чтение и запись идут в основное хранилище, те же операции в том же порядке
+    отправляются в зеркало из отдельного потока. Ошибки зеркала только логируются.
+    Зеркало включается, только если его строки совпадают с основным хранилищем
+    (см. create_service_storage): лист адресуется номерами строк из базы.
+    """
+
+    def __init__(self, primary: ServiceStorage, mirror: ServiceStorage) -> None:
+        self.primary = primary
+        self.mirror = mirror
+        self.name = f"{primary.name}+{mirror.name}"
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="service-mirror")
+
+    def _mirror(self, operation: str, *args: Any) -> None:
+        def _run() -> None:
+            try:
+                getattr(self.mirror, operation)(*args)
+            except Exception as e:
+                print(f"⚠️ Ошибка зеркалирования сервисного листа ({operation}): {e}")
+        try:
+            self._executor.submit(_run)
+        except RuntimeError:
+            # Пул уже остановлен (завершение интерпретатора) — пишем синхронно
+            _run()
+
+    def is_ready(self) -> bool:
+        return self.primary.is_ready()
+
+    def read_all(self) -> List[List[str]]:
+        return self.primary.read_all()
+
+    def insert_rows(self, rows: List[List[str]]) -> None:
+        self.primary.insert_rows(rows)
+        self._mirror("insert_rows", [list(row) for row in rows])
+
+    def update_rows(self, updates: List[RowUpdate]) -> None:
+        self.primary.update_rows(updates)
+        self._mirror("update_rows", [(row, key, list(values), full) for row, key, values, full in updates])
+
+    def delete_rows(self, rows: Sequence[RowRef]) -> int:
+        ranges = self.primary.delete_rows(rows)
+        self._mirror("delete_rows", list(rows))
+        return ranges
+
+    def close(self) -> None:
+        # Дожидаемся, пока зеркало получит все изменения
+        self._executor.shutdown(wait=True)
+        self.primary.close()
+        self.mirror.close()
+
+
+def create_service_storage(
+    sheets_storage: GoogleSheetsServiceStorage,
+    header: List[str],
+    column_names: List[str],
+    status_col: int,
+    backend: Optional[str] = None,
+) -> ServiceStorage:
+    """Создаёт хранилище сервисного листа по настройкам окружения"""
+    backend = (backend or SERVICE_STORAGE).lower()
+    if backend != "sqlite":
+        return sheets_storage
+
+    sqlite_storage = SQLiteServiceStorage(SERVICE_SQLITE_PATH, header, column_names, status_col)
+    print(f"✅ Сервисное хранилище: SQLite ({SERVICE_SQLITE_PATH})")
+    if not SERVICE_SQLITE_MIRROR:
+        return sqlite_storage
+
+    if not sheets_storage.is_ready():
+        print("⚠️ Зеркало в Google таблицу недоступно, работаем только с SQLite")
+        return sqlite_storage
+
+    existing = sheets_storage.read_all()
+    if sqlite_storage.is_empty():
+        # Первый запуск: переносим существующие строки, чтобы номера строк совпадали с зеркалом
+        sqlite_storage.insert_rows(existing[1:])
+        print(f"📥 В SQLite перенесено {max(len(existing) - 1, 0)} строк из сервисного листа")
+    else:
+        # Лист могли изменить вручную: при расхождении номера строк зеркала указывали бы не туда
+        sheet_keys = [record_key(row) for row in existing[1:]]
+        sqlite_keys = [record_key(row) for row in sqlite_storage.read_all()[1:]]
+        if sheet_keys != sqlite_keys:
+            print(
+                f"⚠️ Сервисный лист ({len(sheet_keys)} строк) расходится с SQLite ({len(sqlite_keys)} строк), "
+                "зеркалирование отключено; очистите SQLite, чтобы заново перенести лист"
+            )
+            return sqlite_storage
+
+    print("🪞 Включено фоновое зеркалирование в лист 'Сервисный'")
+    return MirroredServiceStorage(sqlite_storage, sheets_storage)
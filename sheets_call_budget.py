@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+Бюджет запросов к Google Sheets для основных точек входа
+
+Каждый сценарий запускается в отдельном процессе (как в GitHub Actions) против
+таблицы в памяти (fake_gspread) и локальной заглушки Infobasket
+(infobasket_stub_server), Telegram-бот только запоминает сообщения:
+- cleanup_service_sheet    — очистка сервисного листа (5000 строк из фикстуры);
+- run_full_system          — парсинг, опросы и анонсы после вчерашнего прогона:
+                             опросы уже созданы, кроме одной новой игры,
+                             анонсы — для игр сегодня;
+- run_game_results_monitor — мониторинг результатов по анонсу за сегодня.
+
+Число чтений и записей сравнивается с SHEETS_CALL_BUDGETS: превышение — код
+выхода 1, поэтому лишние запросы к таблице ловятся в CI до того, как
+упрутся в квоту Google. Если запросов стало меньше, бюджет стоит уменьшить.
+
+Запуск:
+    python sheets_call_budget.py [--only ИМЯ ...] [--methods] [--json] [--verbose]
+    python sheets_call_budget.py --read-quota 10    # проверить поведение при 429
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gzip
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, cast
+
+if TYPE_CHECKING:
+    from telegram import Bot
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(REPO_DIR, "benchmark_fixtures")
+
+# Максимум запросов к Sheets API за запуск (чтение / запись)
+SHEETS_CALL_BUDGETS: Dict[str, Dict[str, int]] = {
+    "cleanup_service_sheet": {"read": 4, "write": 1},
+    "run_full_system": {"read": 5, "write": 6},
+    "run_game_results_monitor": {"read": 5, "write": 2},
+}
+
+# Сценарии, которым нужен сервисный лист после вчерашнего прогона той же точки входа
+SCENARIOS_WITH_PREVIOUS_RUN = {"run_full_system"}
+# Квота вчерашнего прогона: он только готовит данные и не должен ждать лимитов
+PREVIOUS_RUN_QUOTA = 1_000_000
+
+SPREADSHEET_ID = "fake-pullup-spreadsheet"
+OUR_TEAM_ID = 1001
+# Окружение дочернего процесса: .env разработчика не должен влиять на подсчёт
+SCENARIO_ENV = {
+    "BOT_TOKEN": "123456:TEST-TOKEN",
+    "CHAT_ID": "-1001234567890",
+    "ANNOUNCEMENTS_TOPIC_ID": "",
+    "GAMES_TOPIC_ID": "1282",
+    "TEST_MODE": "false",
+    "SERVICE_STORAGE": "sheets",
+    "HTTP_CACHE_ENABLED": "false",
+    "INFOBASKET_API_BASE": "",
+    "INFOBASKET_COMPETITION_ID": "",
+    "INFOBASKET_COMPETITION_TAG": "",
+}
+
+
+class RecordingBot:
+    """Telegram-бот, который только запоминает отправленные сообщения
+
+    В код бота передаётся как telegram.Bot (as_bot): используются только методы send_*.
+    """
+
+    def __init__(self) -> None:
+        self.sent: List[Tuple[str, Dict[str, Any]]] = []
+
+    def __getattr__(self, name: str) -> Callable[..., Awaitable[Any]]:
+        if not name.startswith("send_"):
+            raise AttributeError(name)
+
+        async def send(*args: Any, **kwargs: Any) -> Any:
+            self.sent.append((name, kwargs))
+            message_id = len(self.sent)
+            return SimpleNamespace(
+                message_id=message_id,
+                chat_id=kwargs.get("chat_id"),
+                poll=SimpleNamespace(id=f"poll-{message_id}"),
+            )
+
+        return send
+
+    def as_bot(self) -> "Bot":
+        return cast("Bot", self)
+
+
+# --- Данные сценариев -----------------------------------------------------
+
+
+def _parse_date(value: str) -> date:
+    return datetime.strptime(value[:10], "%d.%m.%Y").date()
+
+
+def plan_games(today: date) -> Tuple[int, Dict[str, Any]]:
+    """Сдвиг календарей, при котором ближайшая будущая игра нашей команды — сегодня,
+    и завершённая игра для анонса, который проверяет монитор результатов"""
+    from infobasket_stub_server import InfobasketFixtures
+
+    fixtures = InfobasketFixtures(FIXTURES_DIR)
+    games = [
+        game for game in fixtures.calendar(fixtures.recorded_comp_ids[0])
+        if OUR_TEAM_ID in (game.get("TeamAid"), game.get("TeamBid"))
+    ]
+    upcoming = sorted((game for game in games if not game.get("GameStatus")), key=lambda game: _parse_date(game["GameDate"]))
+    finished = next(game for game in games if game.get("GameStatus"))
+    return (today - _parse_date(upcoming[0]["GameDate"])).days, finished
+
+
+def _shift_service_rows(rows: List[List[str]], today: date) -> List[List[str]]:
+    """Строки сервисного листа из фикстуры; самая свежая — вчерашняя"""
+    from enhanced_duplicate_protection import DATE_COL, GAME_DATE_COL
+    from infobasket_stub_server import shift_calendar_date
+
+    newest = max(_parse_date(row[DATE_COL]) for row in rows)
+    offset = (today - timedelta(days=1) - newest).days
+    shifted = []
+    for row in rows:
+        row = list(row)
+        row[DATE_COL] = shift_calendar_date(row[DATE_COL], offset)
+        row[GAME_DATE_COL] = shift_calendar_date(row[GAME_DATE_COL], offset)
+        shifted.append(row)
+    return shifted
+
+
+def previous_run_rows(service_rows: List[List[str]]) -> List[List[str]]:
+    """Опросы, созданные вчерашним прогоном (строки фикстуры уже есть в листе).
+
+    Последний созданный опрос отбрасывается: это игра, которая появилась
+    в календаре сегодня, и опрос по ней должен создаться в замеряемом прогоне.
+    """
+    from enhanced_duplicate_protection import STATUS_COL, TYPE_COL
+
+    polls = [
+        row for row in service_rows
+        if len(row) > STATUS_COL and row[TYPE_COL] == "ОПРОС_ИГРА" and row[STATUS_COL] == "ОПРОС СОЗДАН"
+    ]
+    return polls[:-1]
+
+
+def build_spreadsheet(
+    client: Any,
+    base_url: str,
+    today: date,
+    finished_game: Dict[str, Any],
+    previous_rows: Sequence[List[str]] = (),
+) -> None:
+    """Таблица бота: листы "Сервисный", "Конфиг", "Игроки" и актуальная версия разметки"""
+    from enhanced_duplicate_protection import (
+        CONFIG_WORKSHEET_NAME,
+        SCHEMA_FINGERPRINT,
+        SCHEMA_METADATA_KEY,
+        SERVICE_HEADER,
+    )
+
+    with gzip.open(os.path.join(FIXTURES_DIR, "service_sheet.json.gz"), "rt", encoding="utf-8") as service_file:
+        service_rows = _shift_service_rows(json.load(service_file)["rows"], today)
+    with open(os.path.join(FIXTURES_DIR, "config_sheet.json"), "r", encoding="utf-8") as config_file:
+        config_rows = json.load(config_file)["rows"]
+
+    # Анонс сегодняшней игры со ссылкой: по нему монитор ищет результат
+    game_id = str(finished_game["GameID"])
+    today_text = today.strftime("%d.%m.%Y")
+    service_rows.append([
+        "АНОНС_ИГРА",
+        f"{today_text} 10:00",
+        f"АНОНС_ИГРА_{game_id}_{finished_game.get('ShortTeamNameBru')}",
+        "ОТПРАВЛЕН",
+        f"{finished_game.get('ShortTeamNameAru')} vs {finished_game.get('ShortTeamNameBru')}",
+        f"https://www.fbp.ru/game.html?gameId={game_id}&apiUrl=https://reg.infobasket.su&lang=ru",
+        str(finished_game.get("CompID")),
+        str(OUR_TEAM_ID),
+        "",
+        "",
+        game_id,
+        today_text,
+        finished_game.get("GameTimeMsk") or "",
+        finished_game.get("ArenaRu") or "",
+        str(finished_game.get("TeamAid")),
+        str(finished_game.get("TeamBid")),
+    ])
+    service_rows.extend(list(row) for row in previous_rows)
+    # Fallback-источники ведут на заглушку: сценарии не ходят во внешнюю сеть
+    config_rows = [list(row) for row in config_rows]
+    for row in config_rows:
+        if row and row[0] == "FALLBACK" and len(row) > 6:
+            row[6] = f"{base_url}/letobasket/"
+
+    spreadsheet = client.create_spreadsheet(SPREADSHEET_ID)
+    spreadsheet.add_sheet("Сервисный", [SERVICE_HEADER] + service_rows)
+    spreadsheet.add_sheet(CONFIG_WORKSHEET_NAME, config_rows)
+    spreadsheet.add_sheet("Игроки", [
+        ["Фамилия", "Имя", "Ник", "Telegram ID", "Дата рождения", "Статус", "Команда", "Дата добавления", "Примечания"],
+        ["Иванов", "Иван", "ivan", "1001", "1995-01-15", "Активный", "Pull Up", "2025-09-01", ""],
+        ["Петров", "Пётр", "petr", "1002", today.strftime("%Y-%m-%d"), "Активный", "Pull Up", "2025-09-01", ""],
+    ])
+    spreadsheet.set_developer_metadata(SCHEMA_METADATA_KEY, SCHEMA_FINGERPRINT)
+
+
+# --- Сценарии (выполняются в дочернем процессе) ----------------------------
+
+
+async def _scenario_cleanup(bot: RecordingBot) -> None:
+    from cleanup_service_sheet import cleanup_service_sheet
+
+    await cleanup_service_sheet()
+
+
+async def _scenario_full_system(bot: RecordingBot) -> None:
+    from game_system_manager import GameSystemManager
+
+    await GameSystemManager(bot=bot.as_bot()).run_full_system()
+
+
+async def _scenario_results_monitor(bot: RecordingBot) -> None:
+    from game_results_monitor_final import GameResultsMonitorFinal
+
+    monitor = GameResultsMonitorFinal()
+    monitor.bot = bot.as_bot()
+    monitor.game_manager.bot = bot.as_bot()
+    await monitor.run_game_results_monitor()
+
+
+SCENARIOS: Dict[str, Callable[[RecordingBot], Awaitable[None]]] = {
+    "cleanup_service_sheet": _scenario_cleanup,
+    "run_full_system": _scenario_full_system,
+    "run_game_results_monitor": _scenario_results_monitor,
+}
+
+
+class ScenarioEnvironment(NamedTuple):
+    """Окружение сценария: таблица в памяти, заглушка Infobasket и бот"""
+
+    client: Any
+    app: Any
+    base_url: str
+    bot: RecordingBot
+    today: date
+    finished_game: Dict[str, Any]
+
+
+@contextlib.asynccontextmanager
+async def scenario_environment(
+    read_quota: int,
+    write_quota: int,
+    previous_rows: Sequence[List[str]] = (),
+) -> AsyncIterator[ScenarioEnvironment]:
+    """Заглушка Infobasket и таблица бота в памяти на время сценария.
+
+    Переменные окружения должны быть уже выставлены (configure_scenario_env).
+    При выходе сбрасываются отложенные записи и закрывается общий HTTP-клиент.
+    """
+    from datetime_utils import get_moscow_time
+    from fake_gspread import FakeGspreadClient, SheetsCallCounter, install_fake_sheets
+    from infobasket_stub_server import create_app, run_stub_server
+
+    today = get_moscow_time().date()
+    date_offset, finished_game = plan_games(today)
+    app = create_app(fixtures_dir=FIXTURES_DIR, date_offset_days=date_offset)
+    async with run_stub_server(app) as base_url:
+        os.environ["INFOBASKET_BASE_URL"] = base_url
+        client = FakeGspreadClient(SheetsCallCounter(read_quota, write_quota))
+        build_spreadsheet(client, base_url, today, finished_game, previous_rows)
+        with install_fake_sheets(client, SPREADSHEET_ID):
+            from enhanced_duplicate_protection import duplicate_protection
+            from http_client import shared_http_client
+            from lazy_singleton import is_initialized
+
+            try:
+                yield ScenarioEnvironment(client, app, base_url, RecordingBot(), today, finished_game)
+            finally:
+                # Отложенные записи иначе ушли бы при выходе (atexit) — после подсчёта
+                if is_initialized(duplicate_protection):
+                    duplicate_protection.flush_pending_writes()
+                await shared_http_client.close()
+
+
+async def run_scenario(
+    name: str,
+    read_quota: int,
+    write_quota: int,
+    state_in: Optional[str] = None,
+    state_out: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Сценарий целиком в текущем процессе: заглушка, таблица в памяти, точка входа.
+
+    state_in — строки сервисного листа вчерашнего прогона (previous_run_rows),
+    state_out — куда сохранить сервисный лист после прогона.
+    """
+    previous_rows: List[List[str]] = []
+    if state_in:
+        with open(state_in, "r", encoding="utf-8") as state_file:
+            previous_rows = json.load(state_file)
+    async with scenario_environment(read_quota, write_quota, previous_rows) as env:
+        await SCENARIOS[name](env.bot)
+    if state_out:
+        service_rows = env.client.spreadsheets[SPREADSHEET_ID].sheet("Сервисный").rows
+        with open(state_out, "w", encoding="utf-8") as state_file:
+            json.dump(previous_run_rows(service_rows), state_file, ensure_ascii=False)
+    result = env.client.counter.snapshot()
+    result["telegram_messages"] = len(env.bot.sent)
+    result["infobasket_requests"] = sum(env.app["stats"]["hits"].values())
+    return result
+
+
+def configure_scenario_env(read_quota: int, write_quota: int) -> None:
+    """Окружение дочернего процесса; вызывается до импорта модулей бота"""
+    os.environ.update(SCENARIO_ENV)
+    os.environ["SPREADSHEET_ID"] = SPREADSHEET_ID
+    os.environ["SHEETS_READ_QUOTA_PER_MINUTE"] = str(read_quota)
+    os.environ["SHEETS_WRITE_QUOTA_PER_MINUTE"] = str(write_quota)
+
+
+def _scenario_main(
+    name: str,
+    read_quota: int,
+    write_quota: int,
+    verbose: bool,
+    state_in: Optional[str] = None,
+    state_out: Optional[str] = None,
+) -> int:
+    configure_scenario_env(read_quota, write_quota)
+    output = sys.stderr if verbose else open(os.devnull, "w", encoding="utf-8")
+    with output, contextlib.redirect_stdout(output):
+        result = asyncio.run(run_scenario(name, read_quota, write_quota, state_in, state_out))
+    print(json.dumps(result, ensure_ascii=False))
+    return 0
+
+
+# --- Проверка бюджетов ------------------------------------------------------
+
+
+def _run_child(name: str, scenario_dir: str, read_quota: int, write_quota: int, verbose: bool, *extra: str) -> Dict[str, Any]:
+    command = [
+        sys.executable, os.path.abspath(__file__), "--scenario", name,
+        "--read-quota", str(read_quota), "--write-quota", str(write_quota), *extra,
+    ]
+    if verbose:
+        command.append("--verbose")
+    os.makedirs(scenario_dir, exist_ok=True)
+    completed = subprocess.run(command, cwd=scenario_dir, stdout=subprocess.PIPE, text=True)
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        raise RuntimeError(f"Сценарий {name} завершился с кодом {completed.returncode}")
+    return json.loads(lines[-1])
+
+
+def run_in_subprocess(name: str, args: argparse.Namespace, work_dir: str) -> Dict[str, Any]:
+    """Сценарий в отдельном процессе: свежие синглтоны, кэши и каталог .cache
+
+    Для SCENARIOS_WITH_PREVIOUS_RUN сначала выполняется вчерашний прогон
+    (в своём процессе и каталоге, без учёта запросов), а замеряется второй.
+    """
+    extra: List[str] = []
+    if name in SCENARIOS_WITH_PREVIOUS_RUN:
+        state_file = os.path.join(work_dir, f"{name}.previous.json")
+        _run_child(
+            name, os.path.join(work_dir, f"{name}.previous"), PREVIOUS_RUN_QUOTA, PREVIOUS_RUN_QUOTA, False,
+            "--state-out", state_file,
+        )
+        extra = ["--state-in", state_file]
+    return _run_child(name, os.path.join(work_dir, name), args.read_quota, args.write_quota, args.verbose, *extra)
+
+
+def check_budget(name: str, result: Dict[str, Any], check_throttling: bool) -> List[str]:
+    """Нарушения бюджета сценария (пустой список — всё в порядке)"""
+    budget = SHEETS_CALL_BUDGETS[name]
+    problems = [
+        f"{kind}: {result[kind]} > {limit}"
+        for kind, limit in budget.items()
+        if result.get(kind, 0) > limit
+    ]
+    if check_throttling and result.get("throttled"):
+        problems.append(f"429 при стандартной квоте: {result['throttled']}")
+    return problems
+
+
+def main() -> int:
+    from fake_gspread import DEFAULT_READ_QUOTA_PER_MINUTE, DEFAULT_WRITE_QUOTA_PER_MINUTE
+
+    parser = argparse.ArgumentParser(description="Бюджет запросов к Google Sheets для точек входа бота")
+    parser.add_argument("--only", nargs="*", default=None, help="сценарии для проверки")
+    parser.add_argument("--methods", action="store_true", help="показать запросы по методам gspread")
+    parser.add_argument("--json", action="store_true", help="вывести результаты в JSON")
+    parser.add_argument("--verbose", action="store_true", help="показывать вывод сценариев")
+    parser.add_argument("--read-quota", type=int, default=DEFAULT_READ_QUOTA_PER_MINUTE, help="квота чтений в минуту")
+    parser.add_argument("--write-quota", type=int, default=DEFAULT_WRITE_QUOTA_PER_MINUTE, help="квота записей в минуту")
+    parser.add_argument("--scenario", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--state-in", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--state-out", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        return _scenario_main(args.scenario, args.read_quota, args.write_quota, args.verbose, args.state_in, args.state_out)
+
+    names = [name for name in SCENARIOS if not args.only or name in args.only]
+    check_throttling = (
+        args.read_quota == DEFAULT_READ_QUOTA_PER_MINUTE and args.write_quota == DEFAULT_WRITE_QUOTA_PER_MINUTE
+    )
+    results: Dict[str, Dict[str, Any]] = {}
+    failures: Dict[str, List[str]] = {}
+    with tempfile.TemporaryDirectory(prefix="pullup-sheets-budget-") as work_dir:
+        for name in names:
+            results[name] = run_in_subprocess(name, args, work_dir)
+            problems = check_budget(name, results[name], check_throttling)
+            if problems:
+                failures[name] = problems
+
+    if args.json:
+        print(json.dumps({"budgets": SHEETS_CALL_BUDGETS, "results": results, "failures": failures}, ensure_ascii=False, indent=2))
+    else:
+        print("📊 Запросы к Google Sheets по сценариям (факт / бюджет):")
+        for name, result in results.items():
+            budget = SHEETS_CALL_BUDGETS[name]
+            status = "❌" if name in failures else "✅"
+            print(
+                f"   {status} {name}: чтений {result['read']}/{budget['read']}, "
+                f"записей {result['write']}/{budget['write']}, Drive {result['drive']}, 429: {result['throttled']}, "
+                f"сообщений {result['telegram_messages']}, запросов Infobasket {result['infobasket_requests']}"
+            )
+            if args.methods:
+                for method, count in result["by_method"].items():
+                    print(f"      {method}: {count}")
+        for name, problems in failures.items():
+            print(f"⚠️ {name}: бюджет превышен — {'; '.join(problems)}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
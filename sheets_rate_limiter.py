@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Общий ограничитель запросов к Google Sheets API
+
+Квоты Sheets API считаются в минуту отдельно для чтения и записи
+(по умолчанию 60 запросов в минуту на пользователя). Ограничитель держит
+по одному token bucket на чтение и запись, общий для всех модулей процесса
+(EnhancedDuplicateProtection, PlayersManager), и:
+- заранее выдерживает паузу, если квота на исходе, а не ждёт ошибки 429;
+- при 429 повторяет вызов с экспоненциальной задержкой и полным джиттером;
+- считает, сколько запросов и ожиданий пришлось на каждый этап работы.
+
+Ожидание идёт через time.sleep, поэтому из асинхронного кода вызовы gspread
+выполняются в потоке (EnhancedDuplicateProtection.a*-методы, asyncio.to_thread).
+Текущий этап хранится в contextvar: у параллельных задач свои этапы.
+"""
+
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, TypeVar
+
+from dotenv import load_dotenv
+
+# Загружаем переменные окружения
+load_dotenv()
+
+SHEETS_READ_QUOTA_PER_MINUTE = int(os.getenv("SHEETS_READ_QUOTA_PER_MINUTE", "60"))
+SHEETS_WRITE_QUOTA_PER_MINUTE = int(os.getenv("SHEETS_WRITE_QUOTA_PER_MINUTE", "60"))
+MAX_BACKOFF_SECONDS = 64.0
+
+READ = "read"
+WRITE = "write"
+DEFAULT_PHASE = "общий"
+
+T = TypeVar("T")
+
+# Этап работы для статистики; задачи asyncio и asyncio.to_thread получают копию контекста
+_current_phase: ContextVar[str] = ContextVar("sheets_phase", default=DEFAULT_PHASE)
+
+
+def is_quota_error(error: Exception) -> bool:
+    """Проверяет, что ошибка gspread — превышение квоты (429)"""
+    response = getattr(error, "response", None)
+    status_code = getattr(response, "status_code", None)
+    message = str(error)
+    return status_code == 429 or "429" in message or "Quota exceeded" in message
+
+
+class TokenBucket:
+    """Token bucket с пополнением per_minute токенов в минуту"""
+
+    def __init__(self, per_minute: int) -> None:
+        self.capacity = float(max(per_minute, 1))
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Забирает токен и возвращает, сколько секунд нужно подождать перед запросом"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1.0
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def drain(self) -> None:
+        """Обнуляет запас после 429: Google уже считает квоту исчерпанной"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, 0.0)
+
+
+class SheetsRateLimiter:
+    """Ограничитель запросов к Sheets API с учётом квот и статистикой по этапам"""
+
+    def __init__(
+        self,
+        read_per_minute: int = SHEETS_READ_QUOTA_PER_MINUTE,
+        write_per_minute: int = SHEETS_WRITE_QUOTA_PER_MINUTE,
+    ) -> None:
+        self.buckets: Dict[str, TokenBucket] = {
+            READ: TokenBucket(read_per_minute),
+            WRITE: TokenBucket(write_per_minute),
+        }
+        self.stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    # --- Статистика по этапам ---
+
+    @property
+    def current_phase(self) -> str:
+        return _current_phase.get()
+
+    def set_phase(self, name: str) -> None:
+        """Задаёт этап для текущей задачи (и задач, которые она запустит дальше)"""
+        _current_phase.set(name)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        token = _current_phase.set(name)
+        try:
+            yield
+        finally:
+            _current_phase.reset(token)
+
+    def _count(self, field: str, amount: float = 1.0) -> None:
+        with self._lock:
+            bucket = self.stats.setdefault(
+                _current_phase.get(),
+                {READ: 0, WRITE: 0, "throttled": 0, "waited_seconds": 0.0},
+            )
+            bucket[field] = bucket.get(field, 0) + amount
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {phase: dict(values) for phase, values in self.stats.items()}
+
+    def print_report(self) -> None:
+        stats = self.get_stats()
+        if not stats:
+            return
+        print("📊 Квота Google Sheets по этапам:")
+        for phase, values in stats.items():
+            print(
+                f"   {phase}: чтений {int(values.get(READ, 0))}, записей {int(values.get(WRITE, 0))}, "
+                f"429: {int(values.get('throttled', 0))}, ожидание {values.get('waited_seconds', 0.0):.1f} сек"
+            )
+
+    # --- Ожидание квоты ---
+
+    @staticmethod
+    def backoff_delay(attempt: int, base_delay: float = 2.0) -> float:
+        """Экспоненциальная задержка с полным джиттером"""
+        ceiling = min(MAX_BACKOFF_SECONDS, base_delay * (2 ** attempt))
+        return random.uniform(base_delay / 2, ceiling)
+
+    def acquire(self, kind: str = READ) -> float:
+        """Ждёт токен (вне event loop: в потоке или синхронном коде)"""
+        delay = self.buckets[kind].reserve()
+        self._count(kind)
+        if delay > 0:
+            self._count("waited_seconds", delay)
+            time.sleep(delay)
+        return delay
+
+    # --- Вызовы с повторами ---
+
+    def call(
+        self,
+        kind: str,
+        func: Callable[[], T],
+        max_retries: int = 3,
+        base_delay: float = 2.0,
+    ) -> Optional[T]:
+        """Выполняет синхронный вызов gspread с учётом квоты и повторами при 429"""
+        for attempt in range(max_retries):
+            self.acquire(kind)
+            try:
+                return func()
+            except Exception as e:
+                if not is_quota_error(e):
+                    raise
+                self._count("throttled")
+                self.buckets[kind].drain()
+                if attempt >= max_retries - 1:
+                    print(f"❌ Quota exceeded после {max_retries} попыток")
+                    raise
+                delay = self.backoff_delay(attempt, base_delay)
+                print(f"⚠️ Quota exceeded (429), повтор через {delay:.1f} сек (попытка {attempt + 1}/{max_retries})")
+                self._count("waited_seconds", delay)
+                time.sleep(delay)
+        return None
+
+
+# Общий экземпляр на процесс
+sheets_rate_limiter = SheetsRateLimiter()
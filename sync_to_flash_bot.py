@@ -27,6 +27,16 @@ FILES_TO_SYNC = [
     "comp_names.py",
     "players_manager.py",
     "cleanup_service_sheet.py",
+    "service_storage.py",
+    "sheets_rate_limiter.py",
+    "lazy_singleton.py",
+    "http_client.py",
+    "http_cache.py",
+    "play_by_play.py",
+    "player_stats.py",
+    "html_extract.py",
+    "team_matcher.py",
+    "team_directory.py",
     ".github/workflows/daily_operations.yml",
     ".github/workflows/game_results_monitor_v2.yml",
     ".github/workflows/cleanup_service_sheet.yml",
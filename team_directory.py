@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Справочник целевых команд, собранный из конфигурации (get_config_ids)
+
+Раньше каждый поиск команды по названию (GameSystemManager.resolve_team_config,
+EnhancedGameParser._match_team_config) перебирал все team_configs, заново
+собирал наборы алиасов и нормализовал каждый из них. Справочник строится
+один раз при загрузке конфигурации и дальше не меняется:
+- нормализованный алиас (alt_name, metadata.aliases) -> team_id за O(1);
+- team_id -> отображаемое имя (alt_name, затем metadata.display_name);
+- ключевые слова целевых команд и автомат для их поиска в тексте.
+
+Один и тот же экземпляр передаётся в GameSystemManager, EnhancedGameParser и
+монитор результатов. Новое имя команды, найденное во время работы, добавляется
+через with_keywords(), который возвращает новый справочник.
+"""
+
+import copy
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+from player_stats import TeamNameMatcher
+from team_matcher import TeamAliasMatcher, normalize_for_search
+
+
+def _clean_name(value: Any) -> Optional[str]:
+    if isinstance(value, str):
+        stripped = value.strip()
+        return stripped or None
+    return None
+
+
+def fallback_source_names(sources: Iterable[Any]) -> List[str]:
+    """Названия fallback-источников из конфигурации (только непустые строки)"""
+    return [
+        name for name in (_clean_name(source.get('name')) for source in sources if isinstance(source, dict))
+        if name
+    ]
+
+
+def _to_team_id(value: Any) -> Any:
+    """ID команды числом; ключи из JSON-кэша конфигурации приходят строками"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+class TeamDirectory:
+    """Неизменяемый справочник команд: поиск по алиасу, имена по ID, ключевые слова"""
+
+    __slots__ = (
+        '_configs',
+        '_team_id_by_alias',
+        '_display_names',
+        'primary_names',
+        'team_ids',
+        'keywords',
+        '_extra_keywords',
+        '_keyword_keys',
+        'keyword_matcher',
+        'our_team_matcher',
+    )
+
+    def __init__(self, teams: Optional[Mapping[Any, Dict[str, Any]]] = None, keywords: Iterable[str] = ()) -> None:
+        configs: Dict[Any, Dict[str, Any]] = {}
+        team_id_by_alias: Dict[str, Any] = {}
+        display_names: Dict[Any, str] = {}
+        primary_names: Dict[Any, str] = {}
+        keyword_sources = set()
+
+        for raw_id, data in (teams or {}).items():
+            if not isinstance(data, dict):
+                continue
+            team_id = _to_team_id(raw_id)
+            # Собственная копия: изменения исходного словаря не влияют на справочник
+            data = copy.deepcopy(data)
+            configs[team_id] = data
+            raw_metadata = data.get('metadata')
+            metadata: Dict[str, Any] = raw_metadata if isinstance(raw_metadata, dict) else {}
+            alt_name = _clean_name(data.get('alt_name'))
+            raw_aliases = metadata.get('aliases')
+            aliases: List[str] = [
+                alias for alias in map(_clean_name, raw_aliases)
+                if alias
+            ] if isinstance(raw_aliases, list) else []
+
+            # Первая команда в порядке конфигурации побеждает (как при прежнем переборе)
+            for candidate in ([alt_name] if alt_name else []) + aliases:
+                normalized = normalize_for_search(candidate)
+                if normalized:
+                    team_id_by_alias.setdefault(normalized, team_id)
+
+            display_name = alt_name or _clean_name(metadata.get('display_name'))
+            if display_name:
+                display_names[team_id] = display_name
+            primary_name = alt_name or (aliases[0] if aliases else None)
+            if primary_name:
+                primary_names[team_id] = primary_name
+                keyword_sources.add(primary_name)
+            keyword_sources.update(aliases)
+
+        extra_keywords = tuple(name for name in map(_clean_name, keywords) if name)
+        keyword_sources.update(extra_keywords)
+
+        self._configs: Mapping[Any, Dict[str, Any]] = MappingProxyType(configs)
+        self._team_id_by_alias: Mapping[str, Any] = MappingProxyType(team_id_by_alias)
+        self._display_names: Mapping[Any, str] = MappingProxyType(display_names)
+        self.primary_names: Mapping[Any, str] = MappingProxyType(primary_names)
+        self.team_ids: FrozenSet[int] = frozenset(team_id for team_id in configs if isinstance(team_id, int))
+        self._init_keywords(keyword_sources, extra_keywords)
+
+    def _init_keywords(self, keyword_sources: Iterable[str], extra_keywords: Tuple[str, ...]) -> None:
+        self.keywords: Tuple[str, ...] = tuple(sorted(set(keyword_sources)))
+        self._extra_keywords = extra_keywords
+        self._keyword_keys: FrozenSet[str] = frozenset(filter(None, map(normalize_for_search, self.keywords)))
+        # Поиск всех целевых команд в тексте за один проход
+        self.keyword_matcher = TeamAliasMatcher(self.keywords)
+        # Проверка «игрок нашей команды» для статистики
+        self.our_team_matcher = TeamNameMatcher(self.keywords)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if hasattr(self, name):
+            raise AttributeError(f"TeamDirectory неизменяем: {name}")
+        object.__setattr__(self, name, value)
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> "TeamDirectory":
+        """Справочник из результата get_config_ids(): команды и названия fallback-источников"""
+        return cls(config.get('teams') or {}, fallback_source_names(config.get('fallback_sources') or []))
+
+    def with_keywords(self, *names: str) -> "TeamDirectory":
+        """Новый справочник с дополнительными ключевыми словами (self не меняется).
+
+        Конфигурации и индексы по алиасам неизменяемы, поэтому новый справочник
+        использует их повторно; заново строятся только ключевые слова.
+        """
+        new_names = [name for name in map(_clean_name, names) if name and name not in self.keywords]
+        if not new_names:
+            return self
+        directory = TeamDirectory.__new__(TeamDirectory)
+        for shared in ('_configs', '_team_id_by_alias', '_display_names', 'primary_names', 'team_ids'):
+            object.__setattr__(directory, shared, getattr(self, shared))
+        directory._init_keywords(self.keywords + tuple(new_names), self._extra_keywords + tuple(new_names))
+        return directory
+
+    def __bool__(self) -> bool:
+        return bool(self._configs or self.keywords)
+
+    def team_id_for(self, team_name: Optional[str]) -> Optional[Any]:
+        """ID команды по названию или алиасу (без учёта регистра, пробелов и дефисов)"""
+        normalized = normalize_for_search(team_name) if team_name else ""
+        return self._team_id_by_alias.get(normalized) if normalized else None
+
+    def config_for(self, team_id: Any) -> Optional[Dict[str, Any]]:
+        """Конфигурация команды по ID (только для чтения)"""
+        if team_id is None:
+            return None
+        return self._configs.get(_to_team_id(team_id))
+
+    def resolve(self, team_name: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Конфигурация команды по названию: {'team_id', 'alt_name', 'metadata'}"""
+        team_id = self.team_id_for(team_name)
+        if team_id is None:
+            return None
+        data = self._configs[team_id]
+        return {
+            'team_id': team_id,
+            'alt_name': data.get('alt_name'),
+            'metadata': data.get('metadata') or {},
+        }
+
+    def display_name(self, team_id: Any, fallback: Optional[str] = None) -> Optional[str]:
+        """Отображаемое имя команды: alt_name, metadata.display_name или fallback"""
+        if team_id is not None:
+            name = self._display_names.get(_to_team_id(team_id))
+            if name:
+                return name
+        return fallback.strip() if isinstance(fallback, str) else fallback
+
+    def is_keyword(self, team_name: Optional[str]) -> bool:
+        """Название совпадает с одним из ключевых слов целевых команд"""
+        normalized = normalize_for_search(team_name) if team_name else ""
+        return bool(normalized) and normalized in self._keyword_keys
+
+    def find_in_text(self, text: str) -> List[str]:
+        """Ключевые слова целевых команд, встречающиеся в тексте"""
+        return self.keyword_matcher.find_all(text)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Поиск названий команд в тексте за один проход (автомат Ахо-Корасик)
+
+Раньше каждый вызов поиска команд нормализовал все ключевые слова заново и
+проверял их по одному (`name in text`), то есть стоил O(число названий ×
+длина текста). Здесь названия нормализуются один раз при сборке автомата,
+а текст просматривается один раз — сколько бы алиасов ни было в конфигурации.
+
+- AhoCorasick — автомат над уже нормализованными шаблонами;
+- TeamAliasMatcher — названия команд со своей нормализацией: находит все
+  встречающиеся в тексте названия или первое подходящее по порядку.
+
+Матчер собирается при изменении конфигурации команд (GameSystemManager)
+или один раз на поиск (сервисный лист, fallback-источники).
+"""
+
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+_SEARCH_SEPARATORS = re.compile(r"[\s\-_/]")
+
+
+def normalize_for_search(name: str) -> str:
+    """Нормализация для поиска: нижний регистр, без пробелов, дефисов, '_' и '/'"""
+    if not isinstance(name, str):
+        return ""
+    return _SEARCH_SEPARATORS.sub("", name.strip().lower())
+
+
+class AhoCorasick:
+    """Автомат для поиска всех шаблонов в тексте за один проход"""
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Номера шаблонов, заканчивающихся в состоянии (с учётом fail-ссылок)
+        self._output: List[List[int]] = [[]]
+
+        index_by_pattern: Dict[str, int] = {}
+        for pattern in patterns:
+            if not pattern or pattern in index_by_pattern:
+                continue
+            index_by_pattern[pattern] = len(self.patterns)
+            self.patterns.append(pattern)
+            self._insert(pattern, index_by_pattern[pattern])
+        self._build_fail_links()
+
+    def _insert(self, pattern: str, index: int) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(index)
+
+    def _build_fail_links(self) -> None:
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                if self._output[self._fail[next_state]]:
+                    self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def search(self, text: str, stop_after: Optional[int] = None) -> Set[int]:
+        """Номера шаблонов, встречающихся в тексте.
+
+        stop_after — прекратить проход, когда найдено столько разных шаблонов.
+        """
+        found: Set[int] = set()
+        if not self.patterns or not text:
+            return found
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+                if stop_after is not None and len(found) >= stop_after:
+                    break
+        return found
+
+    def contains_any(self, text: str) -> bool:
+        return bool(self.search(text, stop_after=1))
+
+
+class TeamAliasMatcher:
+    """Поиск названий команд в тексте; названия нормализуются один раз при сборке"""
+
+    def __init__(
+        self,
+        names: Iterable[str],
+        normalize: Callable[[str], str] = normalize_for_search,
+        min_length: int = 1,
+    ) -> None:
+        self.normalize = normalize
+        self.names: List[str] = []
+        # Номер шаблона автомата -> позиции названий с такой нормализованной формой
+        self._names_by_pattern: List[List[int]] = []
+
+        pattern_index: Dict[str, int] = {}
+        for name in names:
+            normalized = normalize(name) if isinstance(name, str) else ""
+            if len(normalized) < min_length:
+                continue
+            position = len(self.names)
+            self.names.append(name)
+            if normalized not in pattern_index:
+                pattern_index[normalized] = len(self._names_by_pattern)
+                self._names_by_pattern.append([])
+            self._names_by_pattern[pattern_index[normalized]].append(position)
+        self._automaton = AhoCorasick(pattern_index)
+
+    def __bool__(self) -> bool:
+        return bool(self.names)
+
+    def _positions(self, normalized_text: str) -> List[int]:
+        positions: List[int] = []
+        for pattern in self._automaton.search(normalized_text):
+            positions.extend(self._names_by_pattern[pattern])
+        return sorted(positions)
+
+    def find_all(self, text: str) -> List[str]:
+        """Все названия, встречающиеся в тексте (в порядке, в котором их передали)"""
+        return [self.names[position] for position in self._positions(self.normalize(text))]
+
+    def first_match(self, normalized_text: str) -> Optional[str]:
+        """Первое по порядку название, встречающееся в уже нормализованном тексте"""
+        positions = self._positions(normalized_text)
+        return self.names[positions[0]] if positions else None
+
+    def contains_any(self, normalized_text: str) -> bool:
+        return self._automaton.contains_any(normalized_text)
+
@@ -81,8 +81,10 @@ class VotingPollConfig:
 
 
 class VotingPollsManager:
-    def __init__(self) -> None:
-        self.bot: Optional[Bot] = Bot(token=BOT_TOKEN) if BOT_TOKEN else None
+    def __init__(self, bot: Optional[Bot] = None) -> None:
+        if bot is None and BOT_TOKEN:
+            bot = Bot(token=BOT_TOKEN)
+        self.bot: Optional[Bot] = bot
         self.chat_id: Optional[Any] = self._resolve_chat_id(CHAT_ID)
         self.automation_topics: Dict[str, Any] = {}
 
@@ -91,6 +93,8 @@ class VotingPollsManager:
             print("❌ BOT_TOKEN / CHAT_ID не настроены – голосования не будут отправлены")
             return False
 
+        # Конфигурация читается из таблицы в потоке Sheets, _load_configs берёт её из памяти
+        await duplicate_protection.aget_config_ids()
         configs = self._load_configs()
         if not configs:
             print("ℹ️ Конфигурации голосований не найдены")
@@ -106,6 +110,7 @@ class VotingPollsManager:
                 created_any = created_any or created
             except Exception as error:
                 print(f"❌ Не удалось создать голосование '{config.poll_id}': {error}")
+        await duplicate_protection.aflush_pending_writes()
         return created_any
 
     def _load_configs(self) -> List[VotingPollConfig]:
@@ -159,7 +164,7 @@ class VotingPollsManager:
     async def _create_poll_for_config(self, config: VotingPollConfig, today: dt.datetime) -> bool:
         unique_key = f"VOTING_{config.poll_id}_{today.strftime('%Y%m%d')}"
 
-        duplicate = duplicate_protection.check_duplicate("ОПРОС_ГОЛОСОВАНИЕ", unique_key)
+        duplicate = await duplicate_protection.acheck_duplicate("ОПРОС_ГОЛОСОВАНИЕ", unique_key)
         if duplicate.get("exists"):
             print(f"⏭️ Голосование {config.poll_id} уже отправлялось сегодня (Google Sheets)")
             return False
@@ -198,7 +203,7 @@ class VotingPollsManager:
             topic_id = automation_topic_id
 
         additional_info = f"{question} | " + " · ".join(options)
-        record = duplicate_protection.add_record(
+        record = await duplicate_protection.aadd_record(
             "ОПРОС_ГОЛОСОВАНИЕ",
             unique_key,
             status="ОТПРАВЛЯЕТСЯ",
@@ -247,11 +252,11 @@ class VotingPollsManager:
                 message = await bot_instance.send_poll(**send_kwargs)
             else:
                 if sheet_unique_key:
-                    duplicate_protection.update_record_status(sheet_unique_key, "ОШИБКА")
+                    await duplicate_protection.aupdate_record_status(sheet_unique_key, "ОШИБКА")
                 raise
 
                 if sheet_unique_key:
-                    duplicate_protection.update_record_status(sheet_unique_key, "ОТПРАВЛЕН")
+                    await duplicate_protection.aupdate_record_status(sheet_unique_key, "ОТПРАВЛЕН")
             print(f"✅ Голосование {config.poll_id} отправлено (message_id={message.message_id})")
         return True
 
@@ -16,8 +16,9 @@ def main():
         return
     
     try:
-        # Вызываем метод, который автоматически обновит раздел автоматических сообщений
-        duplicate_protection._ensure_automation_section_structure(duplicate_protection.config_worksheet)
+        # Принудительная миграция разметки обновит раздел автоматических сообщений
+        # и сохранит версию разметки таблицы
+        duplicate_protection.migrate_schema(force=True)
         print("✅ Раздел автоматических сообщений успешно обновлен")
         print("\n📋 Добавлены/обновлены следующие настройки:")
         from enhanced_duplicate_protection import AUTOMATION_DEFAULT_ROWS